@@ -1,20 +1,32 @@
 import asyncio
+import json
 import os
 import shutil
 import logging
 import tempfile
+import time
 from contextlib import asynccontextmanager
 
 from fastapi import FastAPI, UploadFile, File, HTTPException, Form, Request
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from pydantic import BaseModel, Field
 from slowapi import Limiter, _rate_limit_exceeded_handler
 from slowapi.util import get_remote_address
 from slowapi.errors import RateLimitExceeded
 
-from graph.run_pipeline import run_full_pipeline
-from nodes.rag_node import rag_retrieve_and_answer, store_report_state, get_embeddings, get_llm
+from graph.graph_registry import get_analysis_node_names, warm_up_graphs
+from graph.run_pipeline import PIPELINE_DONE, PIPELINE_TOKEN, iter_full_pipeline
+from nodes.rag_node import (
+    arag_retrieve_and_answer, arag_stream_answer, store_report_state, get_embeddings, get_llm,
+    shutdown_retrieval_pool,
+)
+from utils.llm_utils import aclose_llm_clients, get_llm_pool_stats, get_rate_scheduler_stats
+from utils.admission import AdmissionRejected, check_admission, get_admission_stats, pipeline_slot
+from utils.job_queue import JobQueueFull, get_job, get_job_stats, shutdown_jobs, submit_job
+from utils.ocr_utils import get_ocr_cache_stats, shutdown_ocr_pool
+from utils.reference_ranges import get_reference_table, get_reference_table_stats
+from utils.result_cache import get_cached_result, get_result_cache_stats, store_result
 
 # ── Logging ──────────────────────────────────────────────────────────────────
 logging.basicConfig(
@@ -35,9 +47,15 @@ async def lifespan(app: FastAPI):
     # Warm up singletons so first request does not pay model-load cost
     await asyncio.to_thread(get_embeddings)
     await asyncio.to_thread(get_llm)
+    await asyncio.to_thread(warm_up_graphs)
+    await asyncio.to_thread(get_reference_table)
     logger.info('"Model warm-up complete"')
     yield
     logger.info('"Server shutting down"')
+    shutdown_jobs()
+    shutdown_retrieval_pool()
+    await aclose_llm_clients()
+    shutdown_ocr_pool()
 
 # ── Rate limiter ──────────────────────────────────────────────────────────────
 limiter = Limiter(key_func=get_remote_address)
@@ -62,7 +80,11 @@ app.add_middleware(
 
 # ── Constants ─────────────────────────────────────────────────────────────────
 MAX_FILE_SIZE_BYTES = 20 * 1024 * 1024  # 20 MB
+ANALYZE_TIMEOUT_SECONDS = 300.0          # 5-minute hard limit for synchronous /analyze
+DISCONNECT_POLL_SECONDS = 1.0            # how often /chat checks whether the client is still there
 ALLOWED_EXTENSIONS = {".pdf", ".png", ".jpg", ".jpeg", ".tiff", ".tif", ".bmp"}
+# Internal or bulky ReportState fields left out of /analyze/stream node events
+_STREAM_HIDDEN_FIELDS = {"raw_file_path", "raw_text", "layout_rows"}
 
 
 # ── Schemas ───────────────────────────────────────────────────────────────────
@@ -88,6 +110,177 @@ def _validate_upload(file: UploadFile, size: int):
     return ext
 
 
+def _build_response(result, cached: bool = False) -> dict:
+    return {
+        "report_type": result.report_type or "UNKNOWN",
+        "extraction_path": result.extraction_path,
+        "risk_score": result.risk_assessment.get("score") if result.risk_assessment else 0,
+        "risk_rationale": result.risk_assessment.get("rationale") if result.risk_assessment else "",
+        "param_interpretation": result.param_interpretation,
+        "synthesis_report": result.synthesis_report,
+        "recommendations": result.recommendations,
+        "patterns": result.patterns,
+        "context_analysis": result.context_analysis,
+        "rag_collection_name": result.rag_collection_name,
+        "errors": result.errors,
+        "cached": cached,
+    }
+
+
+def _iter_analysis(contents: bytes, ext: str, session_id: str = None,
+                   stream_tokens: bool = False, bounded: bool = True):
+    """
+    Cache lookup → pipeline slot → pipeline → cache store. Blocking generator
+    shared by /analyze, /analyze/stream and /jobs: yields `(node_name, update)`
+    as each graph node finishes (plus `(PIPELINE_TOKEN, token)` items with
+    `stream_tokens`), then `("result", response dict)`. Raises
+    AdmissionRejected when no pipeline slot frees up (`bounded` queue only).
+    """
+    # Identical bytes + unchanged pipeline version → serve the finished result
+    cached = get_cached_result(contents)
+    if cached is not None:
+        if session_id:
+            store_report_state(session_id, cached)
+        logger.info(f'"analyze cache hit" "session":"{session_id}" "collection":"{cached.rag_collection_name}"')
+        yield "result", _build_response(cached, cached=True)
+        return
+
+    with pipeline_slot(bounded):
+        yield from _iter_pipeline_run(contents, ext, session_id, stream_tokens)
+
+
+def _iter_pipeline_run(contents: bytes, ext: str, session_id: str, stream_tokens: bool):
+    tmp_path = None
+    try:
+        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
+            tmp.write(contents)
+            tmp_path = tmp.name
+
+        result = None
+        for node_name, payload in iter_full_pipeline(tmp_path, stream_tokens=stream_tokens):
+            if node_name == PIPELINE_DONE:
+                result = payload
+            else:
+                yield node_name, payload
+
+        if session_id:
+            store_report_state(session_id, result)
+        store_result(contents, result)
+
+        response_data = _build_response(result)
+        logger.info(f'"analyze complete" "session":"{session_id}" "patterns":{len(result.patterns)} "errors":{len(result.errors)}')
+        yield "result", response_data
+    finally:
+        if tmp_path and os.path.exists(tmp_path):
+            try:
+                os.remove(tmp_path)
+            except OSError as oe:
+                logger.warning(f'"temp file cleanup failed" "path":"{tmp_path}" "err":"{oe}"')
+
+
+def _run_analysis(contents: bytes, ext: str, session_id: str = None, bounded: bool = True) -> dict:
+    """The /analyze response dict for an upload. Blocking; shared by /analyze and /jobs."""
+    response_data = None
+    for event, payload in _iter_analysis(contents, ext, session_id, bounded=bounded):
+        if event == "result":
+            response_data = payload
+    return response_data
+
+
+def _run_analysis_job(contents: bytes, ext: str, session_id: str = None) -> dict:
+    # The job queue already bounds how many of these wait, so a job waits for
+    # a pipeline slot as long as it takes instead of failing with a 503.
+    return _run_analysis(contents, ext, session_id, bounded=False)
+
+
+def _admission_error(e: AdmissionRejected) -> HTTPException:
+    logger.warning(f'"analysis rejected" "reason":"{e}" "retry_after":{e.retry_after}')
+    return HTTPException(
+        status_code=503,
+        detail="Server is busy with other analyses. Please try again shortly.",
+        headers={"Retry-After": str(e.retry_after)},
+    )
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+def _stream_analysis(contents: bytes, ext: str, session_id: str = None):
+    """
+    Server-sent events for /analyze/stream: one `node` event per finished graph
+    node (with the fields it produced), `token` events while the synthesis
+    report is generated, then `result` — or `error`.
+    Starlette iterates this blocking generator in its threadpool.
+    """
+    nodes = get_analysis_node_names()
+    start = time.perf_counter()
+    step = 0
+    try:
+        for event, payload in _iter_analysis(contents, ext, session_id, stream_tokens=True):
+            if event == "result":
+                yield _sse("result", payload)
+                continue
+            if event == PIPELINE_TOKEN:
+                yield _sse("token", payload)
+                continue
+            step += 1
+            yield _sse("node", {
+                "node": event,
+                "step": step,
+                "total": len(nodes),
+                "elapsed_ms": round((time.perf_counter() - start) * 1000),
+                "update": {k: v for k, v in payload.items() if k not in _STREAM_HIDDEN_FIELDS},
+            })
+    except AdmissionRejected as e:
+        logger.warning(f'"analysis rejected" "reason":"{e}" "retry_after":{e.retry_after}')
+        yield _sse("error", {
+            "detail": "Server is busy with other analyses. Please try again shortly.",
+            "retry_after": e.retry_after,
+        })
+    except Exception as e:
+        logger.exception(f'"analyze stream failed" "error":"{e}"')
+        yield _sse("error", {"detail": "Analysis failed. Please try again."})
+
+
+async def _stream_chat(body: ChatRequest):
+    """
+    Server-sent events for /chat/stream: `token` events as the answer is
+    generated, then `done` with the full text — or `error` if the answer
+    fails part-way, so the tokens already sent are never passed off as done.
+    """
+    parts = []
+    try:
+        async for text in arag_stream_answer(body.question, body.collection_name, body.session_id):
+            parts.append(text)
+            yield _sse("token", {"text": text})
+    except Exception as e:
+        logger.exception(f'"chat stream failed" "error":"{e}" "tokens_sent":{len(parts)}')
+        yield _sse("error", {"detail": "Chat failed. Please try again."})
+        return
+    yield _sse("done", {"answer": "".join(parts).strip()})
+
+
+async def _cancel_on_disconnect(request: Request, coro):
+    """
+    Await `coro`, cancelling it if the client disconnects first.
+    Returns (result, True), or (None, False) after a disconnect.
+    """
+    task = asyncio.ensure_future(coro)
+    try:
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=DISCONNECT_POLL_SECONDS)
+            if done:
+                return task.result(), True
+            if await request.is_disconnected():
+                task.cancel()
+                return None, False
+    finally:
+        # Handler itself cancelled (server shutdown) → don't leak the call
+        if not task.done():
+            task.cancel()
+
+
 # ── Routes ────────────────────────────────────────────────────────────────────
 @app.get("/")
 def root():
@@ -97,8 +290,12 @@ def root():
         "status": "running",
         "endpoints": {
             "analyze": "POST /analyze",
+            "analyze_stream": "POST /analyze/stream",
+            "jobs": "POST /jobs, GET /jobs/{job_id}",
             "chat": "POST /chat",
+            "chat_stream": "POST /chat/stream",
             "health": "GET /health",
+            "metrics": "GET /metrics",
         }
     }
 
@@ -121,66 +318,112 @@ async def analyze_report(
     contents = await file.read()
     ext = _validate_upload(file, len(contents))
 
-    tmp_path = None
     try:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=ext) as tmp:
-            tmp.write(contents)
-            tmp_path = tmp.name
+        return await asyncio.wait_for(
+            asyncio.to_thread(_run_analysis, contents, ext, session_id),
+            timeout=ANALYZE_TIMEOUT_SECONDS,
+        )
+    except AdmissionRejected as e:
+        raise _admission_error(e)
+    except asyncio.TimeoutError:
+        raise HTTPException(
+            status_code=504,
+            detail="Analysis timed out. Large or complex reports may take longer — please try again.",
+        )
+    except Exception as e:
+        logger.exception(f'"analyze failed" "error":"{e}"')
+        raise HTTPException(status_code=500, detail="Analysis failed. Please try again.")
 
-        try:
-            result = await asyncio.wait_for(
-                asyncio.to_thread(run_full_pipeline, tmp_path),
-                timeout=300.0,  # 5-minute hard limit
-            )
-        except asyncio.TimeoutError:
-            raise HTTPException(
-                status_code=504,
-                detail="Analysis timed out. Large or complex reports may take longer — please try again.",
-            )
 
-        if session_id:
-            store_report_state(session_id, result)
+@app.post("/analyze/stream")
+@limiter.limit("10/minute")
+async def analyze_report_stream(
+    request: Request,
+    file: UploadFile = File(...),
+    session_id: str = Form(None),
+):
+    """Same analysis as /analyze, streamed as server-sent events while the graph runs."""
+    logger.info(f'"analyze stream request" "file":"{file.filename}" "session":"{session_id}"')
+    contents = await file.read()
+    ext = _validate_upload(file, len(contents))
+    # Reject before the 200 + event-stream headers go out; a caller that loses
+    # the race for the last queue place gets an `error` event instead.
+    try:
+        check_admission()
+    except AdmissionRejected as e:
+        raise _admission_error(e)
+    return StreamingResponse(
+        _stream_analysis(contents, ext, session_id),
+        media_type="text/event-stream",
+        # Disable proxy buffering so each event reaches the browser as it is produced
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
-        response_data = {
-            "report_type": result.report_type or "UNKNOWN",
-            "risk_score": result.risk_assessment.get("score") if result.risk_assessment else 0,
-            "risk_rationale": result.risk_assessment.get("rationale") if result.risk_assessment else "",
-            "param_interpretation": result.param_interpretation,
-            "synthesis_report": result.synthesis_report,
-            "recommendations": result.recommendations,
-            "patterns": result.patterns,
-            "context_analysis": result.context_analysis,
-            "rag_collection_name": result.rag_collection_name,
-            "errors": result.errors,
-        }
-        logger.info(f'"analyze complete" "session":"{session_id}" "patterns":{len(result.patterns)} "errors":{len(result.errors)}')
-        return response_data
 
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.exception(f'"analyze failed" "error":"{e}"')
-        raise HTTPException(status_code=500, detail="Analysis failed. Please try again.")
-    finally:
-        if tmp_path and os.path.exists(tmp_path):
-            try:
-                os.remove(tmp_path)
-            except OSError as oe:
-                logger.warning(f'"temp file cleanup failed" "path":"{tmp_path}" "err":"{oe}"')
+@app.post("/jobs", status_code=202)
+@limiter.limit("10/minute")
+async def create_analysis_job(
+    request: Request,
+    file: UploadFile = File(...),
+    session_id: str = Form(None),
+):
+    """Queue an analysis and return its id at once; poll GET /jobs/{job_id} for the result."""
+    logger.info(f'"job request" "file":"{file.filename}" "session":"{session_id}"')
+    contents = await file.read()
+    ext = _validate_upload(file, len(contents))
+    try:
+        job = submit_job(_run_analysis_job, contents, ext, session_id,
+                         error_message="Analysis failed. Please try again.")
+    except JobQueueFull as e:
+        logger.warning(f'"job rejected" "reason":"{e}"')
+        raise HTTPException(
+            status_code=503,
+            detail="Analysis queue is full. Please try again shortly.",
+            headers={"Retry-After": str(e.retry_after)},
+        )
+    logger.info(f'"job queued" "job":"{job.id}" "session":"{session_id}"')
+    return {"job_id": job.id, "status": job.status, "status_url": f"/jobs/{job.id}"}
+
+
+@app.get("/jobs/{job_id}")
+@limiter.limit("120/minute")
+def get_analysis_job(request: Request, job_id: str):
+    """Job status; `result` (the /analyze response) once done, `error` if it failed."""
+    job = get_job(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Unknown or expired job id.")
+    return job.to_dict()
 
 
 @app.post("/chat")
 @limiter.limit("30/minute")
-def chat_with_report(request: Request, body: ChatRequest):
+async def chat_with_report(request: Request, body: ChatRequest):
     logger.info(f'"chat request" "collection":"{body.collection_name}" "session":"{body.session_id}"')
     try:
-        answer = rag_retrieve_and_answer(
-            body.question, body.collection_name, body.session_id
+        answer, connected = await _cancel_on_disconnect(
+            request,
+            arag_retrieve_and_answer(body.question, body.collection_name, body.session_id),
         )
-        return {"answer": answer}
     except Exception as e:
         logger.exception(f'"chat failed" "error":"{e}"')
         raise HTTPException(status_code=500, detail="Chat failed. Please try again.")
+    if not connected:
+        logger.info(f'"chat cancelled — client disconnected" "session":"{body.session_id}"')
+        # Nobody is listening; 499 (client closed request) keeps access logs honest
+        return Response(status_code=499)
+    return {"answer": answer}
+
+
+@app.post("/chat/stream")
+@limiter.limit("30/minute")
+async def chat_with_report_stream(request: Request, body: ChatRequest):
+    """Same answer as /chat, streamed as server-sent events while Groq generates it."""
+    logger.info(f'"chat stream request" "collection":"{body.collection_name}" "session":"{body.session_id}"')
+    return StreamingResponse(
+        _stream_chat(body),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
 
 
 @app.get("/health")
@@ -197,3 +440,17 @@ def health_check():
         status_code=200 if all_ok else 503,
         content={"status": "ok" if all_ok else "degraded", "checks": checks},
     )
+
+
+@app.get("/metrics")
+def metrics():
+    """Runtime counters for capacity planning (LLM client reuse, rate headroom, caches)."""
+    return {
+        "llm_pool": get_llm_pool_stats(),
+        "rate_scheduler": get_rate_scheduler_stats(),
+        "result_cache": get_result_cache_stats(),
+        "ocr_cache": get_ocr_cache_stats(),
+        "reference_ranges": get_reference_table_stats(),
+        "jobs": get_job_stats(),
+        "admission": get_admission_stats(),
+    }
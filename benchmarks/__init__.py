@@ -0,0 +1 @@
+"""Micro/macro benchmarks for Health AI project. Run with `python -m benchmarks.<name>`."""
@@ -0,0 +1,94 @@
+"""
+Backfill re-scoring: per-report validate + interpret vs the columnar batch path.
+
+Generates synthetic stored reports (the bench_pattern_rules generator:
+curated params, SI units that need conversion, scale-shifted counts,
+report-printed ranges and flags, unknown params, unparseable values,
+pediatric and adult patients) and runs both
+`validate_and_standardize` → `model1_interpretation_node` per report and
+`validate_and_interpret_batch` over the whole set. Every report's output
+must be identical; the script exits non-zero otherwise. Also times the
+columnar `score_batch` a backfill would use to write flags back.
+
+    python -m benchmarks.bench_batch_validation [reports]
+"""
+
+import math
+import random
+import sys
+import time
+from types import SimpleNamespace
+
+from benchmarks.bench_pattern_rules import _report
+from nodes.batch_validation import score_batch, validate_and_interpret_batch
+from nodes.model1_interpretation import model1_interpretation_node
+from nodes.validate_standardize import validate_and_standardize
+from utils.reference_ranges import get_reference_table, load_reference_ranges
+
+
+def _per_report(report: dict) -> dict:
+    validated = validate_and_standardize(SimpleNamespace(**report))
+    interpreted = model1_interpretation_node(SimpleNamespace(validated_params=validated["validated_params"]))
+    return {**validated, **interpreted}
+
+
+def _same(a, b) -> bool:
+    if isinstance(a, float) and isinstance(b, float) and math.isnan(a) and math.isnan(b):
+        return True
+    if type(a) is not type(b):
+        return False
+    if isinstance(a, dict):
+        return list(a) == list(b) and all(_same(a[k], b[k]) for k in a)
+    if isinstance(a, list):
+        return len(a) == len(b) and all(_same(x, y) for x, y in zip(a, b))
+    return a == b
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(0)
+    db = load_reference_ranges()
+    params = list(db)
+    reports = [_report(rng, params, db) for _ in range(count)]
+    rows = sum(len(r["extracted_params"]) for r in reports)
+    get_reference_table()
+
+    start = time.perf_counter()
+    expected = [_per_report(r) for r in reports]
+    per_report_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    actual = validate_and_interpret_batch(reports)
+    batch_s = time.perf_counter() - start
+
+    start = time.perf_counter()
+    score_batch(reports)
+    columns_s = time.perf_counter() - start
+
+    mismatches = 0
+    for i, (want, got) in enumerate(zip(expected, actual)):
+        if not _same(want, got):
+            mismatches += 1
+            if mismatches <= 5:
+                for section in want:
+                    for key in want[section] if isinstance(want[section], dict) else [None]:
+                        w = want[section][key] if key else want[section]
+                        g = got[section].get(key) if key else got[section]
+                        if not _same(w, g):
+                            print(f"MISMATCH report {i} {section}/{key}:\n  per-report {w}\n  batch      {g}")
+                            break
+
+    print(f"{count} reports, {rows} rows")
+    print(f"per-report  {per_report_s * 1000:>8.0f} ms  ({per_report_s * 1e6 / rows:.1f} µs/row)")
+    print(f"batch       {batch_s * 1000:>8.0f} ms  ({batch_s * 1e6 / rows:.1f} µs/row)  "
+          f"{per_report_s / batch_s:.1f}x")
+    print(f"columns     {columns_s * 1000:>8.0f} ms  ({columns_s * 1e6 / rows:.1f} µs/row)  "
+          f"{per_report_s / columns_s:.1f}x  (score_batch, no per-param dicts)")
+    if mismatches:
+        print(f"{mismatches} report(s) differ")
+        sys.exit(1)
+    print("batch output identical to the per-report path")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,130 @@
+"""
+Parameter-name canonicalization: original linear alias scan vs Aho-Corasick.
+
+Builds a corpus of raw names as they come back from lab reports — every
+alias in mixed case, with "Serum"/"S." prefixes, "level"/"count" suffixes,
+unit and method annotations, OCR spacing, and names that match nothing.
+Both implementations must return identical (name, matched) pairs for every
+entry; the script exits non-zero otherwise.
+
+    python -m benchmarks.bench_canonicalize [runs]
+"""
+
+import random
+import statistics
+import sys
+import time
+
+from nodes.extract_parameters import PARAM_ALIASES, _canonicalize
+
+
+# ── Original implementation (pre-automaton), kept verbatim for parity ────────
+def _legacy_canonicalize(raw_name: str) -> tuple[str, bool]:
+    key = raw_name.strip().lower()
+
+    if key in PARAM_ALIASES:
+        return PARAM_ALIASES[key], True
+
+    noise = ["serum", "blood", "plasma", "s.", "b.", "(total)", "(direct)", "(indirect)",
+             "(free)", "level", "count", "test", "assay", ",", ".", "-"]
+    cleaned = key
+    for n in noise:
+        cleaned = cleaned.replace(n, " ")
+    cleaned = " ".join(cleaned.split())
+    if cleaned in PARAM_ALIASES:
+        return PARAM_ALIASES[cleaned], True
+
+    condensed = cleaned.replace(" ", "")
+    if condensed in PARAM_ALIASES:
+        return PARAM_ALIASES[condensed], True
+
+    best = None
+    best_len = 0
+    for alias, canonical in PARAM_ALIASES.items():
+        if len(alias) < 4:
+            continue
+        if alias in key and len(alias) > best_len:
+            best, best_len = canonical, len(alias)
+    if best:
+        return best, True
+
+    return raw_name.strip(), False
+
+
+_PREFIXES = ["", "Serum ", "S. ", "Blood ", "Plasma ", "B. ", "Total ", "Fasting "]
+_SUFFIXES = ["", " level", " count", " (Total)", " test", ", serum", " - EDTA", " (calculated)",
+             " [Photometry]", " (g/dL)", " *"]
+_UNMATCHED = ["Remarks", "Poa", "Sample Type", "Method", "Page 1 of 2", "Interpretation",
+              "Reported On", "Ref. By Dr", "Xyzzy", "Barcode", "Nil", "Signature"]
+
+
+def _corpus(seed: int = 0) -> list[str]:
+    rng = random.Random(seed)
+    aliases = list(PARAM_ALIASES)
+    names = []
+    for alias in aliases:
+        names.append(alias)
+        names.append(alias.title())
+        names.append(alias.upper())
+        names.append(f"{rng.choice(_PREFIXES)}{alias.title()}{rng.choice(_SUFFIXES)}")
+        names.append(" ".join(alias.upper()))                   # OCR letter spacing
+    for _ in range(2000):                                       # two aliases run together
+        names.append(f"{rng.choice(aliases)} {rng.choice(aliases)}".title())
+    names.extend(_UNMATCHED)
+    return names
+
+
+def _time(fn, names: list[str], runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for name in names:
+            fn(name)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def _uncached(name: str):
+    return _canonicalize.__wrapped__(name)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    names = _corpus()
+
+    mismatches = 0
+    for name in names:
+        legacy, new = _legacy_canonicalize(name), _uncached(name)
+        if legacy != new:
+            mismatches += 1
+            if mismatches <= 10:
+                print(f"MISMATCH {name!r}: legacy={legacy} automaton={new}")
+
+    partial = sum(1 for n in names if _legacy_canonicalize(n)[1] and n.strip().lower() not in PARAM_ALIASES)
+    print(f"{len(names)} raw names ({len(PARAM_ALIASES)} aliases, {partial} resolved past the exact lookup)")
+
+    legacy_ms = _time(_legacy_canonicalize, names, runs)
+    new_ms = _time(_uncached, names, runs)
+    print(f"unique names:   legacy {legacy_ms:>7.1f} ms ({legacy_ms * 1000 / len(names):.1f} µs/name)  "
+          f"automaton {new_ms:>6.1f} ms ({new_ms * 1000 / len(names):.1f} µs/name)  {legacy_ms / new_ms:.1f}x")
+
+    # Server workload: 300 reports of ~35 rows drawn from the names labs
+    # actually print, so most raw names repeat across reports.
+    rng = random.Random(1)
+    common = rng.sample(names, 600)
+    stream = [name for _ in range(300) for name in rng.sample(common, 35)]
+    legacy_ms = _time(_legacy_canonicalize, stream, runs)
+    _canonicalize.cache_clear()
+    memo_ms = _time(_canonicalize, stream, runs)
+    info = _canonicalize.cache_info()
+    print(f"report stream:  legacy {legacy_ms:>7.1f} ms  automaton+memo {memo_ms:>6.1f} ms  "
+          f"{legacy_ms / memo_ms:.1f}x  (memo hit rate {info.hits / (info.hits + info.misses):.0%})")
+
+    if mismatches:
+        print(f"{mismatches} mismatch(es)")
+        sys.exit(1)
+    print("outputs identical to the original implementation")
+
+
+if __name__ == "__main__":
+    main()
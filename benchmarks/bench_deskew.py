@@ -0,0 +1,111 @@
+"""
+Deskew: original 21-rotation brute force vs coarse-to-fine projection search.
+
+Synthetic lab-report pages (rows of dark "words") are tilted by known angles
+and fed to both implementations. Reports the absolute angle error and wall
+time per page. The original needs scipy and only resolves whole degrees.
+
+    python -m benchmarks.bench_deskew [--dpi 150] [--angles -7.3 -2.5 0 1.2 4.8 9.1]
+"""
+
+import argparse
+import statistics
+import time
+
+import numpy as np
+from PIL import Image, ImageDraw
+
+from utils.ocr_utils import _deskew, _estimate_skew
+
+try:
+    from scipy.ndimage import rotate as ndimage_rotate
+except ImportError:  # legacy comparison needs scipy
+    ndimage_rotate = None
+
+
+def _legacy_estimate(arr: np.ndarray) -> int:
+    """Angle search from the original _deskew (without the final rotation)."""
+    best_score = -1
+    best_angle = 0
+    for angle in range(-10, 11, 1):
+        rotated = ndimage_rotate(arr, angle, reshape=False, cval=255)
+        projection = np.sum(rotated < 128, axis=1)
+        score = np.var(projection)
+        if score > best_score:
+            best_score = score
+            best_angle = angle
+    return best_angle
+
+
+def _legacy_deskew(img: Image.Image) -> Image.Image:
+    arr = np.array(img)
+    angle = _legacy_estimate(arr)
+    if abs(angle) > 0:
+        return Image.fromarray(ndimage_rotate(arr, angle, reshape=False, cval=255))
+    return img
+
+
+def _synthetic_page(dpi: int, seed: int = 0) -> Image.Image:
+    scale = dpi / 100.0
+    width, height = int(827 * scale), int(1169 * scale)      # A4
+    rng = np.random.default_rng(seed)
+    img = Image.new("L", (width, height), 240)
+    draw = ImageDraw.Draw(img)
+    line_h, gap = int(12 * scale), int(28 * scale)
+    for top in range(int(80 * scale), height - int(80 * scale), gap):
+        x = int(60 * scale)
+        while x < width - int(120 * scale):
+            word = int(rng.integers(15, 80) * scale)
+            draw.rectangle([x, top, x + word, top + line_h], fill=25)
+            x += word + int(rng.integers(8, 20) * scale)
+    return img
+
+
+def _timed(fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    return result, (time.perf_counter() - start) * 1000
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--dpi", type=int, default=150, help="render resolution of the synthetic page")
+    ap.add_argument("--angles", type=float, nargs="+", default=[-7.3, -2.5, 0.0, 1.2, 4.8, 9.1])
+    args = ap.parse_args()
+
+    page = _synthetic_page(args.dpi)
+    print(f"page {page.width}x{page.height} @ {args.dpi} DPI")
+    print(f"{'skew':>6} | {'legacy est':>10} {'err':>5} {'ms':>8} | {'new est':>8} {'err':>5} {'ms':>7}")
+
+    legacy_err, new_err, legacy_ms, new_ms = [], [], [], []
+    for skew in args.angles:
+        tilted = page.rotate(skew, resample=Image.BICUBIC, fillcolor=240)
+        # The correcting rotation is the negative of the applied skew
+        est, ms = _timed(_estimate_skew, tilted)
+        _, full_ms = _timed(_deskew, tilted)
+        new_err.append(abs(est + skew))
+        new_ms.append(full_ms)
+        row = f"{skew:>6.1f} | "
+        if ndimage_rotate is not None:
+            legacy, _ = _timed(_legacy_estimate, np.array(tilted))
+            _, legacy_full_ms = _timed(_legacy_deskew, tilted)
+            legacy_err.append(abs(legacy + skew))
+            legacy_ms.append(legacy_full_ms)
+            row += f"{legacy:>10d} {legacy_err[-1]:>5.1f} {legacy_full_ms:>8.0f} | "
+        else:
+            row += f"{'n/a':>10} {'':>5} {'':>8} | "
+        row += f"{est:>8.1f} {new_err[-1]:>5.1f} {full_ms:>7.0f}"
+        print(row)
+
+    print(f"new:    mean |err| {statistics.mean(new_err):.2f}°, mean {statistics.mean(new_ms):.0f} ms/page")
+    if legacy_ms:
+        print(
+            f"legacy: mean |err| {statistics.mean(legacy_err):.2f}°, mean {statistics.mean(legacy_ms):.0f} ms/page "
+            f"→ {statistics.mean(legacy_ms) / statistics.mean(new_ms):.0f}x faster"
+        )
+    else:
+        print("scipy not installed — legacy comparison skipped")
+
+
+if __name__ == "__main__":
+    main()
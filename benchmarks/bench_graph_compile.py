@@ -0,0 +1,59 @@
+"""
+Per-request graph construction overhead: build-per-call vs compiled-graph registry.
+
+Before: run_full_pipeline called build_graph() + build_rag_graph() on every
+/analyze request. After: both are compiled once and fetched from
+graph.graph_registry.
+
+    python -m benchmarks.bench_graph_compile [iterations]
+"""
+
+import statistics
+import sys
+import time
+
+from graph.graph_builder import build_graph
+from graph.rag_graph_builder import build_rag_graph
+from graph.graph_registry import get_analysis_graph, get_rag_graph, reset_graphs
+
+
+def _time_per_call(fn, iterations: int) -> list:
+    samples = []
+    for _ in range(iterations):
+        start = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def _per_request_build():
+    build_graph()
+    build_rag_graph()
+
+
+def _per_request_registry():
+    get_analysis_graph()
+    get_rag_graph()
+
+
+def _report(label: str, samples: list) -> float:
+    mean = statistics.mean(samples)
+    p95 = sorted(samples)[int(len(samples) * 0.95) - 1]
+    print(f"{label:<28} mean={mean:9.3f} ms  p95={p95:9.3f} ms  n={len(samples)}")
+    return mean
+
+
+def main(iterations: int = 50):
+    reset_graphs()
+    start = time.perf_counter()
+    _per_request_registry()
+    print(f"registry warm-up (one-off)   {(time.perf_counter() - start) * 1000:9.3f} ms")
+
+    before = _report("build per request", _time_per_call(_per_request_build, iterations))
+    after = _report("compiled registry", _time_per_call(_per_request_registry, iterations))
+    if after > 0:
+        print(f"speedup: {before / after:,.0f}x  (saves {before - after:.3f} ms per /analyze)")
+
+
+if __name__ == "__main__":
+    main(int(sys.argv[1]) if len(sys.argv) > 1 else 50)
@@ -0,0 +1,129 @@
+"""
+Otsu binarization: original per-bin Python loop vs vectorized cumsum + LUT.
+
+Synthetic grayscale "scans" (light paper with noise, dark text strokes) are
+generated at common page sizes. For each page the chosen threshold and the
+binarized output of both implementations must match exactly; the script
+exits non-zero otherwise.
+
+    python -m benchmarks.bench_otsu [runs]
+"""
+
+import statistics
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+from utils.ocr_utils import _otsu_binarize, _otsu_threshold
+
+# (label, width, height) — A4 at 150/200/300 DPI, plus a phone photo
+PAGE_SIZES = [
+    ("A4 @150dpi", 1240, 1754),
+    ("A4 @200dpi", 1654, 2339),
+    ("A4 @300dpi", 2480, 3508),
+    ("phone 12MP", 3024, 4032),
+]
+
+
+# ── Original implementation (pre-vectorization), kept verbatim for parity ────
+def _legacy_threshold(arr: np.ndarray) -> int:
+    hist, bins = np.histogram(arr.flatten(), 256, [0, 256])
+    total = arr.size
+    sum_total = np.dot(np.arange(256), hist)
+
+    weight_bg = 0.0
+    sum_bg = 0.0
+    best_thresh = 0
+    best_var = 0.0
+
+    for t in range(256):
+        weight_bg += hist[t]
+        if weight_bg == 0:
+            continue
+        weight_fg = total - weight_bg
+        if weight_fg == 0:
+            break
+        sum_bg += t * hist[t]
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_total - sum_bg) / weight_fg
+        between_var = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+        if between_var > best_var:
+            best_var = between_var
+            best_thresh = t
+    return best_thresh
+
+
+def _legacy_binarize(img: Image.Image) -> Image.Image:
+    arr = np.array(img)
+    best_thresh = _legacy_threshold(arr)
+    arr_bin = (arr > best_thresh).astype(np.uint8) * 255
+    return Image.fromarray(arr_bin)
+
+
+def _synthetic_page(width: int, height: int, seed: int) -> Image.Image:
+    rng = np.random.default_rng(seed)
+    paper = rng.normal(225 - seed % 20, 12, size=(height, width))
+    # Horizontal "text lines" of dark strokes covering ~8% of the page
+    for top in range(80, height - 40, 48):
+        mask = rng.random((20, width)) < 0.35
+        line = paper[top:top + 20]
+        line[mask] = rng.normal(40 + seed % 30, 15, size=mask.sum())
+    return Image.fromarray(np.clip(paper, 0, 255).astype(np.uint8), mode="L")
+
+
+def _edge_cases() -> list:
+    return [
+        Image.new("L", (64, 64), 0),                         # all black
+        Image.new("L", (64, 64), 255),                       # all white
+        Image.new("L", (64, 64), 128),                       # single level
+        Image.fromarray(np.tile(np.arange(256, dtype=np.uint8), (16, 1)), mode="L"),
+    ]
+
+
+def _time(fn, img, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        fn(img)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    mismatches = 0
+
+    for img in _edge_cases():
+        legacy_t = _legacy_threshold(np.array(img))
+        new_t = _otsu_threshold(img.histogram())
+        if legacy_t != new_t or _legacy_binarize(img).tobytes() != _otsu_binarize(img).tobytes():
+            print(f"MISMATCH on edge case {img.size}: legacy={legacy_t} vectorized={new_t}")
+            mismatches += 1
+
+    print(f"{'page':<12} {'size':>11} {'thresh':>6} {'legacy ms':>10} {'vector ms':>10} {'speedup':>8}")
+    for seed, (label, width, height) in enumerate(PAGE_SIZES):
+        img = _synthetic_page(width, height, seed)
+        legacy_t = _legacy_threshold(np.array(img))
+        new_t = _otsu_threshold(img.histogram())
+        same_pixels = _legacy_binarize(img).tobytes() == _otsu_binarize(img).tobytes()
+        if legacy_t != new_t or not same_pixels:
+            print(f"MISMATCH on {label}: legacy={legacy_t} vectorized={new_t} pixels_equal={same_pixels}")
+            mismatches += 1
+
+        legacy_ms = _time(_legacy_binarize, img, runs)
+        new_ms = _time(_otsu_binarize, img, runs)
+        print(
+            f"{label:<12} {width:>5}x{height:<5} {new_t:>6} {legacy_ms:>10.2f} "
+            f"{new_ms:>10.2f} {legacy_ms / new_ms:>7.1f}x"
+        )
+
+    if mismatches:
+        print(f"{mismatches} threshold/output mismatch(es)")
+        sys.exit(1)
+    print("thresholds and binarized pixels identical to the original implementation")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+End-to-end wall clock of the analysis graph with a stubbed LLM.
+
+Every Groq call is replaced by a stub that sleeps for `--latency` seconds and
+returns a canned, schema-valid response, and OCR is replaced by a fixed CBC
+report, so the measured time is pure graph topology + node CPU. With
+PATTERNS_LLM_ENRICHMENT on, compares enrichment run inline in model2_patterns
+(before model3_context) against the default graph, where the enrichment call
+runs alongside model3_context.
+
+    python -m benchmarks.bench_parallel_graph --latency 1.5 --runs 3
+"""
+
+import argparse
+import json
+import statistics
+import time
+
+from langchain_core.messages import AIMessage
+
+import nodes.extract_parameters as extract_parameters
+import nodes.ingest_and_ocr as ingest_and_ocr
+import nodes.model2_patterns as model2_patterns
+import nodes.model3_context as model3_context
+import nodes.recommendations as recommendations
+import nodes.synthesis as synthesis
+from graph.graph_builder import build_graph
+from graph.graph_state import ReportState
+
+SAMPLE_REPORT = """City Diagnostics — Complete Blood Count
+Patient Name: Jane Doe    Age: 34 Years    Sex: Female
+Hemoglobin            9.8    g/dL          12.0 - 15.5   L
+Total RBC Count       3.9    mill/cumm     4.0 - 5.2     L
+Packed Cell Volume    31.2   %             36 - 46       L
+MCV                   72.4   fL            80 - 100      L
+MCH                   24.1   pg            27 - 33       L
+MCHC                  30.2   g/dL          32 - 36       L
+Total WBC Count       8,400  cells/cumm    4,000 - 11,000
+Platelet Count        2,85,000 cells/cumm  1,50,000 - 4,10,000
+"""
+
+_EXTRACTION = {
+    "report_type": "CBC",
+    "patient_name": "Jane Doe",
+    "patient_age": "34 Years",
+    "patient_gender": "Female",
+    "lab_values": [
+        {"raw_name": "Hemoglobin", "value": 9.8, "unit": "g/dL", "ref_low": 12.0, "ref_high": 15.5, "flag": "L"},
+        {"raw_name": "Total RBC Count", "value": 3.9, "unit": "mill/cumm", "ref_low": 4.0, "ref_high": 5.2, "flag": "L"},
+        {"raw_name": "Packed Cell Volume", "value": 31.2, "unit": "%", "ref_low": 36, "ref_high": 46, "flag": "L"},
+        {"raw_name": "MCV", "value": 72.4, "unit": "fL", "ref_low": 80, "ref_high": 100, "flag": "L"},
+        {"raw_name": "MCH", "value": 24.1, "unit": "pg", "ref_low": 27, "ref_high": 33, "flag": "L"},
+        {"raw_name": "MCHC", "value": 30.2, "unit": "g/dL", "ref_low": 32, "ref_high": 36, "flag": "L"},
+        {"raw_name": "Total WBC Count", "value": 8400, "unit": "cells/cumm", "ref_low": 4000, "ref_high": 11000, "flag": None},
+        {"raw_name": "Platelet Count", "value": 285000, "unit": "cells/cumm", "ref_low": 150000, "ref_high": 410000, "flag": None},
+    ],
+}
+_PATTERNS = {"patterns": ["Microcytic Anemia"], "risk_score": 5, "risk_rationale": ["Low Hemoglobin with low MCV"]}
+_CONTEXT = {"analysis": "Stubbed context analysis.", "adjusted_concerns": "None.", "urgency": "follow-up"}
+_RECS = {"recommendations": [
+    {"priority": "follow-up", "action": "Repeat CBC with iron studies.", "reason": "Microcytic indices."},
+]}
+
+
+class StubLLM:
+    """Duck-typed ChatGroq stand-in: sleeps, then answers based on the prompt's schema."""
+
+    def __init__(self, latency: float):
+        self.latency = latency
+
+    def invoke(self, messages, config=None, **kwargs):
+        time.sleep(self.latency)
+        prompt = "\n".join(str(getattr(m, "content", m)) for m in messages)
+        if '"lab_values"' in prompt:
+            payload = _EXTRACTION
+        elif '"recommendations"' in prompt:
+            payload = _RECS
+        elif '"risk_score"' in prompt:
+            payload = _PATTERNS
+        elif '"adjusted_concerns"' in prompt:
+            payload = _CONTEXT
+        else:
+            return AIMessage(content="Stubbed synthesis narrative.")
+        return AIMessage(content=json.dumps(payload))
+
+
+def _install_stubs(latency: float):
+    stub = StubLLM(latency)
+    factory = lambda *args, **kwargs: stub  # noqa: E731
+    model2_patterns.LLM_ENRICHMENT_ENABLED = True
+    for module in (extract_parameters, model2_patterns, model3_context, synthesis, recommendations):
+        for name in ("get_llm", "get_fast_llm", "get_fallback_llm"):
+            if hasattr(module, name):
+                setattr(module, name, factory)
+    ingest_and_ocr.run_ocr_multipage = lambda path: SAMPLE_REPORT
+
+
+def _run(graph_app) -> float:
+    start = time.perf_counter()
+    final = graph_app.invoke(ReportState(raw_file_path="stub_report.txt"))
+    elapsed = time.perf_counter() - start
+    errors = final.get("errors") if isinstance(final, dict) else final.errors
+    if errors:
+        raise RuntimeError(f"Benchmark run reported errors: {errors}")
+    return elapsed
+
+
+def main():
+    ap = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    ap.add_argument("--latency", type=float, default=1.0, help="seconds per stubbed LLM call")
+    ap.add_argument("--runs", type=int, default=3)
+    args = ap.parse_args()
+
+    _install_stubs(args.latency)
+    results = {}
+    # enrichment=False keeps the single model2_patterns node, which then runs
+    # the (now enabled) enrichment call inline before model3_context.
+    for label, enrichment in (("inline enrichment", False), ("parallel enrichment", True)):
+        graph_app = build_graph(fused=False, enrichment=enrichment)
+        samples = [_run(graph_app) for _ in range(args.runs)]
+        results[label] = statistics.mean(samples)
+        print(f"{label:<20} mean={results[label]:7.3f} s  min={min(samples):7.3f} s  runs={args.runs}")
+
+    saved = results["inline enrichment"] - results["parallel enrichment"]
+    print(f"latency/call={args.latency:.2f} s → parallel saves {saved:.3f} s per report")
+
+
+if __name__ == "__main__":
+    main()
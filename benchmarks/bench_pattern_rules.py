@@ -0,0 +1,162 @@
+"""
+Pattern detection: rule table evaluated locally, per report.
+
+Runs synthetic reports (SI units, scale-shifted counts, printed ranges and
+flags, unknown params, pediatric and adult patients) through validate →
+model1 → `evaluate_patterns` and checks that
+  - patterns and risk score do not depend on parameter order,
+  - the param → rule index selects the same rules as a full table scan,
+  - the anti-misdiagnosis constraints hold (Thrombocytopenia only from a LOW
+    Platelet Count, Lymphopenia only from LOW Absolute Lymphocytes).
+Exits non-zero on any violation. The LLM call this replaces took seconds per
+report; the table takes microseconds.
+
+    python -m benchmarks.bench_pattern_rules [reports]
+"""
+
+import random
+import sys
+import time
+from collections import Counter
+from types import SimpleNamespace
+
+from nodes import pattern_rules
+from nodes.model1_interpretation import model1_interpretation_node
+from nodes.pattern_rules import PATTERN_RULES, evaluate_patterns, match_rules
+from nodes.validate_standardize import SCALE_RULES, UNIT_CONVERSIONS, validate_and_standardize
+from utils.reference_ranges import gender_key, get_reference_table, load_reference_ranges
+
+_AGES = [None, "3 days", "8 Month(s)", "4 years", "10 Y", "15", "34 Years", "71 yrs", "unknown"]
+_GENDERS = [None, "Male", "female", "F", "m", "Other"]
+_FLAGS = ["H", "L", "HIGH", "low", "N", "WNL", "*", "↑", "A", " "]
+_UNKNOWN = ["Serum Zinc", "Anti-CCP", "Vitamin K", "Procalcitonin X"]
+
+
+def _report(rng: random.Random, params: list, db: dict) -> dict:
+    extracted = {}
+    for param in rng.sample(params, rng.randint(8, 40)) + rng.sample(_UNKNOWN, rng.randint(0, 2)):
+        entry = db.get(param, {})
+        ref = entry.get("reference") or {}
+        bucket = next((b for b in ref.values() if isinstance(b, dict)), ref)
+        low, high = bucket.get("low", 1.0), bucket.get("high", 10.0)
+        if not isinstance(low, (int, float)) or not isinstance(high, (int, float)):
+            low, high = 1.0, 10.0
+        value = round(rng.uniform(low * 0.3, high * 1.8 + 1), rng.choice((0, 1, 2)))
+        info = {"value": value, "unit": (entry.get("units") or [None])[0]}
+        roll = rng.random()
+        if roll < 0.05:
+            info["value"] = None
+        elif roll < 0.08:
+            info["value"] = "see note"
+        elif roll < 0.15:
+            info["value"] = f"{value:,}"
+        if param in SCALE_RULES and rng.random() < 0.5:
+            info["value"] = round(value / 1000, 2)
+        si_units = [u for (p, u) in UNIT_CONVERSIONS if p == param]
+        if si_units and rng.random() < 0.5:
+            info["unit"] = rng.choice(si_units).upper()
+        if rng.random() < 0.3:
+            info["report_ref_low"], info["report_ref_high"] = low, high
+        if rng.random() < 0.25:
+            info["report_flag"] = rng.choice(_FLAGS)
+        extracted[param] = info
+    return {
+        "extracted_params": extracted,
+        "patient_info": {"Age": rng.choice(_AGES), "Gender": rng.choice(_GENDERS)},
+    }
+
+
+def _interpret(report: dict) -> dict:
+    validated = validate_and_standardize(SimpleNamespace(**report))
+    return model1_interpretation_node(
+        SimpleNamespace(validated_params=validated["validated_params"])
+    )["param_interpretation"]
+
+
+# SI-unit reports must cross the same absolute cut-offs as their mg/dL
+# equivalents, whether validated against the DB or a printed range:
+# (extracted params, pattern expected, minimum risk score)
+SI_CASES = [
+    ({"Fasting Blood Glucose": {"value": 7.5, "unit": "mmol/L"}}, "Diabetes Mellitus", 1),
+    ({"Fasting Blood Glucose": {"value": 7.5, "unit": "mmol/L",
+                                "report_ref_low": 3.9, "report_ref_high": 5.6}}, "Diabetes Mellitus", 1),
+    ({"Fasting Blood Glucose": {"value": 6.2, "unit": "mmol/L"}}, "Impaired Fasting Glucose", 1),
+    ({"Triglycerides": {"value": 6.5, "unit": "mmol/L"}}, "Hypertriglyceridemia", pattern_rules.LIFE_THREATENING),
+]
+
+
+def _check_si_units() -> int:
+    failures = 0
+    for extracted, expected, min_risk in SI_CASES:
+        report = {"extracted_params": extracted, "patient_info": {"Age": "45 Years", "Gender": "Male"}}
+        result = evaluate_patterns(_interpret(report), report["patient_info"])
+        if expected not in result.patterns or result.risk_score < min_risk:
+            failures += 1
+            print(f"SI MISMATCH {extracted}: expected {expected!r} (risk >= {min_risk}), "
+                  f"got {result.patterns} (risk {result.risk_score})")
+    return failures
+
+
+def _full_scan(interpreted: dict, sex: str) -> list:
+    saved = pattern_rules._RULES_BY_PARAM
+    pattern_rules._RULES_BY_PARAM = {p: tuple(range(len(PATTERN_RULES))) for p in interpreted}
+    try:
+        return match_rules(interpreted, sex)
+    finally:
+        pattern_rules._RULES_BY_PARAM = saved
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    rng = random.Random(0)
+    db = load_reference_ranges()
+    params = list(db)
+    get_reference_table()
+    cases = []
+    for _ in range(count):
+        report = _report(rng, params, db)
+        cases.append((_interpret(report), report["patient_info"]))
+
+    violations = _check_si_units()
+    seen = Counter()
+    for i, (interpreted, patient_info) in enumerate(cases):
+        result = evaluate_patterns(interpreted, patient_info)
+        seen.update(result.patterns)
+        items = list(interpreted.items())
+        rng.shuffle(items)
+        problems = []
+        shuffled = evaluate_patterns(dict(items), patient_info)
+        if (shuffled.patterns, shuffled.risk_score) != (result.patterns, result.risk_score):
+            problems.append("patterns depend on parameter order")
+        if match_rules(interpreted, gender_key(patient_info.get("Gender"))) != _full_scan(
+                interpreted, gender_key(patient_info.get("Gender"))):
+            problems.append("rule index differs from full scan")
+        if "Thrombocytopenia" in result.patterns and interpreted["Platelet Count"]["status"] != "low":
+            problems.append("Thrombocytopenia without LOW Platelet Count")
+        if "Lymphopenia" in result.patterns and interpreted["Absolute Lymphocytes"]["status"] != "low":
+            problems.append("Lymphopenia without LOW Absolute Lymphocytes")
+        if not 1 <= result.risk_score <= 10:
+            problems.append(f"risk score {result.risk_score} out of range")
+        for problem in problems:
+            violations += 1
+            if violations <= 10:
+                print(f"VIOLATION report {i}: {problem}")
+
+    start = time.perf_counter()
+    for interpreted, patient_info in cases:
+        evaluate_patterns(interpreted, patient_info)
+    elapsed = time.perf_counter() - start
+    rows = sum(len(interpreted) for interpreted, _ in cases)
+
+    print(f"{count} reports, {rows} rows, {len(PATTERN_RULES)} rules, {len(seen)} distinct patterns fired")
+    print(f"evaluate_patterns  {elapsed * 1e6 / count:>7.1f} µs/report")
+    for name, n in seen.most_common(8):
+        print(f"  {n:>6}  {name}")
+    if violations:
+        print(f"{violations} violation(s)")
+        sys.exit(1)
+    print("rule output reproducible and index-equivalent to a full table scan")
+
+
+if __name__ == "__main__":
+    main()
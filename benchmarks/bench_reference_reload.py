@@ -0,0 +1,103 @@
+"""
+Reference-range hot reload: fast-path cost and the last-good-table fallback.
+
+Points `utils.reference_ranges` at a scratch copy of configs/reference_ranges.json
+and walks the file through every state the loader must survive: missing at
+startup, first load, corrupt JSON, a non-object top level, deletion, and a
+valid edit. Only a valid file may replace the table; every other state must
+keep serving the last good table (empty before the first load) and log the
+failure once per file version. The script exits non-zero otherwise.
+
+    python -m benchmarks.bench_reference_reload [calls]
+"""
+
+import json
+import logging
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from utils import reference_ranges as rr
+
+
+class _Errors(logging.Handler):
+    def __init__(self):
+        super().__init__(logging.ERROR)
+        self.count = 0
+
+    def emit(self, record):
+        self.count += 1
+
+
+def _write(path: Path, text: str, mtime_ns: int) -> None:
+    path.write_text(text)
+    os.utime(path, ns=(mtime_ns, mtime_ns))
+
+
+def main():
+    calls = int(sys.argv[1]) if len(sys.argv) > 1 else 200_000
+    source = rr.REFERENCE_RANGES_PATH.read_text()
+    errors = _Errors()
+    rr.logger.addHandler(errors)
+    failures = []
+
+    def check(step: str, ok: bool, logged: int):
+        if not ok or errors.count != logged:
+            failures.append(step)
+            print(f"FAIL {step}: params={len(rr._table)} loads={rr._loads} errors logged={errors.count}")
+
+    scratch = Path(tempfile.mkdtemp(prefix="ref_reload_"))
+    path = scratch / "reference_ranges.json"
+    saved = (rr.REFERENCE_RANGES_PATH, rr._table, rr._failed_mtime, rr._loads)
+    rr.REFERENCE_RANGES_PATH = path
+    rr._table, rr._failed_mtime, rr._loads = rr.ReferenceRangeTable({}, mtime=rr._NOT_LOADED), rr._NOT_LOADED, 0
+    try:
+        empty = rr.get_reference_table()
+        rr.get_reference_table()
+        check("missing at startup keeps the empty table", len(empty) == 0, 1)
+
+        _write(path, source, 1_000_000_000)
+        good = rr.get_reference_table()
+        check("first load", len(good) > 0 and rr._loads == 1, 1)
+
+        _write(path, source[: len(source) // 2], 2_000_000_000)
+        kept = rr.get_reference_table()
+        rr.get_reference_table()
+        check("corrupt JSON keeps the last good table", kept is good, 2)
+
+        _write(path, "[]", 3_000_000_000)
+        check("non-object JSON keeps the last good table", rr.get_reference_table() is good, 3)
+
+        path.unlink()
+        kept = rr.get_reference_table()
+        rr.get_reference_table()
+        check("deleted file keeps the last good table", kept is good, 4)
+
+        edited = json.loads(source)
+        edited.pop(next(iter(edited)))
+        _write(path, json.dumps(edited), 4_000_000_000)
+        reloaded = rr.get_reference_table()
+        check("valid edit is swapped in",
+              reloaded is not good and len(reloaded) == len(good) - 1 and reloaded.digest != good.digest, 4)
+
+        start = time.perf_counter()
+        for _ in range(calls):
+            rr.get_reference_table()
+        elapsed = time.perf_counter() - start
+        print(f"get_reference_table: {elapsed * 1e6 / calls:.2f} µs/call on an unchanged file")
+    finally:
+        rr.REFERENCE_RANGES_PATH, rr._table, rr._failed_mtime, rr._loads = saved
+        rr.logger.removeHandler(errors)
+        shutil.rmtree(scratch, ignore_errors=True)
+
+    if failures:
+        print(f"{len(failures)} reload check(s) failed")
+        sys.exit(1)
+    print("invalid or missing files keep the last good table; valid edits reload")
+
+
+if __name__ == "__main__":
+    main()
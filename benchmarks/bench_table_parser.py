@@ -0,0 +1,99 @@
+"""
+Deterministic table parser: regression rows + parse throughput.
+
+Every row in ROWS must parse to the expected (canonical name, value, unit) —
+or be rejected (None) so the LLM handles it. Analyte names that contain
+numbers ("CA 125", "Free T 3", "Vitamin D 25 Hydroxy") used to be split at
+the first number and read as Calcium / Free Testosterone / Vitamin D = 25.
+Two-column layouts must not lose their right-hand analyte: flattened lines
+are rejected, and layout rows (" | " cell boundaries) split per analyte.
+The script exits non-zero on any mismatch, then times a 60-row panel.
+
+    python -m benchmarks.bench_table_parser [runs]
+"""
+
+import statistics
+import sys
+import time
+
+from nodes.extract_parameters import _canonicalize, _parse_table_row, _parse_table_text, _row_segments
+
+# line → (canonical, value, unit) or None (must be left to the LLM)
+ROWS = {
+    # Names containing numbers
+    "CA 125  12 U/mL 0 - 35": ("CA-125", 12.0, "U/mL"),
+    "CA 19 9 15 U/mL": ("CA 19-9", 15.0, "U/mL"),
+    "Free T 3 3.1 pg/mL": ("Free T3", 3.1, "pg/mL"),
+    "Free T 4 1.2 ng/dL 0.8 - 1.8": ("Free T4", 1.2, "ng/dL"),
+    "Vitamin D 25 Hydroxy 18.2 ng/mL": ("Vitamin D", 18.2, "ng/mL"),
+    # Ambiguous without an alias: value followed by another bare number,
+    # or a "unit" made of words
+    "CA 72 4 3.1 U/mL": None,
+    "Calcium 9 9.1 mg/dL": None,
+    "Hb 10.2 g/dl Colorimetric 12-16": None,
+    # Two analytes flattened onto one line
+    "Hemoglobin  9.8  g/dL  12.0 - 15.5  Platelet Count  250000 /cumm": None,
+    "Hemoglobin  9.8  g/dL  WBC  7000  /cumm": None,
+    # Ordinary rows must keep parsing
+    "Hemoglobin 13.5 g/dL 13.0 - 17.0 L": ("Hemoglobin", 13.5, "g/dL"),
+    "Hemoglobin 13.5 13.0 - 17.0": ("Hemoglobin", 13.5, None),
+    "Total WBC count 7800 cells/cumm 4000 - 11000": ("Total WBC count", 7800.0, "cells/cumm"),
+    "Platelet Count 2.5 lakhs/cumm 1.5 - 4.5": ("Platelet Count", 2.5, "lakhs/cumm"),
+    "Calcium 9.1 mg/dL 8.5-10.5": ("Calcium", 9.1, "mg/dL"),
+    "TSH 2.1 uIU/mL 0.4 to 4.2": ("TSH", 2.1, "uIU/mL"),
+    "Glucose Fasting 96 mg/dL <100": ("Fasting Blood Glucose", 96.0, "mg/dL"),
+}
+
+# Layout rows rebuilt from PDF word boxes → every analyte on the row
+LAYOUT_ROWS = {
+    "Hemoglobin | 9.8 | g/dL | 12.0 - 15.5 | Platelet Count | 250000 | /cumm": [
+        ("Hemoglobin", 9.8, "g/dL"), ("Platelet Count", 250000.0, "/cumm"),
+    ],
+    "Hemoglobin | 9.8 | g/dL | WBC | 7000 | /cumm": [
+        ("Hemoglobin", 9.8, "g/dL"), ("Total WBC count", 7000.0, "/cumm"),
+    ],
+    "MCHC | 30.2 | g/dL | 32 - 36 | L": [("MCHC", 30.2, "g/dL")],
+    "Total WBC Count | 8,400 | cells/cumm | 4,000 - 11,000": [("Total WBC count", 8400.0, "cells/cumm")],
+}
+
+_PANEL_ROWS = [line for line, expected in ROWS.items() if expected is not None]
+
+
+def _parsed(line: str):
+    row = _parse_table_row(line)
+    return None if row is None else (_canonicalize(row["raw_name"])[0], row["value"], row["unit"])
+
+
+def _check() -> int:
+    mismatches = 0
+    for line, expected in ROWS.items():
+        got = _parsed(line)
+        if got != expected:
+            mismatches += 1
+            print(f"MISMATCH {line!r}: expected {expected!r}, got {got!r}")
+    for line, expected in LAYOUT_ROWS.items():
+        got = [_parsed(segment) for segment in _row_segments(line)]
+        if got != expected:
+            mismatches += 1
+            print(f"MISMATCH {line!r}: expected {expected!r}, got {got!r}")
+    return mismatches
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    mismatches = _check()
+
+    text = "\n".join(_PANEL_ROWS[i % len(_PANEL_ROWS)] for i in range(60))
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        _parse_table_text(text)
+        samples.append((time.perf_counter() - start) * 1000)
+    print(f"{len(ROWS) + len(LAYOUT_ROWS)} regression rows, {mismatches} mismatch(es)")
+    print(f"60-row panel: {statistics.median(samples):.2f} ms median over {runs} runs")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""
+Unit conversion: original per-call normalisation + tuple-key lookup vs UnitRegistry.
+
+The corpus is every (param, unit) pair a lab is likely to print: each curated
+param with its DB units and every UNIT_CONVERSIONS source unit, in the
+typographic variants seen on real reports ("µmol/L", "umol / l", "x 10³/µL",
+"MG/DL"). `apply_unit_conversion` must return exactly what the original did
+for every pair, and `UNITS.transform` with the param's DB units (the
+validation path) must match an uncached resolution including the
+UNIT_INCOMPATIBLE dimension check. Both paths are interleaved on the shared
+registry so a cache that mixes up `db_units` shows up as a mismatch; the
+script exits non-zero otherwise.
+
+    python -m benchmarks.bench_units [runs]
+"""
+
+import random
+import statistics
+import sys
+import time
+
+from nodes.validate_standardize import (
+    UNIT_CONVERSIONS,
+    UNIT_INCOMPATIBLE,
+    UNITS,
+    _normalise_unit,
+    apply_unit_conversion,
+    unit_dimension,
+)
+from utils.reference_ranges import get_reference_table, load_reference_ranges
+
+
+# ── Original implementation (pre-registry), kept verbatim for parity ────────
+def _legacy_normalise_unit(raw_unit: str) -> str:
+    if not raw_unit:
+        return ""
+    u = raw_unit.strip()
+    u = u.replace("\u03bc", "u").replace("\u00b5", "u")
+    for sup, dig in [("³", "3"), ("²", "2"), ("⁹", "9"), ("¹", "1"), ("⁰", "0")]:
+        u = u.replace(sup, dig)
+    u = u.replace("×", "x").replace("·", "")
+    u = u.replace(" ", "").replace("(", "").replace(")", "").replace(".", "")
+    return u.lower()
+
+
+def _legacy_apply_unit_conversion(param, raw_unit, value):
+    if not raw_unit:
+        return value
+    normalised = _legacy_normalise_unit(raw_unit)
+    conversion = UNIT_CONVERSIONS.get((param, normalised))
+    if conversion:
+        factor = conversion[0]
+        offset = conversion[2] if len(conversion) > 2 else 0.0
+        return (value * factor) + offset
+    return value
+
+
+def _reference_transform(param, raw_unit, db_units):
+    """UnitRegistry.transform without the cache: conversion, else dimension check."""
+    if not raw_unit:
+        return None
+    norm = _normalise_unit(raw_unit)
+    conversion = UNIT_CONVERSIONS.get((param, norm))
+    if conversion:
+        return (conversion[0], conversion[2] if len(conversion) > 2 else 0.0, conversion[1])
+    if not db_units or norm in {_normalise_unit(u) for u in db_units}:
+        return None
+    raw_dim, db_dim = unit_dimension(norm), unit_dimension(db_units[0])
+    if raw_dim and db_dim and raw_dim != db_dim:
+        return UNIT_INCOMPATIBLE
+    return None
+
+
+def _variants(unit: str) -> list:
+    return [
+        unit,
+        unit.upper(),
+        unit.replace("u", "µ", 1),
+        unit.replace("u", "μ", 1),
+        unit.replace("/", " / "),
+        unit.replace("^3", "³").replace("^9", "⁹"),
+        f" {unit}.",
+    ]
+
+
+def _corpus(table) -> list:
+    pairs = []
+    params = {p for p, _ in UNIT_CONVERSIONS} | set(load_reference_ranges())
+    for param in sorted(params):
+        units = list(table.units(param)) + [u for p, u in UNIT_CONVERSIONS if p == param]
+        units += ["mg/dL", "mmol/L", "%", "cells/cumm", "IU/L", "", None, "garbage"]
+        for unit in units:
+            for variant in _variants(unit) if unit else [unit]:
+                pairs.append((param, variant))
+    return pairs
+
+
+def _time(fn, pairs, values, runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        for (param, unit), value in zip(pairs, values):
+            fn(param, unit, value)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    table = get_reference_table()
+    pairs = _corpus(table)
+    rng = random.Random(0)
+    values = [rng.uniform(0.1, 500) for _ in pairs]
+
+    mismatches = 0
+    incompatible = 0
+    for (param, unit), value in zip(pairs, values):
+        legacy = _legacy_apply_unit_conversion(param, unit, value)
+        new = apply_unit_conversion(param, unit, value)
+        if legacy != new:
+            mismatches += 1
+            if mismatches <= 10:
+                print(f"MISMATCH {param!r} {unit!r}: legacy={legacy} registry={new}")
+        db_units = table.units(param)
+        expected = _reference_transform(param, unit, db_units)
+        got = UNITS.transform(param, unit, db_units)
+        incompatible += got is UNIT_INCOMPATIBLE
+        if got != expected:
+            mismatches += 1
+            if mismatches <= 10:
+                print(f"MISMATCH {param!r} {unit!r} db_units={db_units}: "
+                      f"reference={expected} registry={got}")
+    print(f"{len(pairs)} (param, unit) pairs, {incompatible} rejected by the dimension check")
+
+    # Report-shaped workload: the same pairs recur across many reports
+    stream_pairs = [rng.choice(pairs) for _ in range(200_000)]
+    stream_values = [rng.uniform(0.1, 500) for _ in stream_pairs]
+    legacy_ms = _time(_legacy_apply_unit_conversion, stream_pairs, stream_values, runs)
+    new_ms = _time(apply_unit_conversion, stream_pairs, stream_values, runs)
+    print(f"legacy   {legacy_ms:>8.1f} ms  ({legacy_ms * 1000 / len(stream_pairs):.2f} µs/call)")
+    print(f"registry {new_ms:>8.1f} ms  ({new_ms * 1000 / len(stream_pairs):.2f} µs/call)  "
+          f"{legacy_ms / new_ms:.1f}x")
+
+    if mismatches:
+        print(f"{mismatches} mismatch(es)")
+        sys.exit(1)
+    print("conversions identical to the original implementation")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,136 @@
+"""
+Anti-hallucination check: original per-value regex scans vs numeric-token index.
+
+A synthetic comprehensive panel (60 rows with Indian/US thousands separators,
+ranges, dates, negative values) is checked against every extracted value plus
+near-miss decoys. Random fuzz texts cover the boundary cases of the original
+`(?<!\\d)…(?!\\d)` search. Both implementations must agree everywhere; the
+script exits non-zero otherwise.
+
+    python -m benchmarks.bench_value_index [runs]
+"""
+
+import random
+import re
+import statistics
+import sys
+import time
+
+from nodes.extract_parameters import _numeric_tokens, _value_in_text
+
+
+# ── Original implementation (pre-index), kept verbatim for parity ───────────
+def _legacy_value_in_text(value: float, text: str) -> bool:
+    if value is None:
+        return False
+    normalized = re.sub(r"[,\u00a0]", "", text)
+    candidates = set()
+    if value == int(value):
+        ival = int(value)
+        candidates.add(str(ival))
+        candidates.add(f"{ival}.0")
+    else:
+        for prec in (1, 2, 3, 4):
+            s = f"{value:.{prec}f}"
+            candidates.add(s)
+            stripped = s.rstrip("0").rstrip(".")
+            if stripped and "." in stripped:
+                candidates.add(stripped)
+    for c in candidates:
+        if not c:
+            continue
+        pattern = r"(?<!\d)" + re.escape(c) + r"(?!\d)"
+        if re.search(pattern, normalized):
+            return True
+    return False
+
+
+def _panel(rng: random.Random, rows: int = 60) -> tuple[str, list[float]]:
+    lines = ["Patient Name: Test Patient   Age: 45 Years   Sex: Male",
+             "Collected: 12/03/2025 08:41   Reported: 12-03-2025 14:02",
+             "Test Name            Result    Unit         Reference Range"]
+    values = []
+    for i in range(rows):
+        kind = rng.random()
+        if kind < 0.2:
+            value = float(rng.randrange(1000, 500000, 100))
+            shown = f"{int(value):,}" if rng.random() < 0.5 else f"{int(value):,}".replace(",", "\u00a0")
+        elif kind < 0.5:
+            value = float(rng.randrange(1, 300))
+            shown = str(int(value))
+        elif kind < 0.9:
+            value = round(rng.uniform(0.01, 200), rng.choice((1, 2)))
+            shown = f"{value:.{rng.choice((1, 2, 3))}f}"
+        else:
+            value = -round(rng.uniform(0.1, 9), 1)
+            shown = f"{value:.1f}"
+        values.append(value)
+        low = rng.randrange(1, 50)
+        lines.append(f"Parameter {i:<12} {shown:<9} unit/L   {low} - {low * 3}.5")
+    lines.append("Page 1 of 2 — End of report")
+    return "\n".join(lines), values
+
+
+def _decoys(rng: random.Random, values: list[float]) -> list[float]:
+    decoys = []
+    for v in values:
+        decoys.extend((v + 0.1, v * 10, round(v, 0), v / 10, -v))
+    decoys.extend(rng.uniform(0, 1000) for _ in range(50))
+    return decoys
+
+
+def _fuzz(rng: random.Random, cases: int) -> int:
+    alphabet = "0123456789.-,\u00a0 x/\u0661\u00b2"   # NBSP, Arabic-Indic digit, superscript two
+    mismatches = 0
+    for _ in range(cases):
+        text = "".join(rng.choice(alphabet) for _ in range(rng.randint(0, 14)))
+        value = rng.choice((
+            float(rng.randint(-20, 20)),
+            round(rng.uniform(-20, 20), rng.randint(1, 4)),
+        ))
+        if _legacy_value_in_text(value, text) != _value_in_text(value, text):
+            mismatches += 1
+            if mismatches <= 10:
+                print(f"MISMATCH fuzz value={value!r} text={text!r}")
+    return mismatches
+
+
+def _time(fn, text: str, values: list[float], runs: int) -> float:
+    samples = []
+    for _ in range(runs):
+        _numeric_tokens.cache_clear()   # count the one-off index build
+        start = time.perf_counter()
+        for v in values:
+            fn(v, text)
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples)
+
+
+def main():
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 5
+    rng = random.Random(0)
+    mismatches = _fuzz(rng, 200_000)
+
+    for rows in (20, 60, 120):
+        text, values = _panel(rng, rows)
+        probes = values + _decoys(rng, values)
+        for v in probes:
+            if _legacy_value_in_text(v, text) != _value_in_text(v, text):
+                mismatches += 1
+                print(f"MISMATCH panel rows={rows} value={v!r}")
+        found = sum(_value_in_text(v, text) for v in values)
+        legacy_ms = _time(_legacy_value_in_text, text, values, runs)
+        new_ms = _time(_value_in_text, text, values, runs)
+        print(
+            f"{rows:>3} rows ({len(text):>5} chars, {found}/{len(values)} grounded): "
+            f"legacy {legacy_ms:>7.2f} ms  index {new_ms:>6.2f} ms  {legacy_ms / new_ms:>5.1f}x"
+        )
+
+    if mismatches:
+        print(f"{mismatches} mismatch(es)")
+        sys.exit(1)
+    print("results identical to the original implementation (panels + 200k fuzz cases)")
+
+
+if __name__ == "__main__":
+    main()
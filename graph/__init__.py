@@ -1,3 +1,3 @@
 """App package for Health AI project."""
 
-__all__ = ["main", "graph_state", "graph_builder"]
+__all__ = ["main", "graph_state", "graph_builder", "graph_registry"]
@@ -1,3 +1,5 @@
+import os
+
 from langgraph.graph import StateGraph, END
 from graph.graph_state import ReportState
 
@@ -5,30 +7,88 @@ from nodes.ingest_and_ocr import ingest_and_ocr_node
 from nodes.extract_parameters import extract_parameters_node
 from nodes.validate_standardize import validate_standardize_node
 from nodes.model1_interpretation import model1_interpretation_node
-from nodes.model2_patterns import model2_patterns_node
+from nodes.model2_patterns import (
+    LLM_ENRICHMENT_ENABLED,
+    model2_patterns_node,
+    model2_rules_node,
+    patterns_enrichment_node,
+)
 from nodes.model3_context import model3_context_node
 from nodes.synthesis import synthesis_node
 from nodes.recommendations import recommendations_node
+from nodes.fused_analysis import fused_analysis_node
+
+# Set PIPELINE_FUSED_ANALYSIS=1 to produce context, synthesis and
+# recommendations from one LLM call (nodes/fused_analysis.py).
+FUSED_ANALYSIS = os.environ.get("PIPELINE_FUSED_ANALYSIS", "0").strip().lower() in ("1", "true", "yes")
+
+
+def build_graph(fused: bool = None, enrichment: bool = None):
+    """
+    Build the analysis DAG.
+
+    Default topology:
+
+        ingest → extract → validate → model1 → model2_patterns → model3_context → synthesis → recommendations
+
+    With pattern enrichment (PATTERNS_LLM_ENRICHMENT=1) model2_patterns only
+    evaluates the rule table, and the enrichment call runs concurrently with
+    model3_context, joining before synthesis:
+
+        … → model2_patterns ─┬─ patterns_enrichment ─┬─ synthesis → recommendations
+                             └─ model3_context ──────┘
+
+    model3 sees the rule patterns; the LLM's extra patterns and raised risk
+    score reach synthesis and recommendations. ReportState.errors carries an
+    add-reducer so both branches can report failures.
+
+    Fused topology (PIPELINE_FUSED_ANALYSIS=1):
+
+        ingest → extract → validate → model1 → model2_patterns → fused_analysis
+
+    model2 is rule-based, so running it first costs nothing and gives the
+    LLM calls after it the detected patterns. The fused call needs the final
+    patterns, so enrichment (if enabled) runs inside model2_patterns there.
+    """
+    if fused is None:
+        fused = FUSED_ANALYSIS
+    if enrichment is None:
+        enrichment = LLM_ENRICHMENT_ENABLED
 
-def build_graph():
     workflow = StateGraph(ReportState)
 
     workflow.add_node("ingest_and_ocr", ingest_and_ocr_node)
     workflow.add_node("extract_parameters", extract_parameters_node)
     workflow.add_node("validate_standardize", validate_standardize_node)
     workflow.add_node("model1_interpretation", model1_interpretation_node)
-    workflow.add_node("model2_patterns", model2_patterns_node)
-    workflow.add_node("model3_context", model3_context_node)
-    workflow.add_node("synthesis", synthesis_node)
-    workflow.add_node("recommendations", recommendations_node)
+    parallel_enrichment = enrichment and not fused
+    workflow.add_node("model2_patterns", model2_rules_node if parallel_enrichment else model2_patterns_node)
 
     workflow.set_entry_point("ingest_and_ocr")
     workflow.add_edge("ingest_and_ocr", "extract_parameters")
     workflow.add_edge("extract_parameters", "validate_standardize")
     workflow.add_edge("validate_standardize", "model1_interpretation")
+
+    if fused:
+        workflow.add_node("fused_analysis", fused_analysis_node)
+        workflow.add_edge("model1_interpretation", "model2_patterns")
+        workflow.add_edge("model2_patterns", "fused_analysis")
+        workflow.add_edge("fused_analysis", END)
+        return workflow.compile()
+
+    workflow.add_node("model3_context", model3_context_node)
+    workflow.add_node("synthesis", synthesis_node)
+    workflow.add_node("recommendations", recommendations_node)
+
     workflow.add_edge("model1_interpretation", "model2_patterns")
     workflow.add_edge("model2_patterns", "model3_context")
-    workflow.add_edge("model3_context", "synthesis")
+    if parallel_enrichment:
+        # Enrichment's Groq call and model3's run in the same superstep
+        workflow.add_node("patterns_enrichment", patterns_enrichment_node)
+        workflow.add_edge("model2_patterns", "patterns_enrichment")
+        workflow.add_edge(["model3_context", "patterns_enrichment"], "synthesis")
+    else:
+        workflow.add_edge("model3_context", "synthesis")
     workflow.add_edge("synthesis", "recommendations")
     workflow.add_edge("recommendations", END)
 
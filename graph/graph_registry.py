@@ -0,0 +1,76 @@
+"""
+Process-wide registry of compiled LangGraph apps.
+
+`StateGraph.compile()` validates the topology and builds the Pregel runtime
+from scratch, so calling `build_graph()` / `build_rag_graph()` per request
+repeats that work on every upload. Compiled graphs carry no per-run state
+(no checkpointer is attached), which makes a single instance safe to invoke
+concurrently from API worker threads, Streamlit reruns and batch scripts.
+"""
+
+import logging
+import threading
+import time
+
+from graph.graph_builder import build_graph
+from graph.rag_graph_builder import build_rag_graph
+
+logger = logging.getLogger(__name__)
+
+ANALYSIS_GRAPH = "analysis"
+RAG_GRAPH = "rag"
+
+_BUILDERS = {
+    ANALYSIS_GRAPH: build_graph,
+    RAG_GRAPH: build_rag_graph,
+}
+
+_compiled: dict = {}
+_compiled_lock = threading.Lock()
+
+
+def get_compiled_graph(name: str):
+    """Return the compiled graph registered under `name`, building it once on first use."""
+    graph_app = _compiled.get(name)
+    if graph_app is None:
+        with _compiled_lock:
+            graph_app = _compiled.get(name)
+            if graph_app is None:
+                builder = _BUILDERS.get(name)
+                if builder is None:
+                    raise KeyError(f"Unknown graph '{name}'. Known: {sorted(_BUILDERS)}")
+                start = time.perf_counter()
+                graph_app = builder()
+                _compiled[name] = graph_app
+                logger.info(
+                    f"graph_registry: compiled '{name}' graph in "
+                    f"{(time.perf_counter() - start) * 1000:.1f} ms"
+                )
+    return graph_app
+
+
+def get_analysis_graph():
+    """Compiled analysis graph for the active topology (see `build_graph`), ingest through the final LLM node."""
+    return get_compiled_graph(ANALYSIS_GRAPH)
+
+
+def get_analysis_node_names() -> list:
+    """Node names of the compiled analysis graph for the active topology (progress reporting)."""
+    return [name for name in get_analysis_graph().nodes if not name.startswith("__")]
+
+
+def get_rag_graph():
+    """Compiled single-node RAG indexing graph."""
+    return get_compiled_graph(RAG_GRAPH)
+
+
+def warm_up_graphs() -> None:
+    """Compile every registered graph up front (called from the API lifespan)."""
+    for name in _BUILDERS:
+        get_compiled_graph(name)
+
+
+def reset_graphs() -> None:
+    """Drop compiled graphs so the next call rebuilds them (e.g. after a topology change)."""
+    with _compiled_lock:
+        _compiled.clear()
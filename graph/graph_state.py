@@ -1,10 +1,14 @@
+import operator
 from pydantic import BaseModel
-from typing import Dict, Any, Optional, List
+from typing import Annotated, Dict, Any, Optional, List
 
 class ReportState(BaseModel):
     raw_file_path: Optional[str] = None
     raw_text: Optional[str] = None
+    # Native PDFs only: table rows rebuilt from word boxes, cells joined by " | "
+    layout_rows: List[str] = []
     report_type: Optional[str] = None          # detected panel type: CBC, LFT, LIPID, etc.
+    extraction_path: Optional[str] = None      # table_parser | vision_llm | text_llm
     extracted_params: Dict[str, Dict[str, Any]] = {}
     validated_params: Dict[str, Dict[str, Any]] = {}
     param_interpretation: Dict[str, Dict[str, Any]] = {}
@@ -26,4 +30,7 @@ class ReportState(BaseModel):
     # RAG Context
     rag_collection_name: Optional[str] = None
     
-    errors: List[str] = []
\ No newline at end of file
+    # Add-reducer: parallel branches (patterns_enrichment ‖ model3) may both
+    # report errors in the same superstep. Nodes return ONLY their new errors;
+    # LangGraph appends.
+    errors: Annotated[List[str], operator.add] = []
@@ -1,34 +1,120 @@
-from graph.graph_builder import build_graph
-from graph.rag_graph_builder import build_rag_graph
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from graph.graph_registry import get_analysis_graph, get_rag_graph
 from graph.graph_state import ReportState
+from utils.pdf_utils import pdf_session
 from dotenv import load_dotenv
 
 # Ensure env vars are loaded for Qdrant Cloud
 load_dotenv()
 
-def run_full_pipeline(file_path):
-    # 1. Run Analysis Graph
-    graph_app = build_graph()
+logger = logging.getLogger(__name__)
+
+# RAG indexing (chunk → embed → FAISS persist) only needs raw_text, so it runs
+# on this pool as soon as ingest_and_ocr finishes, overlapping the extraction
+# and LLM nodes. Embedding is CPU-bound while the LLM nodes mostly wait on
+# Groq, so two threads are enough for the single-worker deployment.
+_RAG_INDEX_WORKERS = 2
+_rag_executor = ThreadPoolExecutor(max_workers=_RAG_INDEX_WORKERS, thread_name_prefix="rag-index")
+
+
+def _state_get(state, key):
+    if isinstance(state, dict):
+        return state.get(key)
+    return getattr(state, key, None)
+
+
+def _run_rag_indexing(raw_text, file_path):
+    """Invoke the compiled RAG graph on a fresh state holding only the text to index."""
+    rag_app = get_rag_graph()
+    return rag_app.invoke(ReportState(raw_file_path=file_path, raw_text=raw_text))
+
+
+# Final item of iter_full_pipeline: (PIPELINE_DONE, final ReportState)
+PIPELINE_DONE = "__done__"
+# With stream_tokens=True: (PIPELINE_TOKEN, {"node", "message_id", "text"})
+PIPELINE_TOKEN = "__token__"
+
+# Nodes whose completions are free text worth showing while they generate.
+# The JSON-producing nodes (model3_context, recommendations, fused_analysis)
+# are only useful once parsed, so their tokens are not forwarded.
+TOKEN_STREAM_NODES = frozenset({"synthesis"})
+
+
+def iter_full_pipeline(file_path, stream_tokens: bool = False):
+    """
+    Run the analysis + RAG indexing pipeline, yielding `(node_name, update)` as
+    each analysis node finishes and `(PIPELINE_DONE, final_state)` last.
+
+    `update` is the partial state the node returned, so callers can show
+    validated parameters and flags long before the LLM nodes are done.
+    With `stream_tokens`, `(PIPELINE_TOKEN, ...)` items carry the synthesis
+    report as Groq generates it; the node's update still holds the full text.
+    A new `message_id` means the node retried (fallback model) and earlier
+    tokens should be discarded. Closing the generator early stops the graph
+    after the node in progress.
+    """
+    # 1. Run Analysis Graph (compiled once per process, shared across requests).
+    # Node updates drive progress reporting; full-state snapshots let RAG
+    # indexing start the moment raw_text exists instead of after
+    # recommendations — /analyze latency is then max(analysis, indexing)
+    # rather than their sum.
+    graph_app = get_analysis_graph()
     initial_state = ReportState(raw_file_path=file_path)
-    final_state = graph_app.invoke(initial_state)
+
+    # "messages" attaches LangGraph's token handler to every LLM call made
+    # inside a node, so it is only requested when a caller wants tokens.
+    stream_mode = ["updates", "values", "messages"] if stream_tokens else ["updates", "values"]
+
+    final_values = initial_state
+    rag_future = None
+    # Ingest, OCR and vision extraction share one open PDF; the session is
+    # released (closing the file and its cached renders) when the graph is done.
+    with pdf_session(file_path):
+        for mode, chunk in graph_app.stream(initial_state, stream_mode=stream_mode):
+            if mode == "messages":
+                message, metadata = chunk
+                node_name = metadata.get("langgraph_node")
+                if node_name in TOKEN_STREAM_NODES and isinstance(message.content, str) and message.content:
+                    yield PIPELINE_TOKEN, {"node": node_name, "message_id": message.id, "text": message.content}
+                continue
+            if mode == "updates":
+                for node_name, update in chunk.items():
+                    yield node_name, update or {}
+                continue
+            final_values = chunk
+            raw_text = _state_get(chunk, "raw_text")
+            if rag_future is None and raw_text:
+                logger.info("run_pipeline: raw_text ready — starting RAG indexing in background")
+                rag_future = _rag_executor.submit(_run_rag_indexing, raw_text, file_path)
 
     # LangGraph may return a plain dict; normalize to ReportState
-    if isinstance(final_state, dict):
-        final_state = ReportState(**final_state)
-
-    # 2. Run RAG Indexing Graph using the state from the first graph
-    # We pass the final_state which contains the raw_text needed for indexing
-    print("--- STARTING RAG INDEXING GRAPH ---")
-    rag_app = build_rag_graph()
-    # Invoke RAG graph with the state from the previous graph
-    rag_state = rag_app.invoke(final_state)
-    
-    # Merge RAG results back if needed (though we mostly care about the side effect of indexing)
+    final_state = ReportState(**final_values) if isinstance(final_values, dict) else final_values
+
+    # 2. Join the RAG indexing branch. If ingest produced no text it never
+    # started; run it inline so the usual "no text" error is still reported.
+    if rag_future is not None:
+        rag_state = rag_future.result()
+    else:
+        rag_state = _run_rag_indexing(final_state.raw_text, file_path)
+
+    # Merge RAG results back. The RAG graph started from a fresh state, so
+    # every error it returns is new.
     if isinstance(rag_state, dict):
-        if "rag_collection_name" in rag_state:
+        if rag_state.get("rag_collection_name"):
             final_state.rag_collection_name = rag_state["rag_collection_name"]
-        if "errors" in rag_state and rag_state["errors"]:
-            if not final_state.errors: final_state.errors = []
-            final_state.errors.extend(rag_state["errors"])
+        rag_errors = rag_state.get("errors") or []
+        if rag_errors:
+            final_state.errors = list(final_state.errors) + list(rag_errors)
+
+    yield PIPELINE_DONE, final_state
 
+
+def run_full_pipeline(file_path):
+    """Run the whole pipeline and return the final ReportState."""
+    final_state = None
+    for node_name, payload in iter_full_pipeline(file_path):
+        if node_name == PIPELINE_DONE:
+            final_state = payload
     return final_state
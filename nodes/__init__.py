@@ -5,4 +5,7 @@ __all__ = [
     "extract_parameters",
     "validate_standardize",
     "model1_interpretation",
+    "batch_validation",
+    "pattern_rules",
+    "fused_analysis",
 ]
@@ -0,0 +1,293 @@
+"""
+Columnar batch validation + interpretation for many reports at once.
+
+Backfills re-score tens of thousands of stored reports whenever
+configs/reference_ranges.json changes. Running `validate_and_standardize`
+and `model1_interpretation_node` per report walks every parameter through
+Python dicts twice; here all parameters of all reports become rows of one
+table and the arithmetic runs on NumPy columns:
+
+  scale rules → unit conversion → determine_flag →
+  _compute_severity / _check_critical / deviation_pct
+
+Which range applies, the unit transform and the recorded unit come from the
+same `resolve_row` kernel validate_and_standardize uses, so the two paths
+cannot drift apart on range or unit handling. Output is identical to the
+per-report path — same dicts, same key order, same error strings — which
+benchmarks/bench_batch_validation.py verifies.
+
+    results = validate_and_interpret_batch(states)
+    results[i] == {"validated_params": ..., "errors": [...], "param_interpretation": ...}
+
+    errors, columns = score_batch(states)      # row-aligned lists, no dicts
+"""
+
+import logging
+import numpy as np
+
+from nodes.model1_interpretation import (
+    _CRITICAL_HIGH_PARAMS,
+    _CRITICAL_LOW_PARAMS,
+    _SEVERITY_THRESHOLDS,
+    _check_critical,
+    _compute_severity,
+)
+from nodes.validate_standardize import (
+    REF_DATABASE,
+    REF_NONE,
+    REF_REPORT,
+    SCALE_DOWN_RULES,
+    SCALE_RULES,
+    age_bucket,
+    determine_flag,
+    normalize_numeric,
+    parse_age_to_years,
+    resolve_row,
+)
+from utils.reference_ranges import gender_key, get_reference_table
+
+logger = logging.getLogger(__name__)
+
+_FLAG_NAMES = np.array(["NORMAL", "LOW", "HIGH"], dtype=object)
+_SEVERITY_NAMES = np.array(["unknown", "normal", "mild", "moderate", "severe", "critical"], dtype=object)
+_STATUS_CODE = {"NORMAL": 0, "LOW": 1, "HIGH": 2}
+_STATUS_NAME = {"NORMAL": "normal", "LOW": "low", "HIGH": "high"}
+_NUMBER_TYPES = (int, float)
+_COLUMNS = ("report", "param", "value", "unit", "low", "high", "flag", "ref_source",
+            "status", "severity", "deviation_pct", "is_critical")
+_PRIORITY = {
+    "normal":   "routine",
+    "mild":     "watch",
+    "moderate": "urgent",
+    "severe":   "urgent",
+    "critical": "critical",
+    "unknown":  "routine",
+}
+
+
+def _field(report, name: str):
+    if isinstance(report, dict):
+        return report.get(name)
+    return getattr(report, name, None)
+
+
+def _param_rules(param: str) -> tuple:
+    """Per-parameter constants as floats (NaN = rule absent)."""
+    up = SCALE_RULES.get(param)
+    down = SCALE_DOWN_RULES.get(param)
+    mild, moderate, _ = _SEVERITY_THRESHOLDS.get(param, _SEVERITY_THRESHOLDS["default"])
+    nan = float("nan")
+    return (
+        up["threshold"] if up else nan,
+        up["multiplier"] if up else nan,
+        down["threshold"] if down else nan,
+        down["divisor"] if down else nan,
+        mild,
+        moderate,
+        _CRITICAL_LOW_PARAMS.get(param, nan),
+        _CRITICAL_HIGH_PARAMS.get(param, nan),
+    )
+
+
+def _encode(keys) -> tuple:
+    """Dictionary-encode a column: (codes array, distinct keys in code order)."""
+    index = {}
+    codes = np.fromiter((index.setdefault(k, len(index)) for k in keys), dtype=np.intp)
+    return codes, list(index)
+
+
+def _scale_and_convert(values, rules, factor, offset):
+    """Vectorized normalize_scale + unit transform (NaN factor = no conversion)."""
+    up_thr, up_mult, down_thr, down_div = rules[:, 0], rules[:, 1], rules[:, 2], rules[:, 3]
+    with np.errstate(invalid="ignore"):
+        scale_up = values < up_thr                          # NaN threshold → False
+        candidate = values / down_div
+        scale_down = ~scale_up & (values > down_thr) & (candidate <= down_thr * 2)
+    values = np.where(scale_up, values * up_mult, np.where(scale_down, candidate, values))
+    has_conv = ~np.isnan(factor)
+    return np.where(has_conv, (values * factor) + offset, values)
+
+
+def _flags(values, lows, highs):
+    """Vectorized determine_flag as indices into _FLAG_NAMES."""
+    return np.where(values < lows, 1, np.where(values > highs, 2, 0))
+
+
+def _severity(rules, values, lows, highs, statuses):
+    """
+    Vectorized _compute_severity + _check_critical + deviation_pct.
+    `statuses`: 0 normal, 1 low, 2 high, 3 unknown. Returns (severity index,
+    is_critical bool, signed deviation in percent before rounding).
+    """
+    mild_t, mod_t, crit_low, crit_high = rules[:, 4], rules[:, 5], rules[:, 6], rules[:, 7]
+    midpoint = (lows + highs) / 2
+    zero_mid = midpoint == 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        deviation = np.abs(values - midpoint) / midpoint * 100
+        signed = (values - midpoint) / midpoint * 100
+    severity = np.select(
+        [statuses == 0, zero_mid, deviation < mild_t, deviation < mod_t],
+        [1, 2, 2, 3],
+        default=4,
+    )
+    with np.errstate(invalid="ignore"):
+        critical = ((statuses == 1) & (values <= crit_low)) | ((statuses == 2) & (values >= crit_high))
+    severity = np.where(critical, 5, severity)
+    return severity, critical, signed
+
+
+def score_batch(reports, ranges=None) -> tuple:
+    """
+    Columnar scoring of many reports: validate_and_standardize +
+    model1_interpretation_node semantics without building per-param dicts.
+
+    `reports` — ReportStates or dicts with `extracted_params` / `patient_info`.
+    `ranges`  — a ReferenceRangeTable (default: the live table).
+    Returns (errors, columns): `errors[i]` is report i's validation errors;
+    `columns` maps report/param/value/unit/low/high/flag/ref_source/status/
+    severity/deviation_pct/is_critical to row-aligned lists (one row per
+    validated parameter, in report then extraction order). Backfills that
+    only write flags and severities back to storage can stop here.
+    """
+    if ranges is None:
+        ranges = get_reference_table()
+    reports = list(reports)
+    errors = [[] for _ in reports]
+
+    # ── Gather rows: parsing, then the shared range / unit kernel ───────────
+    rows = []       # (report, param, value, RowRange, numeric bounds?)
+    for i, report in enumerate(reports):
+        patient_info = _field(report, "patient_info") or {}
+        sex_key = gender_key(patient_info.get("Gender"))
+        age_key = age_bucket(parse_age_to_years(patient_info.get("Age")))
+        report_errors = errors[i]
+        for param, info in (_field(report, "extracted_params") or {}).items():
+            raw_val = info.get("value")
+            if raw_val is None:
+                report_errors.append(f"{param}: missing value")
+                continue
+            value = normalize_numeric(raw_val)
+            if value is None:
+                report_errors.append(f"{param}: invalid numeric value '{raw_val}'")
+                continue
+            row = resolve_row(param, info, ranges, sex_key, age_key)
+            # Plain-number bounds go through NumPy; anything exotic (strings
+            # from a hand-edited state, bools) uses the scalar functions.
+            ok = (row.ref_source != REF_NONE
+                  and type(row.low) in _NUMBER_TYPES and type(row.high) in _NUMBER_TYPES)
+            rows.append((i, param, value, row, ok))
+
+    if not rows:
+        return errors, {name: [] for name in _COLUMNS}
+    n = len(rows)
+    row_report, row_param, row_value, resolved, numeric = zip(*rows)
+    source = [r.ref_source for r in resolved]
+    lows = [r.low for r in resolved]
+    highs = [r.high for r in resolved]
+    fixed = [r.flag for r in resolved]
+    nan = float("nan")
+    factors = [nan if r.factor is None else r.factor for r in resolved]
+    offsets = [nan if r.offset is None else r.offset for r in resolved]
+
+    # Per-parameter constants are looked up once per distinct param and
+    # broadcast to rows through the dictionary codes.
+    param_codes, distinct_params = _encode(row_param)
+    rules = np.array([_param_rules(p) for p in distinct_params], dtype=float).reshape(-1, 8)[param_codes]
+    src_arr = np.array(source, dtype=object)
+    numeric_arr = np.array(numeric, dtype=bool)
+
+    # ── Scale rules + unit conversion (not for report-range rows, which keep
+    #    the printed value — see validate_and_standardize) ───────────────────
+    values = np.array(row_value, dtype=float)
+    convert_idx = np.flatnonzero(src_arr != REF_REPORT)
+    if convert_idx.size:
+        values[convert_idx] = _scale_and_convert(
+            values[convert_idx],
+            rules[convert_idx],
+            np.array(factors, dtype=float)[convert_idx],
+            np.array(offsets, dtype=float)[convert_idx],
+        )
+    value_list = values.tolist()
+
+    low_arr = np.where(numeric_arr, np.array([lo if ok else 0 for lo, ok in zip(lows, numeric)], dtype=float), np.nan)
+    high_arr = np.where(numeric_arr, np.array([hi if ok else 0 for hi, ok in zip(highs, numeric)], dtype=float), np.nan)
+
+    # ── Flags: printed/pass-through flags fixed above, the rest computed ────
+    flags = _FLAG_NAMES[_flags(values, low_arr, high_arr)].tolist()
+    for j in np.flatnonzero(~numeric_arr | np.array([f is not None for f in fixed], dtype=bool)).tolist():
+        flags[j] = fixed[j] if fixed[j] is not None else determine_flag(value_list[j], lows[j], highs[j])
+
+    # ── Interpretation: severity / critical / deviation ─────────────────────
+    statuses = np.fromiter((_STATUS_CODE.get(f, 3) for f in flags), dtype=np.intp, count=n)
+    severity, critical, deviation = _severity(rules, values, low_arr, high_arr, statuses)
+    has_range = src_arr != REF_NONE
+    severity = _SEVERITY_NAMES[np.where(has_range, severity, 0)].tolist()
+    critical = (critical & has_range).tolist()
+    with_deviation = (numeric_arr & ((low_arr + high_arr) / 2 != 0)).tolist()
+    deviation_pct = [round(d, 1) if keep else None for d, keep in zip(deviation.tolist(), with_deviation)]
+    status = [_STATUS_NAME.get(f, "unknown") for f in flags]
+
+    # Non-numeric bounds (rare) take the scalar model1 path
+    for j in np.flatnonzero(has_range & ~numeric_arr).tolist():
+        param, value, low, high = row_param[j], value_list[j], lows[j], highs[j]
+        severity[j] = _compute_severity(param, value, low, high, status[j])
+        midpoint = (low + high) / 2
+        if midpoint != 0:
+            deviation_pct[j] = round((value - midpoint) / midpoint * 100, 1)
+        critical[j] = _check_critical(param, value, status[j])
+        if critical[j]:
+            severity[j] = "critical"
+
+    logger.info(
+        f"batch_validation: {len(reports)} reports, {n} values "
+        f"({source.count(REF_DATABASE)} from DB, {source.count(REF_REPORT)} from report ranges), "
+        f"{sum(critical)} critical"
+    )
+    return errors, {
+        "report": list(row_report),
+        "param": list(row_param),
+        "value": value_list,
+        "unit": [r.unit for r in resolved],
+        "low": list(lows),
+        "high": list(highs),
+        "flag": flags,
+        "ref_source": source,
+        "status": status,
+        "severity": severity,
+        "deviation_pct": deviation_pct,
+        "is_critical": critical,
+    }
+
+
+def validate_and_interpret_batch(reports, ranges=None) -> list:
+    """
+    Batch equivalent of validate_and_standardize + model1_interpretation_node.
+    Returns one {"validated_params", "errors", "param_interpretation"} per
+    report, identical to running the two nodes on each report in turn.
+    """
+    errors, cols = score_batch(reports, ranges)
+    results = [{"validated_params": {}, "errors": e, "param_interpretation": {}} for e in errors]
+    validated_out = [r["validated_params"] for r in results]
+    interpreted_out = [r["param_interpretation"] for r in results]
+    for i, param, value, unit, low, high, flag, ref_source, status, sev, deviation_pct, is_critical in zip(
+        *(cols[name] for name in _COLUMNS)
+    ):
+        reference = {"low": low, "high": high}
+        validated_out[i][param] = {
+            "value": value,
+            "unit": unit,
+            "reference": reference,
+            "flag": flag,
+            "ref_source": ref_source,
+        }
+        interpreted_out[i][param] = {
+            "value": value,
+            "unit": unit,
+            "reference": reference,
+            "status": status,
+            "severity": sev,
+            "deviation_pct": deviation_pct,
+            "is_critical": is_critical,
+            "priority": _PRIORITY[sev],
+        }
+    return results
@@ -18,6 +18,7 @@ import mimetypes
 import os
 import re
 import json
+from functools import lru_cache
 from typing import List, Optional, Union
 from langchain_core.messages import SystemMessage, HumanMessage
 from utils.llm_utils import get_fast_llm, get_llm, get_vision_llm, MEDICAL_SYSTEM_PROMPT
@@ -297,7 +298,7 @@ PARAM_ALIASES: dict[str, str] = {
     "thyrotropin": "TSH", "s. tsh": "TSH", "serum tsh": "TSH",
     "tsh3": "TSH", "tsh (3rd generation)": "TSH",
 
-    "free t3": "Free T3", "ft3": "Free T3",
+    "free t3": "Free T3", "ft3": "Free T3", "free t 3": "Free T3",
     "free triiodothyronine": "Free T3", "triiodothyronine free": "Free T3",
     "t3 (free)": "Free T3",
 
@@ -305,7 +306,7 @@ PARAM_ALIASES: dict[str, str] = {
     "triiodothyronine": "Total T3", "serum t3": "Total T3",
     "t3 (total)": "Total T3",
 
-    "free t4": "Free T4", "ft4": "Free T4",
+    "free t4": "Free T4", "ft4": "Free T4", "free t 4": "Free T4",
     "free thyroxine": "Free T4", "thyroxine free": "Free T4",
     "t4 (free)": "Free T4",
 
@@ -403,6 +404,7 @@ PARAM_ALIASES: dict[str, str] = {
     "vitamin d": "Vitamin D", "25-oh vitamin d": "Vitamin D",
     "25-hydroxyvitamin d": "Vitamin D", "vitamin d3": "Vitamin D",
     "25(oh)d": "Vitamin D", "25 oh vitamin d": "Vitamin D",
+    "vitamin d 25 hydroxy": "Vitamin D", "25 hydroxy vitamin d": "Vitamin D",
     "calcidiol": "Vitamin D",
 
     "vitamin b12": "Vitamin B12", "cobalamin": "Vitamin B12",
@@ -563,7 +565,7 @@ PARAM_ALIASES: dict[str, str] = {
     "ca-125": "CA-125", "ca 125": "CA-125", "cancer antigen 125": "CA-125",
     "ovarian cancer antigen": "CA-125",
 
-    "ca 19-9": "CA 19-9", "ca19-9": "CA 19-9", "ca-19-9": "CA 19-9",
+    "ca 19-9": "CA 19-9", "ca19-9": "CA 19-9", "ca-19-9": "CA 19-9", "ca 19 9": "CA 19-9",
     "cancer antigen 19-9": "CA 19-9", "carbohydrate antigen 19-9": "CA 19-9",
 
     "ca 15-3": "CA 15-3", "ca15-3": "CA 15-3", "ca-15-3": "CA 15-3",
@@ -706,42 +708,117 @@ _PCT_UNIT_TOKENS = {"%", "percent", "pct", "per cent"}
 # Canonical name resolution
 # ─────────────────────────────────────────────────────────────────────────────
 
-def _canonicalize(raw_name: str) -> tuple[str, bool]:
+# Noise tokens stripped before the second lookup. One alternation in list
+# order gives the same result as the old chain of str.replace calls: every
+# token is replaced by a space and whitespace is collapsed afterwards.
+_NAME_NOISE = ["serum", "blood", "plasma", "s.", "b.", "(total)", "(direct)", "(indirect)",
+               "(free)", "level", "count", "test", "assay", ",", ".", "-"]
+_NAME_NOISE_RE = re.compile("|".join(re.escape(n) for n in _NAME_NOISE))
+
+# Partial matches ignore aliases shorter than this so OCR gibberish like
+# "Poa" cannot hit 2-3 char aliases.
+_MIN_PARTIAL_ALIAS_LEN = 4
+
+
+class _AliasAutomaton:
     """
-    Map raw lab parameter name to canonical name.
-    Returns (name, matched) — `matched=False` means no alias hit (caller decides
-    whether to keep or drop based on auxiliary evidence like ref range / unit).
+    Aho-Corasick automaton over PARAM_ALIASES keys. `longest_match(text)`
+    returns the canonical name of the longest alias occurring anywhere in
+    `text` in a single pass — ties go to the alias listed first in
+    PARAM_ALIASES, exactly like the linear scan it replaces.
     """
+
+    def __init__(self, aliases: dict[str, str], min_len: int):
+        self._goto: list[dict[str, int]] = [{}]
+        # Best output per state, ranked by (alias length, -insertion index)
+        self._best: list[Optional[tuple[int, int, str]]] = [None]
+
+        for index, (alias, canonical) in enumerate(aliases.items()):
+            if len(alias) < min_len:
+                continue
+            state = 0
+            for ch in alias:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._best.append(None)
+                state = nxt
+            self._best[state] = self._pick(self._best[state], (len(alias), -index, canonical))
+
+        # Breadth-first failure links; each state inherits the best output
+        # reachable through its failure chain (its proper-suffix aliases).
+        self._fail = [0] * len(self._goto)
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fallback = self._fail[state]
+                while fallback and ch not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                target = self._goto[fallback].get(ch, 0)
+                self._fail[nxt] = target if target != nxt else 0
+                self._best[nxt] = self._pick(self._best[nxt], self._best[self._fail[nxt]])
+
+    @staticmethod
+    def _pick(a, b):
+        if a is None:
+            return b
+        if b is None:
+            return a
+        return a if a[:2] >= b[:2] else b
+
+    def longest_match(self, text: str) -> Optional[str]:
+        goto, fail, best_at = self._goto, self._fail, self._best
+        state = 0
+        best = None
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if best_at[state] is not None:
+                best = self._pick(best, best_at[state])
+        return best[2] if best else None
+
+
+_ALIAS_AUTOMATON = _AliasAutomaton(PARAM_ALIASES, _MIN_PARTIAL_ALIAS_LEN)
+
+
+@lru_cache(maxsize=4096)
+def _exact_alias(raw_name: str) -> Optional[str]:
+    """Canonical name when the whole raw name is an alias (after noise removal), else None."""
     key = raw_name.strip().lower()
 
     # 1. Exact match
     if key in PARAM_ALIASES:
-        return PARAM_ALIASES[key], True
+        return PARAM_ALIASES[key]
 
     # 2. Remove common noise tokens and retry
-    noise = ["serum", "blood", "plasma", "s.", "b.", "(total)", "(direct)", "(indirect)",
-             "(free)", "level", "count", "test", "assay", ",", ".", "-"]
-    cleaned = key
-    for n in noise:
-        cleaned = cleaned.replace(n, " ")
-    cleaned = " ".join(cleaned.split())
+    cleaned = " ".join(_NAME_NOISE_RE.sub(" ", key).split())
     if cleaned in PARAM_ALIASES:
-        return PARAM_ALIASES[cleaned], True
+        return PARAM_ALIASES[cleaned]
 
     # 2b. Try condensed (no spaces) — catches "t w b c" → "twbc"
     condensed = cleaned.replace(" ", "")
-    if condensed in PARAM_ALIASES:
-        return PARAM_ALIASES[condensed], True
-
-    # 3. Partial / contains match — require alias length >= 4 to avoid OCR
-    #    gibberish like "Poa" accidentally matching 2-3 char aliases.
-    best = None
-    best_len = 0
-    for alias, canonical in PARAM_ALIASES.items():
-        if len(alias) < 4:
-            continue
-        if alias in key and len(alias) > best_len:
-            best, best_len = canonical, len(alias)
+    return PARAM_ALIASES.get(condensed)
+
+
+@lru_cache(maxsize=4096)
+def _canonicalize(raw_name: str) -> tuple[str, bool]:
+    """
+    Map raw lab parameter name to canonical name.
+    Returns (name, matched) — `matched=False` means no alias hit (caller decides
+    whether to keep or drop based on auxiliary evidence like ref range / unit).
+    """
+    exact = _exact_alias(raw_name)
+    if exact:
+        return exact, True
+
+    key = raw_name.strip().lower()
+
+    # 3. Partial / contains match — longest alias (>= 4 chars) found in the key
+    best = _ALIAS_AUTOMATON.longest_match(key)
     if best:
         return best, True
 
@@ -766,6 +843,39 @@ _MEDICAL_STEMS = (
 )
 
 
+_DIGIT_RUN_RE = re.compile(r"\d+")
+
+
+@lru_cache(maxsize=8)
+def _numeric_tokens(text: str) -> frozenset:
+    """
+    Every numeric literal in `text` that `(?<!\\d)literal(?!\\d)` could match,
+    built in one pass: maximal digit runs ("12"), runs joined by a single dot
+    ("12.5", also "2.5" out of "1.2.5"), and a leading minus when the minus
+    itself is not preceded by a digit ("-3" but not the "5-3" range form).
+    Commas and non-breaking spaces are stripped first so "3,41,000" indexes
+    as "341000". Memoized — every value of a report checks the same text.
+    """
+    normalized = re.sub(r"[,\u00a0]", "", text)
+    runs = list(_DIGIT_RUN_RE.finditer(normalized))
+    tokens = set()
+    prev = None
+    for run in runs:
+        literals = [run.group()]
+        if prev is not None and prev.end() + 1 == run.start() and normalized[prev.end()] == ".":
+            literals.append(f"{prev.group()}.{run.group()}")
+        for literal in literals:
+            tokens.add(literal)
+            head = run.start() - len(literal) + len(run.group())   # first char of literal
+            # str.isdecimal() is the same character class as \d
+            if head >= 1 and normalized[head - 1] == "-" and not (
+                head >= 2 and normalized[head - 2].isdecimal()
+            ):
+                tokens.add("-" + literal)
+        prev = run
+    return frozenset(tokens)
+
+
 def _value_in_text(value: float, text: str) -> bool:
     """
     Check whether `value` appears literally in the raw report text.
@@ -774,8 +884,6 @@ def _value_in_text(value: float, text: str) -> bool:
     """
     if value is None:
         return False
-    # Strip commas and non-breaking spaces so "3,41,000" and "341000" both match.
-    normalized = re.sub(r"[,\u00a0]", "", text)
     candidates = set()
     if value == int(value):
         ival = int(value)
@@ -790,13 +898,9 @@ def _value_in_text(value: float, text: str) -> bool:
             stripped = s.rstrip("0").rstrip(".")
             if stripped and "." in stripped:
                 candidates.add(stripped)
-    for c in candidates:
-        if not c:
-            continue
-        pattern = r"(?<!\d)" + re.escape(c) + r"(?!\d)"
-        if re.search(pattern, normalized):
-            return True
-    return False
+    # Each candidate is looked up in the report's numeric-token index instead
+    # of re-scanning the whole text with a fresh boundary regex.
+    return not _numeric_tokens(text).isdisjoint(candidates)
 
 
 def _looks_like_ocr_garbage(name: str) -> bool:
@@ -897,6 +1001,13 @@ REPORT:
 """
 
 
+# Prefix for reports whose table rows were rebuilt from PDF word positions
+_LAYOUT_ROWS_HEADER = (
+    "(Rows rebuilt from the PDF layout — one printed line per row, "
+    "table cells separated by ' | ')\n"
+)
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Default units for canonical params (fallback when OCR misses unit)
 # ─────────────────────────────────────────────────────────────────────────────
@@ -1015,19 +1126,18 @@ def _file_to_image_data_urls(path: str) -> List[str]:
     urls: List[str] = []
     try:
         if ext == ".pdf":
-            # Render each PDF page to a JPEG via the existing OCR helper.
-            from utils.ocr_utils import _pdf_page_to_image
-            import fitz
-            doc = fitz.open(path)
-            num_pages = min(len(doc), _MAX_VISION_PAGES)
-            doc.close()
+            # Render each PDF page to a JPEG from the shared document session
+            # (the file is already open when ingest read it in this run).
+            from utils.pdf_utils import pdf_session
             from io import BytesIO
-            for pnum in range(num_pages):
-                img = _pdf_page_to_image(path, page_num=pnum, dpi=200)
-                buf = BytesIO()
-                img.convert("RGB").save(buf, format="JPEG", quality=85)
-                b64 = base64.b64encode(buf.getvalue()).decode("ascii")
-                urls.append(f"data:image/jpeg;base64,{b64}")
+            with pdf_session(path) as doc:
+                num_pages = min(doc.page_count, _MAX_VISION_PAGES)
+                for pnum in range(num_pages):
+                    img = doc.render(pnum, dpi=200)
+                    buf = BytesIO()
+                    img.convert("RGB").save(buf, format="JPEG", quality=85)
+                    b64 = base64.b64encode(buf.getvalue()).decode("ascii")
+                    urls.append(f"data:image/jpeg;base64,{b64}")
         elif ext in _IMAGE_EXTS:
             mime, _ = mimetypes.guess_type(path)
             if not mime or not mime.startswith("image/"):
@@ -1127,6 +1237,310 @@ def _call_llm_json(prompt: str, primary_llm, fallback_llm) -> dict:
     raise RuntimeError("All LLM models failed for extraction")
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Deterministic table parser — skips the extraction LLM for clean tables
+#
+# Most native-text PDFs print one parameter per line:
+#     [Name]  [Value]  [Unit]  [Ref range]  [Flag]
+# Rows are parsed with the same alias map / numeric helpers the LLM path uses
+# and produce the same `data` dict, so the post-filters below are shared.
+# The result is only trusted when enough row-shaped lines parsed cleanly;
+# otherwise the LLM runs as before.
+# ─────────────────────────────────────────────────────────────────────────────
+
+TABLE_PARSER_ENABLED = os.environ.get("EXTRACTION_TABLE_PARSER", "1").strip().lower() not in ("0", "false", "no")
+_PARSER_MIN_ROWS = 4            # fewer parsed params → not worth trusting
+_PARSER_MIN_COVERAGE = 0.8      # parsed rows / row-shaped lines
+_PARSER_MIN_CONFIDENCE = 0.75   # share of parsed rows that also carry a unit or range
+
+_VALUE_TOKEN_RE = re.compile(r"^[<>]?\d[\d,]*(?:\.\d+)?$")
+_BARE_NUMBER_RE = re.compile(r"^\d[\d,]*(?:\.\d+)?$")
+# Alphabetic unit tokens longer than _UNIT_WORD_MAX_LEN letters ("Hydroxy",
+# "Method") are words from the name or a comment column, not units.
+_UNIT_WORD_MAX_LEN = 5
+_LONG_UNIT_WORDS = {"million", "millions", "lakh", "lakhs", "thousand", "seconds", "minutes", "cells", "ratio"}
+_RANGE_RE = re.compile(
+    r"(?<![\d.])(\d[\d,]*(?:\.\d+)?)\s*(?:-|\u2013|\u2014|to)\s*(\d[\d,]*(?:\.\d+)?)(?![\d.])",
+    re.IGNORECASE,
+)
+_UPPER_BOUND_RE = re.compile(r"(?:<=?|\u2264|up\s*to|upto|less\s+than)\s*(\d[\d,]*(?:\.\d+)?)", re.IGNORECASE)
+_LOWER_BOUND_RE = re.compile(r"(?:>=?|\u2265|more\s+than|greater\s+than)\s*(\d[\d,]*(?:\.\d+)?)", re.IGNORECASE)
+_FLAG_TOKENS = {"H", "L", "HH", "LL", "HIGH", "LOW", "*", "\u2191", "\u2193", "CRITICAL"}
+# Cell boundary in layout rows (ingest_and_ocr.CELL_SEPARATOR is " | ")
+_LAYOUT_CELL_SEP = "|"
+# Lines that carry numbers but are never result rows
+_NON_ROW_RE = re.compile(
+    r"^\s*(?:patient|name|age|sex|gender|dob|date|time|ref(?:erred)?\b|dr\.?|doctor|"
+    r"sample|specimen|collected|received|reported|registered|lab\s*(?:no|id)|uhid|mrn|"
+    r"id\b|phone|mobile|page|bill|visit|barcode|accession)",
+    re.IGNORECASE,
+)
+
+_AGE_RE = re.compile(
+    r"\bage\s*(?:/\s*(?:sex|gender))?\s*[:\-]?\s*(\d{1,3}(?:\.\d+)?\s*(?:years?|yrs?|y|months?|month\(s\)|mons?|m|days?|d)?\b)",
+    re.IGNORECASE,
+)
+_GENDER_RE = re.compile(r"\b(?:sex|gender)\s*[:\-]?\s*(male|female|m|f)\b", re.IGNORECASE)
+_AGE_SEX_RE = re.compile(r"\bage\s*/\s*(?:sex|gender)\s*[:\-]?\s*[\d.]+\s*\w*\s*/\s*(male|female|m|f)\b", re.IGNORECASE)
+_NAME_RE = re.compile(
+    r"\b(?:patient\s*name|name\s*of\s*patient|patient|name)\s*[:\-]\s*"
+    r"((?:mr|mrs|ms|miss|master|baby|dr)?\.?\s*[A-Za-z][A-Za-z .']{1,60}?)"
+    r"(?=\s{2,}|\s+(?:age|sex|gender|ref|dob|id)\b|$)",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+# Panel membership of canonical names — used to infer report_type without the LLM
+_PANEL_PARAMS = {
+    "CBC": {
+        "Hemoglobin", "Total RBC count", "Packed Cell Volume", "MCV", "MCH", "MCHC", "RDW",
+        "Total WBC count", "Platelet Count", "Neutrophils", "Lymphocytes", "Monocytes",
+        "Eosinophils", "Basophils", "Absolute Neutrophils", "Absolute Lymphocytes",
+        "Absolute Monocytes", "Absolute Eosinophils", "Absolute Basophils", "MPV", "PDW", "PCT",
+        "ESR", "Band Neutrophils", "Reticulocyte Count", "Reticulocyte Percentage",
+    },
+    "LFT": {
+        "ALT", "AST", "ALP", "GGT", "Total Bilirubin", "Direct Bilirubin", "Indirect Bilirubin",
+        "Total Protein", "Albumin", "Globulin", "A/G Ratio", "LDH",
+    },
+    "KFT": {
+        "Creatinine", "BUN", "Blood Urea", "Uric Acid", "eGFR", "Sodium", "Potassium",
+        "Chloride", "Bicarbonate", "Calcium", "Phosphorus", "Cystatin C",
+    },
+    "LIPID": {
+        "Total Cholesterol", "Triglycerides", "HDL Cholesterol", "LDL Cholesterol",
+        "VLDL Cholesterol", "Non-HDL Cholesterol", "TC/HDL Ratio", "LDL/HDL Ratio",
+    },
+    "THYROID": {"TSH", "Free T3", "Free T4", "Total T3", "Total T4", "Anti-TPO", "Anti-Tg"},
+    "COAGULATION": {"Prothrombin Time", "INR", "aPTT", "Fibrinogen", "D-Dimer", "Bleeding Time", "Clotting Time"},
+    "IRON": {"Serum Iron", "TIBC", "Transferrin Saturation", "Serum Ferritin", "Transferrin"},
+    "DIABETES": {
+        "Fasting Blood Glucose", "Postprandial Blood Glucose", "Random Blood Glucose", "HbA1c",
+        "Insulin", "C-Peptide", "HOMA-IR", "Fructosamine",
+    },
+}
+
+
+def _infer_report_type(canonicals) -> str:
+    """Panel with the most hits; MIXED/COMPREHENSIVE when several panels are substantial."""
+    hits = {panel: len(members & set(canonicals)) for panel, members in _PANEL_PARAMS.items()}
+    substantial = [panel for panel, n in hits.items() if n >= 2]
+    if len(substantial) >= 3:
+        return "COMPREHENSIVE"
+    if len(substantial) == 2:
+        return "MIXED"
+    if substantial:
+        return substantial[0]
+    best = max(hits, key=hits.get)
+    return best if hits[best] else "UNKNOWN"
+
+
+def _is_unit_token(tok: str) -> bool:
+    tok = tok.strip("()[]")
+    if not tok.isalpha():
+        return True      # "g/dL", "%", "10^3/uL", "x10³"
+    return len(tok) <= _UNIT_WORD_MAX_LEN or tok.lower() in _LONG_UNIT_WORDS
+
+
+def _parse_row_tail(tail: str) -> Optional[dict]:
+    """Split what follows the value into unit / reference range / flag; None if the unit holds plain words."""
+    ref_low = ref_high = None
+    range_start = range_end = len(tail)
+    m = _RANGE_RE.search(tail)
+    if m:
+        lo, hi = _parse_float(m.group(1)), _parse_float(m.group(2))
+        if lo is not None and hi is not None and lo <= hi:
+            ref_low, ref_high = lo, hi
+            range_start, range_end = m.start(), m.end()
+    else:
+        for bound_re, is_upper in ((_UPPER_BOUND_RE, True), (_LOWER_BOUND_RE, False)):
+            m = bound_re.search(tail)
+            if m:
+                if is_upper:
+                    ref_high = _parse_float(m.group(1))
+                else:
+                    ref_low = _parse_float(m.group(1))
+                range_start, range_end = m.start(), m.end()
+                break
+
+    flag = None
+    unit_tokens = []
+    for tok in tail[:range_start].split():
+        if tok.upper() in _FLAG_TOKENS:
+            flag = flag or tok
+        elif re.search(r"[A-Za-z%/\u00b5\u03bc]", tok):
+            if not _is_unit_token(tok):
+                return None
+            unit_tokens.append(tok.strip("()[]"))
+        elif _VALUE_TOKEN_RE.match(tok):
+            return None     # a second value: another analyte shares the line
+    after = tail[range_end:].split()
+    # "13.0 to 18.0 gms/dl" — unit printed after the range only
+    if not unit_tokens and after and after[0].upper() not in _FLAG_TOKENS and re.search(r"[A-Za-z%/]", after[0]):
+        unit_tokens.append(after.pop(0).strip("()[]"))
+    for tok in after:
+        if tok.upper() not in _FLAG_TOKENS:
+            # Words or numbers after the range belong to another column
+            # (two-analyte layouts, method/comment text) — leave to the LLM
+            return None
+        flag = flag or tok
+
+    unit = " ".join(unit_tokens[:2]) or None
+    return {"unit": unit, "ref_low": ref_low, "ref_high": ref_high, "flag": flag}
+
+
+def _parse_table_row(line: str) -> Optional[dict]:
+    """
+    Parse one `[Name] [Value] [Unit] [Range] [Flag]` line, or None.
+
+    Names can contain numbers ("CA 125", "Free T 3", "Vitamin D 25 Hydroxy"),
+    so every numeric token is a candidate value and the longest name prefix
+    that is an exact alias wins. Only when no prefix is exact does the first
+    numeric token with a partial alias match count. A row whose value is
+    followed by another bare number (not a range), or whose unit contains
+    plain words, is ambiguous and left to the LLM.
+    """
+    tokens = line.split()
+    candidates = [i for i in range(1, min(len(tokens), 8)) if _VALUE_TOKEN_RE.match(tokens[i])]
+    if not candidates:
+        return None
+
+    split = None
+    for i in candidates:
+        if _exact_alias(" ".join(tokens[:i]).strip(" :-")):
+            split = i
+    if split is None:
+        split = candidates[0]
+        raw_name = " ".join(tokens[:split]).strip(" :-")
+        if not re.search(r"[A-Za-z]{2,}", raw_name) or not _canonicalize(raw_name)[1]:
+            return None
+
+    raw_name = " ".join(tokens[:split]).strip(" :-")
+    value = _parse_float(tokens[split])
+    if value is None:
+        return None
+    tail = " ".join(tokens[split + 1:])
+    # "CA 125 12 U/mL" read as CA=125: the next number is the real value
+    if split + 1 < len(tokens) and _BARE_NUMBER_RE.match(tokens[split + 1]) and not _RANGE_RE.match(tail):
+        return None
+    parsed_tail = _parse_row_tail(tail)
+    if parsed_tail is None:
+        return None
+    row = {"raw_name": raw_name, "value": value}
+    row.update(parsed_tail)
+    return row
+
+
+def _starts_analyte(cell: str) -> bool:
+    """Layout cell that opens another `[Name] [Value] …` group (two-column reports)."""
+    tokens = cell.split()
+    name_tokens = []
+    for tok in tokens:
+        if _VALUE_TOKEN_RE.match(tok):
+            break
+        name_tokens.append(tok)
+    name = " ".join(name_tokens).strip(" :-")
+    if not re.search(r"[A-Za-z]{2,}", name) or name.upper() in _FLAG_TOKENS:
+        return False
+    if _exact_alias(name):
+        return True
+    # Unit cells ("g/dL", "mill/cumm") never open a group
+    return not all(_is_unit_token(tok) for tok in name_tokens) and _canonicalize(name)[1]
+
+
+def _row_segments(line: str) -> List[str]:
+    """
+    Split a layout row into one line per analyte. Rows rebuilt from PDF word
+    boxes mark cells with " | " (ingest_and_ocr.CELL_SEPARATOR); a cell that
+    names an analyte after a value has been seen starts the next group, so
+    "Hb | 9.8 | g/dL | WBC | 7000 | /cumm" becomes two rows. Plain text
+    lines come back unchanged.
+    """
+    if _LAYOUT_CELL_SEP not in line:
+        return [line]
+    segments, current, has_value = [], [], False
+    for cell in (c.strip() for c in line.split(_LAYOUT_CELL_SEP)):
+        if not cell:
+            continue
+        if has_value and _starts_analyte(cell):
+            segments.append("  ".join(current))
+            current, has_value = [], False
+        tokens = cell.split()
+        # A value counts once the group has a name (earlier cell or this one)
+        named = bool(current) or not _VALUE_TOKEN_RE.match(tokens[0])
+        if named and any(_VALUE_TOKEN_RE.match(tok) for tok in tokens):
+            has_value = True
+        current.append(cell)
+    if current:
+        segments.append("  ".join(current))
+    return segments
+
+
+def _is_row_shaped(line: str) -> bool:
+    """Line that looks like a result row: a text label followed by a number."""
+    tokens = line.split()
+    if len(tokens) < 2 or _NON_ROW_RE.match(line):
+        return False
+    for i in range(1, min(len(tokens), 8)):
+        if _VALUE_TOKEN_RE.match(tokens[i]):
+            return bool(re.search(r"[A-Za-z]{2,}", " ".join(tokens[:i])))
+    return False
+
+
+def _parse_patient_info(text: str) -> dict:
+    info = {}
+    m = _NAME_RE.search(text)
+    if m:
+        info["patient_name"] = " ".join(m.group(1).split())
+    m = _AGE_RE.search(text)
+    if m:
+        info["patient_age"] = " ".join(m.group(1).split())
+    m = _GENDER_RE.search(text) or _AGE_SEX_RE.search(text)
+    if m:
+        g = m.group(1).lower()
+        info["patient_gender"] = "Male" if g in ("m", "male") else "Female"
+    return info
+
+
+def _parse_table_text(text: str) -> tuple[Optional[dict], dict]:
+    """
+    Rule-based extraction over raw_text.
+    Returns (data, stats). `data` has the LLM's JSON shape and is None when
+    coverage/confidence are too low to skip the LLM.
+    """
+    lab_values = []
+    row_shaped = 0
+    for text_line in text.splitlines():
+        for line in _row_segments(text_line):
+            if not _is_row_shaped(line):
+                continue
+            row_shaped += 1
+            row = _parse_table_row(line)
+            if row is not None:
+                lab_values.append(row)
+
+    parsed = len(lab_values)
+    supported = sum(
+        1 for r in lab_values if r["unit"] or r["ref_low"] is not None or r["ref_high"] is not None
+    )
+    stats = {
+        "rows": parsed,
+        "row_shaped": row_shaped,
+        "coverage": round(parsed / row_shaped, 2) if row_shaped else 0.0,
+        "confidence": round(supported / parsed, 2) if parsed else 0.0,
+    }
+    if (
+        parsed < _PARSER_MIN_ROWS
+        or stats["coverage"] < _PARSER_MIN_COVERAGE
+        or stats["confidence"] < _PARSER_MIN_CONFIDENCE
+    ):
+        return None, stats
+
+    canonicals = [_canonicalize(r["raw_name"])[0] for r in lab_values]
+    data = {"report_type": _infer_report_type(canonicals), "lab_values": lab_values}
+    data.update(_parse_patient_info(text))
+    return data, stats
+
+
 # ─────────────────────────────────────────────────────────────────────────────
 # Main node
 # ─────────────────────────────────────────────────────────────────────────────
@@ -1151,6 +1565,8 @@ def extract_parameters_node(state):
     """
     Universal extraction node.
     Strategy:
+      0. Clean text tables → deterministic row parser; no LLM call when its
+         coverage and confidence clear the thresholds.
       1. If source file is an image or scanned PDF → send image bytes directly
          to a multimodal vision LLM. Bypasses Tesseract, which is unreliable on
          phone photos of lab reports.
@@ -1173,15 +1589,32 @@ def extract_parameters_node(state):
 
     data = None
     used_vision = False
+    extraction_path = None
+
+    # Native PDFs come with table rows rebuilt from word boxes; both the
+    # parser and the LLM prompt work on those instead of the flattened text.
+    layout_rows = list(getattr(state, "layout_rows", None) or [])
+
+    # ── Path 0: deterministic table parser for clean text reports ────────────
+    if TABLE_PARSER_ENABLED and not prefer_vision and text.strip():
+        # Layout rows keep their " | " cell boundaries so two-column rows split per analyte
+        parser_text = "\n".join(layout_rows) if layout_rows else text
+        data, parser_stats = _parse_table_text(parser_text)
+        if data is not None:
+            extraction_path = "table_parser"
+            logger.info(f"extract_parameters: table parser accepted — skipping LLM ({parser_stats})")
+        else:
+            logger.info(f"extract_parameters: table parser below thresholds — using LLM ({parser_stats})")
 
     # ── Path 1: vision-first for image/photo reports ──────────────────────────
-    if prefer_vision:
+    if data is None and prefer_vision:
         logger.info("extract_parameters: trying vision LLM path (OCR unreliable or empty)")
         try:
             image_urls = _file_to_image_data_urls(file_path)
             if image_urls:
                 data = _call_vision_json(image_urls)
                 used_vision = True
+                extraction_path = "vision_llm"
                 logger.info(
                     f"extract_parameters: vision LLM returned {len(data.get('lab_values', []))} values"
                 )
@@ -1194,18 +1627,27 @@ def extract_parameters_node(state):
         if not text.strip():
             return {
                 "extracted_params": {},
-                "errors": state.errors + ["No text to extract from and vision extraction failed."],
+                "errors": ["No text to extract from and vision extraction failed."],
             }
-        prompt = _EXTRACTION_PROMPT.format(text=text)
+        if layout_rows:
+            report_block = _LAYOUT_ROWS_HEADER + "\n".join(layout_rows)
+            logger.info(
+                f"extract_parameters: prompting with {len(layout_rows)} layout rows "
+                f"({len(report_block)} chars vs {len(text)} raw)"
+            )
+        else:
+            report_block = text
+        prompt = _EXTRACTION_PROMPT.format(text=report_block)
         fast = get_fast_llm(max_tokens=2048)
         quality = get_llm(max_tokens=2048)
         try:
             data = _call_llm_json(prompt, fast, quality)
+            extraction_path = "text_llm"
         except Exception as e:
             logger.error(f"extract_parameters: all models failed: {e}")
             return {
                 "extracted_params": {},
-                "errors": state.errors + [f"LLM extraction failed: {e}"],
+                "errors": [f"LLM extraction failed: {e}"],
             }
 
     report_type = str(data.get("report_type", "UNKNOWN")).upper()
@@ -1214,7 +1656,7 @@ def extract_parameters_node(state):
         lab_values = []
 
     logger.info(
-        f"extract_parameters: LLM returned {len(lab_values)} values, "
+        f"extract_parameters: {extraction_path} returned {len(lab_values)} values, "
         f"report_type={report_type}"
     )
 
@@ -1328,4 +1770,5 @@ def extract_parameters_node(state):
         "extracted_params": extracted,
         "patient_info": patient_info,
         "report_type": report_type,
+        "extraction_path": extraction_path,
     }
@@ -0,0 +1,235 @@
+"""
+Fused context + synthesis + recommendations (PIPELINE_FUSED_ANALYSIS=1).
+
+model3_context, synthesis and recommendations each send MEDICAL_SYSTEM_PROMPT,
+the patient line and the parameter table to the 70B model — three prompts
+that are mostly the same tokens, three requests against the per-key TPM/RPM
+budget. This node sends the shared data once and asks for all three sections
+in a single JSON object.
+
+Each section is validated on its own. A section that is missing or fails its
+schema is produced by the original node instead (context → synthesis →
+recommendations, each seeing the sections already settled), so a partial
+answer costs only the calls for what is missing and the output shape never
+changes.
+"""
+
+import json
+import logging
+from typing import List
+
+from pydantic import BaseModel, Field, ValidationError
+from langchain_core.messages import SystemMessage, HumanMessage
+from nodes.model3_context import CONTEXT_RULES, ContextOutput, model3_context_node
+from nodes.recommendations import (
+    RECOMMENDATION_RULES,
+    Recommendation,
+    RecsOutput,
+    flatten_recommendations,
+    recommendations_node,
+)
+from nodes.synthesis import REPORT_WRITING_RULES, _DISCLAIMER, synthesis_node
+from utils.llm_utils import get_llm, MEDICAL_SYSTEM_PROMPT
+
+logger = logging.getLogger(__name__)
+
+# Budgets of the three calls this replaces (900 + 900 + 1000)
+_FUSED_MAX_TOKENS = 2800
+
+
+class FusedOutput(BaseModel):
+    context: ContextOutput = Field(description="Contextual analysis section (see CLINICAL CONTEXT RULES).")
+    synthesis_report: str = Field(
+        description="Patient-friendly narrative report, 250-400 words (see REPORT WRITING RULES)."
+    )
+    recommendations: List[Recommendation] = Field(
+        description="Ordered list of 4-7 recommendations, most critical first (see RECOMMENDATION RULES)."
+    )
+
+
+def _build_prompt(state, format_instructions: str) -> str:
+    patient_info = state.patient_info or {}
+    interpreted = state.param_interpretation or {}
+    patterns = state.patterns or []
+    risk = state.risk_assessment or {}
+
+    param_lines = []
+    critical_lines = []
+    for name, info in interpreted.items():
+        status = info.get("status", "unknown").upper()
+        unit = info.get("unit") or ""
+        ref = info.get("reference") or {}
+        ref_str = f" (ref: {ref.get('low')}-{ref.get('high')})" if ref.get("low") is not None else ""
+        dev = info.get("deviation_pct")
+        dev_str = f" ({dev:+.1f}% from mid)" if dev is not None else ""
+        param_lines.append(
+            f"  {name}: {info.get('value')} {unit} [{status}] severity={info.get('severity', 'unknown')}"
+            f"{dev_str}{ref_str}"
+        )
+        if info.get("is_critical"):
+            critical_lines.append(f"  ⚠ CRITICAL — {name}: {info.get('value')} {unit}{ref_str}")
+
+    params_str = "\n".join(param_lines) if param_lines else "  None"
+    critical_str = "\n".join(critical_lines) if critical_lines else "  None"
+    patterns_str = "\n  ".join(patterns) if patterns else "No clinical patterns detected"
+    rationale = risk.get("rationale", [])
+    rationale_str = "\n  ".join(rationale) if isinstance(rationale, list) else str(rationale)
+
+    return f"""You are a clinical AI producing three sections of a medical laboratory analysis in ONE JSON object:
+  1. "context"          — contextual analysis with an urgency level
+  2. "synthesis_report" — the patient-friendly narrative report
+  3. "recommendations"  — prioritised, patient-specific recommendations
+Decide the urgency in "context" first; the report's closing and the recommendation
+priorities MUST be consistent with it. Every statement must reference the actual data below.
+
+═══════════════════════════════════════
+PATIENT INFORMATION
+═══════════════════════════════════════
+Patient: {patient_info.get('Name', 'Anonymous')} | Age: {patient_info.get('Age', 'Unknown')} | Gender: {patient_info.get('Gender', 'Unknown')}
+
+═══════════════════════════════════════
+LAB RESULTS WITH CLINICAL FLAGS
+═══════════════════════════════════════
+{params_str}
+
+═══════════════════════════════════════
+CRITICAL ALERTS
+═══════════════════════════════════════
+{critical_str}
+
+═══════════════════════════════════════
+CLINICAL PATTERNS IDENTIFIED
+═══════════════════════════════════════
+  {patterns_str}
+
+═══════════════════════════════════════
+RISK ASSESSMENT
+═══════════════════════════════════════
+Overall Risk Score : {risk.get('score', 'N/A')}/10
+Rationale:
+  {rationale_str}
+
+═══════════════════════════════════════
+SECTION 1 — "context": CLINICAL CONTEXT RULES
+═══════════════════════════════════════
+{CONTEXT_RULES}
+
+═══════════════════════════════════════
+SECTION 2 — "synthesis_report": REPORT WRITING RULES (STRICT)
+═══════════════════════════════════════
+{REPORT_WRITING_RULES}
+The report is a JSON string: escape newlines as \\n and quotes as \\".
+
+═══════════════════════════════════════
+SECTION 3 — "recommendations": RECOMMENDATION RULES (MANDATORY)
+═══════════════════════════════════════
+{RECOMMENDATION_RULES}
+
+Generate 4-7 recommendations, most critical first.
+
+{format_instructions}
+"""
+
+
+def _json_object(text: str):
+    """The outermost {...} in a completion (tolerates code fences / preamble), or None."""
+    start, end = text.find("{"), text.rfind("}")
+    if start < 0 or end <= start:
+        return None
+    try:
+        data = json.loads(text[start:end + 1])
+    except json.JSONDecodeError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _parse_sections(data: dict) -> dict:
+    """ReportState updates for every section that validates; invalid ones are left out."""
+    sections = {}
+    try:
+        context = ContextOutput.model_validate(data.get("context"))
+        sections["context_analysis"] = {
+            "analysis": context.analysis,
+            "adjusted_concerns": context.adjusted_concerns,
+            "urgency": context.urgency,
+        }
+    except ValidationError as e:
+        logger.warning(f"fused_analysis: context section invalid: {e.error_count()} error(s)")
+
+    report = data.get("synthesis_report")
+    if isinstance(report, str) and report.strip():
+        sections["synthesis_report"] = report.strip() + _DISCLAIMER
+    else:
+        logger.warning("fused_analysis: synthesis_report section missing or empty")
+
+    try:
+        recs = RecsOutput.model_validate({"recommendations": data.get("recommendations")})
+        if recs.recommendations:
+            sections["recommendations"] = flatten_recommendations(recs.recommendations)
+        else:
+            logger.warning("fused_analysis: recommendations section empty")
+    except ValidationError as e:
+        logger.warning(f"fused_analysis: recommendations section invalid: {e.error_count()} error(s)")
+    return sections
+
+
+# Section → original node, in dependency order
+_FALLBACK_NODES = (
+    ("context_analysis", model3_context_node),
+    ("synthesis_report", synthesis_node),
+    ("recommendations", recommendations_node),
+)
+
+
+def fused_analysis_node(state):
+    """
+    Node: context analysis, synthesis report and recommendations from one LLM call,
+    with per-section fallback to model3_context / synthesis / recommendations.
+    """
+    sections = {}
+    if state.validated_params:
+        from langchain_core.output_parsers import PydanticOutputParser
+        parser = PydanticOutputParser(pydantic_object=FusedOutput)
+
+        fused_system = (
+            MEDICAL_SYSTEM_PROMPT
+            + "\n\n"
+            + "TASK-SPECIFIC OUTPUT RULES (override any conflicting guidance above):\n"
+            + "- Output must match the exact JSON schema given in the user message.\n"
+            + "- Do NOT add commentary or explanations outside the JSON object.\n"
+            + "- Your entire response must start with '{' and end with '}'.\n"
+            + "- Narrative prose belongs inside the JSON string values only."
+        )
+        messages = [
+            SystemMessage(content=fused_system),
+            HumanMessage(content=_build_prompt(state, parser.get_format_instructions())),
+        ]
+        try:
+            response = get_llm(max_tokens=_FUSED_MAX_TOKENS).invoke(messages)
+            content = response.content if hasattr(response, "content") else str(response)
+            data = _json_object(content)
+            if data is None:
+                logger.warning("fused_analysis: response was not a JSON object — using per-node calls")
+            else:
+                sections = _parse_sections(data)
+        except Exception as e:
+            logger.warning(f"fused_analysis: fused call failed: {e}. Using per-node calls.")
+
+    # Fill in whatever the fused answer did not provide with the original nodes,
+    # each seeing the sections already settled.
+    updates = dict(sections)
+    errors = []
+    for key, node in _FALLBACK_NODES:
+        if key in updates:
+            continue
+        output = node(state.model_copy(update=updates))
+        errors.extend(output.pop("errors", []))
+        updates.update(output)
+
+    logger.info(
+        f"fused_analysis: {len(sections)}/3 sections from the fused call"
+        + (f", fallback for {[k for k, _ in _FALLBACK_NODES if k not in sections]}" if len(sections) < 3 else "")
+    )
+    if errors:
+        updates["errors"] = errors
+    return updates
@@ -1,12 +1,24 @@
 import logging
+import os
+import statistics
+from typing import List
+
 from utils.ocr_utils import run_ocr_multipage
-import fitz  # PyMuPDF
+from utils.pdf_utils import pdf_session
 
 logger = logging.getLogger(__name__)
 
 # Minimum chars to consider native PDF text usable
 _MIN_TEXT_LEN = 50
 
+# Rebuild table rows from PyMuPDF word boxes for native-text PDFs.
+# page.get_text() emits each table cell on its own line, losing the
+# name ↔ value ↔ unit ↔ range alignment the extractor needs.
+LAYOUT_ROWS_ENABLED = os.environ.get("INGEST_LAYOUT_ROWS", "1").strip().lower() not in ("0", "false", "no")
+CELL_SEPARATOR = " | "
+_SAME_LINE_TOLERANCE = 0.5   # × median word height between vertical centres
+_CELL_GAP = 0.8              # × median word height of horizontal gap that starts a new cell
+
 
 def extract_pdf_text(path: str) -> str:
     """
@@ -14,32 +26,87 @@ def extract_pdf_text(path: str) -> str:
     Returns empty string on failure.
     """
     try:
-        doc = fitz.open(path)
-        pages_text = []
-        for page_num, page in enumerate(doc):
-            page_text = page.get_text()
-            if page_text.strip():
-                pages_text.append(page_text)
-        doc.close()
+        # Shared session: the OCR and vision paths reuse this open document
+        with pdf_session(path) as doc:
+            pages_text = []
+            for page_num in range(doc.page_count):
+                page_text = doc.page_text(page_num)
+                if page_text.strip():
+                    pages_text.append(page_text)
         return "\n".join(pages_text)
     except Exception as e:
         logger.warning(f"Native PDF text extraction failed: {e}")
         return ""
 
 
+def _words_to_rows(words: list) -> List[str]:
+    """
+    Group word boxes into visual lines, then split each line into cells at
+    wide horizontal gaps. Returns rows like "Hemoglobin | 9.8 | g/dL | 12.0 - 15.5 | L".
+    """
+    if not words:
+        return []
+    height = statistics.median(w[3] - w[1] for w in words) or 1.0
+    by_centre = sorted(words, key=lambda w: ((w[1] + w[3]) / 2, w[0]))
+
+    lines = []
+    for w in by_centre:
+        centre = (w[1] + w[3]) / 2
+        if lines and abs(centre - lines[-1][0]) <= _SAME_LINE_TOLERANCE * height:
+            lines[-1][1].append(w)
+        else:
+            lines.append([centre, [w]])
+
+    rows = []
+    for _, line_words in lines:
+        line_words.sort(key=lambda w: w[0])
+        cells = [[line_words[0][4]]]
+        for prev, cur in zip(line_words, line_words[1:]):
+            if cur[0] - prev[2] > _CELL_GAP * height:
+                cells.append([cur[4]])
+            else:
+                cells[-1].append(cur[4])
+        rows.append(CELL_SEPARATOR.join(" ".join(c) for c in cells))
+    return rows
+
+
+def extract_pdf_layout_rows(path: str) -> List[str]:
+    """
+    Compact, layout-preserving row list for ALL pages of a native-text PDF.
+    Returns [] on failure.
+    """
+    try:
+        rows: List[str] = []
+        first_page = {}     # row -> first page it appeared on
+        with pdf_session(path) as doc:
+            for page_num in range(doc.page_count):
+                for row in _words_to_rows(doc.page_words(page_num)):
+                    # Headers/footers repeated on later pages add tokens but no
+                    # information; identical rows within one page are kept.
+                    if first_page.setdefault(row, page_num) != page_num:
+                        continue
+                    rows.append(row)
+        return rows
+    except Exception as e:
+        logger.warning(f"Layout row extraction failed: {e}")
+        return []
+
+
 def ingest_and_ocr_node(state):
     """
     Node: Ingest file and extract raw text.
     Strategy:
-      1. For PDFs → try native text extraction (all pages).
+      1. For PDFs → try native text extraction (all pages), plus table rows
+         rebuilt from word coordinates.
       2. If text is too short (scanned PDF or image) → run multi-page OCR.
       3. For image files → run OCR directly.
     """
     file_path = state.raw_file_path
     if not file_path:
-        return {"errors": state.errors + ["No file path provided."]}
+        return {"errors": ["No file path provided."]}
 
     text = ""
+    layout_rows: List[str] = []
     is_pdf = file_path.lower().endswith(".pdf")
 
     # Step 1: Try native PDF extraction
@@ -47,18 +114,22 @@ def ingest_and_ocr_node(state):
         text = extract_pdf_text(file_path)
         if text.strip():
             logger.info(f"Native PDF extraction: {len(text)} chars from '{file_path}'")
+            if LAYOUT_ROWS_ENABLED:
+                layout_rows = extract_pdf_layout_rows(file_path)
+                logger.info(f"Layout extraction: {len(layout_rows)} rows")
 
     # Step 2: Fall back to OCR if text is insufficient
     if len(text.strip()) < _MIN_TEXT_LEN:
         logger.info(f"Falling back to OCR for '{file_path}' (text len={len(text.strip())})")
+        layout_rows = []
         try:
             text = run_ocr_multipage(file_path)
             logger.info(f"OCR complete: {len(text)} chars extracted")
         except Exception as e:
             logger.error(f"OCR failed for '{file_path}': {e}")
-            return {"errors": state.errors + [f"OCR failed: {str(e)}"]}
+            return {"errors": [f"OCR failed: {str(e)}"]}
 
     if not text.strip():
-        return {"errors": state.errors + ["Could not extract any text from the file. The file may be corrupt or blank."]}
+        return {"errors": ["Could not extract any text from the file. The file may be corrupt or blank."]}
 
-    return {"raw_text": text}
+    return {"raw_text": text, "layout_rows": layout_rows}
@@ -31,6 +31,38 @@ class ContextOutput(BaseModel):
     )
 
 
+# Static guidance shared with nodes/fused_analysis.py.
+CONTEXT_RULES = """AGE-SPECIFIC ADJUSTMENTS:
+- Pediatric (<18 yrs): Reference ranges differ significantly from adult norms across all panels.
+  Leukocytosis common with infection; lower Hgb thresholds; higher platelet values.
+  Liver enzymes (ALT/AST), creatinine, and electrolyte ranges are age-dependent.
+- Reproductive-age female (18-45 F): LOW Hemoglobin/Iron — consider menstrual loss or pregnancy.
+  Thyroid disorders more prevalent; lipid risk lower than males of same age.
+- Elderly (>65): Mild anemia common but warrants evaluation. Renal function declines with age
+  (creatinine may appear normal despite reduced GFR). Lipid and thyroid profiles need context.
+
+GENDER-SPECIFIC ADJUSTMENTS:
+- Male: Higher Hemoglobin (13.5-17.5 g/dL), PCV, and creatinine baselines. Higher cardiovascular risk.
+- Female: Hemoglobin 12.0-15.5 g/dL. Estrogen affects platelet function, lipids, and thyroid.
+  HDL typically higher than males of same age.
+- Unknown gender: Reference ranges and clinical significance may vary — interpret conservatively.
+
+PANEL-SPECIFIC CONTEXT:
+- CBC: Interpret WBC, RBC, platelets, and differential together for complete picture.
+- LFT: Assess transaminases, bilirubin, and synthetic markers (albumin/PT) as a unit.
+- KFT/RFT: Creatinine + BUN/Urea together reflect renal function; eGFR adjusts for age/gender.
+- Lipid: Cardiovascular risk = total picture (LDL, HDL, TG, TC/HDL ratio) not single value.
+- Thyroid: TSH is primary screen; T3/T4 confirm hypo vs. hyperthyroidism.
+- Diabetes: FBS + HbA1c together for diagnosis; HbA1c reflects 3-month glycemic control.
+- Coagulation: PT/INR + aPTT together indicate bleeding or clotting pathway dysfunction.
+
+URGENCY CRITERIA:
+- 'urgent'     → Any CRITICAL value, or ≥2 severe abnormalities across any panel
+- 'prompt'     → Any severe abnormality, or patterns suggesting active disease
+- 'follow-up'  → Mild-moderate isolated abnormalities
+- 'routine'    → All within normal limits or borderline mild"""
+
+
 def model3_context_node(state):
     """
     Node: Contextual clinical analysis.
@@ -102,35 +134,7 @@ CRITICAL VALUE ALERTS
 CLINICAL CONTEXT RULES
 ═══════════════════════════════════════
 
-AGE-SPECIFIC ADJUSTMENTS:
-- Pediatric (<18 yrs): Reference ranges differ significantly from adult norms across all panels.
-  Leukocytosis common with infection; lower Hgb thresholds; higher platelet values.
-  Liver enzymes (ALT/AST), creatinine, and electrolyte ranges are age-dependent.
-- Reproductive-age female (18-45 F): LOW Hemoglobin/Iron — consider menstrual loss or pregnancy.
-  Thyroid disorders more prevalent; lipid risk lower than males of same age.
-- Elderly (>65): Mild anemia common but warrants evaluation. Renal function declines with age
-  (creatinine may appear normal despite reduced GFR). Lipid and thyroid profiles need context.
-
-GENDER-SPECIFIC ADJUSTMENTS:
-- Male: Higher Hemoglobin (13.5-17.5 g/dL), PCV, and creatinine baselines. Higher cardiovascular risk.
-- Female: Hemoglobin 12.0-15.5 g/dL. Estrogen affects platelet function, lipids, and thyroid.
-  HDL typically higher than males of same age.
-- Unknown gender: Reference ranges and clinical significance may vary — interpret conservatively.
-
-PANEL-SPECIFIC CONTEXT:
-- CBC: Interpret WBC, RBC, platelets, and differential together for complete picture.
-- LFT: Assess transaminases, bilirubin, and synthetic markers (albumin/PT) as a unit.
-- KFT/RFT: Creatinine + BUN/Urea together reflect renal function; eGFR adjusts for age/gender.
-- Lipid: Cardiovascular risk = total picture (LDL, HDL, TG, TC/HDL ratio) not single value.
-- Thyroid: TSH is primary screen; T3/T4 confirm hypo vs. hyperthyroidism.
-- Diabetes: FBS + HbA1c together for diagnosis; HbA1c reflects 3-month glycemic control.
-- Coagulation: PT/INR + aPTT together indicate bleeding or clotting pathway dysfunction.
-
-URGENCY CRITERIA:
-- 'urgent'     → Any CRITICAL value, or ≥2 severe abnormalities across any panel
-- 'prompt'     → Any severe abnormality, or patterns suggesting active disease
-- 'follow-up'  → Mild-moderate isolated abnormalities
-- 'routine'    → All within normal limits or borderline mild
+{CONTEXT_RULES}
 
 ═══════════════════════════════════════
 TASK
@@ -187,4 +191,4 @@ TASK
             }
         except Exception as e2:
             logger.error(f"model3_context fallback also failed: {e2}")
-            return {"errors": state.errors + [f"Model 3 (Context) failed: {str(e2)}"]}
+            return {"errors": [f"Model 3 (Context) failed: {str(e2)}"]}
@@ -0,0 +1,384 @@
+"""
+Deterministic clinical pattern rules over `param_interpretation`.
+
+The rules model2_patterns used to paste into its prompt ("Microcytic Anemia:
+LOW Hemoglobin + LOW MCV", …) as a declarative table. Each `PatternRule` is a
+name plus findings that must all hold; a finding matches when any of its
+canonical parameters has an accepted model1 status (and, optionally, crosses a
+cut-off). Evaluation is a handful of dict lookups per rule — the same input
+always yields the same patterns, risk score and rationale.
+
+    result = evaluate_patterns(state.param_interpretation, state.patient_info)
+    result.patterns, result.risk_score, result.risk_rationale
+
+Rules keep the prompt's anti-misdiagnosis constraints by construction: only
+canonical names match (Low RBC is never Thrombocytopenia; Lymphopenia needs
+"Absolute Lymphocytes"), and UNKNOWN statuses never satisfy LOW/HIGH.
+Cut-offs in absolute units (FBS ≥126 mg/dL, CK >1000 U/L) are written in the
+curated DB unit; values still in a printed unit with a known conversion
+(mmol/L glucose against a report range) are converted before comparing, and
+values in an incompatible unit never cross them;
+`times_uln` cut-offs are relative to the resolved reference high and apply
+whenever a range is known.
+"""
+
+from typing import NamedTuple
+
+from nodes.validate_standardize import UNIT_INCOMPATIBLE, UNITS
+from utils.reference_ranges import gender_key, get_reference_table
+
+LOW, HIGH, NORMAL = "low", "high", "normal"
+_ABNORMAL = frozenset((LOW, HIGH))
+
+# Risk tiers (RISK SCORING RULES in the original prompt)
+MILD, SYNDROME, SEVERE, LIFE_THREATENING = 3, 5, 7, 9
+
+NO_PATTERNS_RATIONALE = "No significant abnormal patterns detected."
+
+
+class Finding(NamedTuple):
+    params: tuple                 # canonical names; the first one present that matches wins
+    statuses: frozenset           # accepted model1 statuses; empty = any
+    at_least: float = None        # value >= at_least (curated DB unit)
+    below: float = None           # value <  below   (curated DB unit)
+    times_uln: float = None       # value >= times_uln × reference high
+
+    def match(self, interpreted: dict):
+        """Name of the first parameter satisfying this finding, else None."""
+        for param in self.params:
+            info = interpreted.get(param)
+            if info is None:
+                continue
+            if self.statuses and info.get("status") not in self.statuses:
+                continue
+            if self._within_cutoffs(param, info):
+                return param
+        return None
+
+    def _within_cutoffs(self, param: str, info: dict) -> bool:
+        if self.at_least is None and self.below is None and self.times_uln is None:
+            return True
+        value = info.get("value")
+        if not isinstance(value, (int, float)):
+            return False
+        if self.times_uln is not None:
+            high = (info.get("reference") or {}).get("high")
+            if not isinstance(high, (int, float)) or value < self.times_uln * high:
+                return False
+        if self.at_least is None and self.below is None:
+            return True
+        # Values validated against a report-printed range keep the printed unit
+        # (e.g. glucose in mmol/L); bring them to the DB unit the cut-off uses.
+        table = get_reference_table()
+        transform = UNITS.transform(param, info.get("unit"), table.units(param))
+        if transform is UNIT_INCOMPATIBLE:
+            return False
+        if transform is not None:
+            value = (value * transform[0]) + transform[1]
+        if self.at_least is not None and value < self.at_least:
+            return False
+        if self.below is not None and value >= self.below:
+            return False
+        return True
+
+
+class Ratio(NamedTuple):
+    numerator: str
+    denominator: str
+    at_least: float
+
+    def match(self, interpreted: dict):
+        num = (interpreted.get(self.numerator) or {}).get("value")
+        den = (interpreted.get(self.denominator) or {}).get("value")
+        if not isinstance(num, (int, float)) or not isinstance(den, (int, float)) or den <= 0:
+            return None
+        return self.numerator if num / den >= self.at_least else None
+
+
+class PatternRule(NamedTuple):
+    name: str
+    findings: tuple
+    weight: int = SYNDROME
+    sex: str = None               # "adult_male" / "adult_female": skipped only on a known mismatch
+    suppresses: tuple = ()        # less specific patterns this one replaces
+
+
+def low(*params, below=None) -> Finding:
+    return Finding(params, frozenset((LOW,)), below=below)
+
+
+def high(*params, at_least=None, times_uln=None) -> Finding:
+    return Finding(params, frozenset((HIGH,)), at_least=at_least, times_uln=times_uln)
+
+
+def normal(*params) -> Finding:
+    return Finding(params, frozenset((NORMAL,)))
+
+
+def low_or_normal(*params) -> Finding:
+    return Finding(params, frozenset((LOW, NORMAL)))
+
+
+def high_or_normal(*params) -> Finding:
+    return Finding(params, frozenset((HIGH, NORMAL)))
+
+
+def abnormal(*params) -> Finding:
+    return Finding(params, _ABNORMAL)
+
+
+def between(*params, at_least=None, below=None) -> Finding:
+    return Finding(params, frozenset(), at_least=at_least, below=below)
+
+
+_T4 = ("Free T4", "Total T4")
+_T3 = ("Free T3", "Total T3")
+_GLUCOSE = ("Fasting Blood Glucose", "Random Blood Glucose", "Postprandial Blood Glucose")
+_TESTOSTERONE = ("Total Testosterone", "Free Testosterone")
+_TROPONIN = ("Troponin I", "Troponin T", "High-sensitivity Troponin I")
+_NEUTROPHILS = ("Absolute Neutrophils", "Neutrophils")
+_UREA = ("BUN", "Blood Urea")
+
+# Rules are evaluated in order; a name already matched by an earlier row is
+# not re-reported, so a severe variant listed first takes the higher weight.
+PATTERN_RULES = (
+    # ─── Haematology (CBC) ───────────────────────────────────────────────────
+    PatternRule("Pancytopenia", (low("Total WBC count"), low("Hemoglobin"), low("Platelet Count")),
+                LIFE_THREATENING),
+    PatternRule("Iron Deficiency Anemia", (low("Hemoglobin"), low("MCV"), low("Serum Ferritin")), SEVERE),
+    PatternRule("Iron Deficiency Anemia", (low("Hemoglobin"), low("Serum Iron"), low("Serum Ferritin")), SEVERE),
+    PatternRule("Megaloblastic Anemia", (low("Hemoglobin"), high("MCV"), low("Vitamin B12", "Folate")), SEVERE),
+    PatternRule("Microcytic Anemia", (low("Hemoglobin"), low("MCV"))),
+    PatternRule("Macrocytic Anemia", (low("Hemoglobin"), high("MCV"))),
+    PatternRule("Normocytic Anemia", (low("Hemoglobin"), normal("MCV"))),
+    PatternRule("Leukopenia", (low("Total WBC count"),)),
+    PatternRule("Leukocytosis", (high("Total WBC count"),)),
+    PatternRule("Neutropenia", (low("Absolute Neutrophils"),)),
+    PatternRule("Lymphopenia", (low("Absolute Lymphocytes"),)),
+    PatternRule("Acute Infection", (high("Total WBC count"), high(*_NEUTROPHILS))),
+    PatternRule("Chronic/Viral Pattern", (high("Absolute Lymphocytes"),), MILD),
+    PatternRule("Thrombocytopenia", (low("Platelet Count"),)),
+    PatternRule("Thrombocytosis", (high("Platelet Count"),)),
+    PatternRule("Polycythemia", (high("Hemoglobin"), high("Packed Cell Volume"))),
+    PatternRule("Hemoconcentration", (high("Packed Cell Volume"), low_or_normal("Hemoglobin")), MILD),
+
+    # ─── Liver (LFT) ─────────────────────────────────────────────────────────
+    PatternRule("Mixed Liver Disease", (high("ALT", "AST"), high("Total Bilirubin"), low("Albumin")), SEVERE),
+    PatternRule("Obstructive Jaundice", (high("Total Bilirubin"), high("Direct Bilirubin"), high("ALP")), SEVERE),
+    PatternRule("Hepatocellular Injury", (high("ALT"), high("AST"))),
+    PatternRule("Cholestatic Pattern", (high("ALP"), high("GGT"))),
+    PatternRule("Hepatic Synthetic Defect", (low("Albumin"), low("Total Protein"))),
+
+    # ─── Kidney (KFT) + electrolytes ─────────────────────────────────────────
+    PatternRule("Acute/Chronic Kidney Disease", (high("Creatinine"), high(*_UREA)), SEVERE),
+    PatternRule("Hyperkalemia", (high("Potassium", at_least=5.5),), LIFE_THREATENING),
+    PatternRule("Hyponatremia", (low("Sodium", below=135),)),
+    PatternRule("Electrolyte Imbalance", (abnormal("Sodium", "Potassium"),)),
+    PatternRule("Hyperuricemia", (high("Uric Acid"),), MILD),
+
+    # ─── Lipids / metabolic ──────────────────────────────────────────────────
+    PatternRule("Metabolic Syndrome", (high("Triglycerides"), low("HDL Cholesterol"), high(*_GLUCOSE)), SEVERE),
+    PatternRule("Dyslipidemia", (high("Total Cholesterol"), high("LDL Cholesterol"), low("HDL Cholesterol"))),
+    PatternRule("Hypertriglyceridemia", (high("Triglycerides", at_least=500),), LIFE_THREATENING),
+    PatternRule("Hypertriglyceridemia", (high("Triglycerides"),), MILD),
+    PatternRule("Low HDL Syndrome", (low("HDL Cholesterol"),), MILD),
+    PatternRule("Lactic Acidosis", (high("Lactic Acid"),), SEVERE),
+    PatternRule("Hyperammonemia", (high("Ammonia"),), SEVERE),
+
+    # ─── Thyroid ─────────────────────────────────────────────────────────────
+    PatternRule("Hypothyroidism", (high("TSH"), low(*_T4)), suppresses=("Subclinical Hypothyroid",)),
+    PatternRule("Hyperthyroidism", (low("TSH"), high(*_T4, *_T3)), suppresses=("Subclinical Hyperthyroid",)),
+    PatternRule("Subclinical Hypothyroid", (high("TSH"), normal(*_T4)), MILD),
+    PatternRule("Subclinical Hyperthyroid", (low("TSH"), normal(*_T4, *_T3)), MILD),
+    PatternRule("Autoimmune Thyroid", (high("Anti-TPO"), high("Anti-Tg")), MILD),
+
+    # ─── Diabetes / glucose ──────────────────────────────────────────────────
+    PatternRule("Diabetes Mellitus", (between("Fasting Blood Glucose", at_least=126),),
+                suppresses=("Impaired Fasting Glucose",)),
+    PatternRule("Diabetes Mellitus", (between("HbA1c", at_least=6.5),), suppresses=("Impaired Fasting Glucose",)),
+    PatternRule("Impaired Fasting Glucose", (between("Fasting Blood Glucose", at_least=100, below=126),), MILD),
+    PatternRule("Poor Glycemic Control", (high("HbA1c", at_least=8.0),)),
+
+    # ─── Coagulation ─────────────────────────────────────────────────────────
+    PatternRule("DIC (Disseminated Intravascular Coagulation)",
+                (high("D-Dimer"), low("Fibrinogen"), low("Platelet Count")), LIFE_THREATENING,
+                suppresses=("Hypercoagulable State",)),
+    PatternRule("Prolonged PT/INR", (high("Prothrombin Time"), high("INR"))),
+    PatternRule("Coagulopathy", (high("Prothrombin Time"), high("aPTT"))),
+    PatternRule("Hypercoagulable State", (high("D-Dimer"),)),
+
+    # ─── Iron studies ────────────────────────────────────────────────────────
+    PatternRule("Iron Deficiency",
+                (low("Serum Iron"), low("Serum Ferritin"), high("TIBC"), low("Transferrin Saturation"))),
+    PatternRule("Iron Deficiency", (low("Serum Ferritin"),), MILD),
+    PatternRule("Iron Overload", (high("Serum Iron"), high("Serum Ferritin"), low("TIBC"))),
+    PatternRule("Anemia of Chronic Disease",
+                (low("Serum Iron"), low_or_normal("TIBC"), high_or_normal("Serum Ferritin"))),
+
+    # ─── Inflammatory markers ────────────────────────────────────────────────
+    PatternRule("Acute Inflammation", (high("CRP"),)),
+    PatternRule("Acute Inflammation", (high("hsCRP", at_least=10),)),
+    PatternRule("Cardiovascular Risk", (high("hsCRP"),), MILD),
+    PatternRule("Elevated ESR", (high("ESR"),), MILD),
+
+    # ─── Reproductive hormones ───────────────────────────────────────────────
+    PatternRule("Primary Hypogonadism (Male)", (low(*_TESTOSTERONE), high("FSH"), high("LH")), sex="adult_male"),
+    PatternRule("Secondary Hypogonadism (Male)",
+                (low(*_TESTOSTERONE), low_or_normal("FSH"), low_or_normal("LH")), sex="adult_male"),
+    PatternRule("PCOS Pattern (Female)",
+                (Ratio("LH", "FSH", 2.0), high(*_TESTOSTERONE, "DHEA-S"), low_or_normal("FSH")), sex="adult_female"),
+    PatternRule("Menopause/Ovarian Failure",
+                (between("FSH", at_least=25), high("LH"), low("Estradiol")), MILD, sex="adult_female"),
+    PatternRule("Hyperprolactinemia", (high("Prolactin"),)),
+
+    # ─── Adrenal ─────────────────────────────────────────────────────────────
+    PatternRule("Hypercortisolism (Cushing's)", (high("Cortisol"), abnormal("ACTH")), SEVERE),
+    PatternRule("Adrenal Insufficiency", (low("Cortisol"), abnormal("ACTH")), SEVERE),
+    PatternRule("Hyperaldosteronism", (high("Aldosterone"), low("Potassium"))),
+    PatternRule("Adrenal Androgen Excess", (high("DHEA-S"),), MILD),
+
+    # ─── Cardiac markers ─────────────────────────────────────────────────────
+    PatternRule("Acute Myocardial Infarction (AMI)", (high(*_TROPONIN),), LIFE_THREATENING),
+    PatternRule("Severe Heart Failure", (high("BNP", at_least=400),), SEVERE, suppresses=("Heart Failure",)),
+    PatternRule("Severe Heart Failure", (high("NT-proBNP", at_least=1000),), SEVERE,
+                suppresses=("Heart Failure",)),
+    PatternRule("Heart Failure", (high("BNP", "NT-proBNP"),)),
+    PatternRule("Rhabdomyolysis", (high("CK", at_least=1000), high("Myoglobin")), LIFE_THREATENING,
+                suppresses=("Muscle Injury",)),
+    PatternRule("Muscle Injury", (high("CK"), high("Myoglobin"))),
+    PatternRule("Elevated Homocysteine", (high("Homocysteine"),), MILD),
+
+    # ─── Tumour markers (screening context — never diagnostic) ───────────────
+    PatternRule("Elevated CEA", (high("CEA"),)),
+    PatternRule("Elevated CA-125", (high("CA-125"),)),
+    PatternRule("Elevated CA 19-9", (high("CA 19-9"),)),
+    PatternRule("Elevated AFP", (high("AFP"),)),
+    PatternRule("Elevated PSA", (high("PSA"),)),
+    PatternRule("Elevated Beta-hCG", (high("Beta-hCG"),)),
+
+    # ─── Autoimmune / rheumatology ───────────────────────────────────────────
+    PatternRule("Systemic Lupus (SLE) Screen",
+                (high("ANA"), high("Anti-dsDNA"), low("C3 Complement", "C4 Complement")), SEVERE),
+    PatternRule("Rheumatoid Arthritis (RA)", (high("Rheumatoid Factor"), high("Anti-CCP"))),
+    PatternRule("Complement Consumption", (low("C3 Complement"), low("C4 Complement"))),
+    PatternRule("Recent Streptococcal Infection", (high("Anti-Streptolysin O"),), MILD),
+
+    # ─── Nutritional ─────────────────────────────────────────────────────────
+    PatternRule("Vitamin D Deficiency", (low("Vitamin D", below=20),), suppresses=("Vitamin D Insufficiency",)),
+    PatternRule("Vitamin D Insufficiency", (low("Vitamin D"),), MILD),
+    PatternRule("Vitamin B12 Deficiency", (low("Vitamin B12"),)),
+    PatternRule("Folate Deficiency", (low("Folate"),)),
+    PatternRule("Zinc Deficiency", (low("Zinc"),), MILD),
+    PatternRule("Malnutrition", (low("Prealbumin"), low("Albumin"))),
+
+    # ─── Bone metabolism ─────────────────────────────────────────────────────
+    PatternRule("Hyperparathyroidism", (high("PTH"), abnormal("Calcium"))),
+    PatternRule("Hypoparathyroidism", (low("PTH"), low("Calcium"))),
+    PatternRule("Secondary Hyperparathyroidism (Vitamin D)", (low("Vitamin D"), high("PTH"))),
+    PatternRule("Osteoporosis Markers", (high("C-Telopeptide"), low("Osteocalcin")), MILD),
+    PatternRule("Paget's Disease Marker", (high("Bone ALP"),), MILD),
+
+    # ─── Pancreatic ──────────────────────────────────────────────────────────
+    PatternRule("Acute Pancreatitis", (high("Amylase", times_uln=3), high("Lipase", times_uln=3)),
+                LIFE_THREATENING),
+    PatternRule("Acute Pancreatitis", (high("Lipase", times_uln=3),), LIFE_THREATENING),
+
+    # ─── Infectious serology (reactive = HIGH against the S/CO cut-off) ──────
+    PatternRule("Active Hepatitis B", (high("HBsAg"),), SEVERE),
+    PatternRule("Hepatitis C Screen Reactive", (high("Anti-HCV"),), SEVERE),
+    PatternRule("HIV Screen Reactive", (high("HIV Antibody"),), SEVERE),
+    PatternRule("Acute Dengue", (high("Dengue NS1 Antigen"),), SEVERE),
+)
+
+
+def _index_rules(rules: tuple) -> dict:
+    """param → indices of rules whose first finding can use it; other rules cannot match."""
+    index = {}
+    for i, rule in enumerate(rules):
+        first = rule.findings[0]
+        for param in first.params if isinstance(first, Finding) else (first.numerator,):
+            index.setdefault(param, []).append(i)
+    return {param: tuple(indices) for param, indices in index.items()}
+
+
+_RULES_BY_PARAM = _index_rules(PATTERN_RULES)
+
+
+class PatternResult(NamedTuple):
+    patterns: list
+    risk_score: int
+    risk_rationale: list
+
+
+def _describe(param: str, info: dict) -> str:
+    unit = f" {info['unit']}" if info.get("unit") else ""
+    return f"{param} {info.get('status', 'unknown').upper()} ({info.get('value')}{unit})"
+
+
+def match_rules(interpreted: dict, sex: str = None) -> list:
+    """[(rule, [matched params])] in table order, after de-duplication and suppression."""
+    candidates = sorted({i for param in interpreted for i in _RULES_BY_PARAM.get(param, ())})
+    matched = {}
+    for i in candidates:
+        rule = PATTERN_RULES[i]
+        if rule.name in matched or (rule.sex and sex and rule.sex != sex):
+            continue
+        evidence = []
+        for finding in rule.findings:
+            param = finding.match(interpreted)
+            if param is None:
+                break
+            evidence.append(param)
+        else:
+            matched[rule.name] = (rule, evidence)
+    suppressed = {name for rule, _ in matched.values() for name in rule.suppresses}
+    return [entry for name, entry in matched.items() if name not in suppressed]
+
+
+def baseline_risk_score(interpreted: dict, matched: list) -> int:
+    """
+    1–10 following the prompt's scoring bands:
+      1–3 single mild abnormality · 4–6 one syndrome or several mild values ·
+      7–8 several related abnormalities or a severe syndrome · 9–10 life-threatening.
+    """
+    abnormal_info = [info for info in interpreted.values() if info.get("status") in _ABNORMAL]
+    score = 1
+    if abnormal_info:
+        score = 2 if len(abnormal_info) == 1 else 4
+        if any(info.get("severity") == "severe" for info in abnormal_info):
+            score = 3 if len(abnormal_info) == 1 else 6
+    if matched:
+        score = max(score, max(rule.weight for rule, _ in matched) + (1 if len(matched) > 1 else 0))
+    criticals = sum(1 for info in abnormal_info if info.get("is_critical"))
+    if criticals:
+        score = max(score, 10 if criticals > 1 else 9)
+    return max(1, min(10, score))
+
+
+def evaluate_patterns(interpreted: dict, patient_info: dict = None) -> PatternResult:
+    """Patterns, baseline risk score and rationale for one report's param_interpretation."""
+    interpreted = interpreted or {}
+    sex = gender_key((patient_info or {}).get("Gender"))
+    matched = match_rules(interpreted, sex)
+
+    rationale = [
+        f"{rule.name}: " + ", ".join(_describe(p, interpreted[p]) for p in evidence)
+        for rule, evidence in matched
+    ]
+    explained = {p for _, evidence in matched for p in evidence}
+    for param, info in interpreted.items():
+        if info.get("is_critical") and param not in explained:
+            rationale.append(f"Critical value: {_describe(param, info)}")
+    if not matched:
+        isolated = [p for p, info in interpreted.items()
+                    if info.get("status") in _ABNORMAL and not info.get("is_critical")]
+        if isolated:
+            rationale.append("Isolated abnormal values: " + ", ".join(_describe(p, interpreted[p]) for p in isolated))
+    if not rationale:
+        rationale.append(NO_PATTERNS_RATIONALE)
+
+    return PatternResult(
+        patterns=[rule.name for rule, _ in matched],
+        risk_score=baseline_risk_score(interpreted, matched),
+        risk_rationale=rationale,
+    )
@@ -1,3 +1,4 @@
+import asyncio
 import hashlib
 import json
 import logging
@@ -5,18 +6,18 @@ import os
 import threading
 import time
 import uuid
-from typing import Any, Dict, List, Tuple
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, AsyncIterator, Dict, List, Tuple
 
 from dotenv import load_dotenv
 from langchain_community.vectorstores import FAISS
 from langchain_core.documents import Document
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_groq import ChatGroq
 from langchain_huggingface import HuggingFaceEmbeddings
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 
 from graph.graph_state import ReportState
-from utils.llm_utils import MEDICAL_SYSTEM_PROMPT, MEDICAL_MODEL
+from utils.llm_utils import MEDICAL_SYSTEM_PROMPT, MEDICAL_MODEL, PRIMARY_KEY, ScheduledLLM
 
 load_dotenv()
 logger = logging.getLogger(__name__)
@@ -27,11 +28,18 @@ FAISS_INDEX_DIR = os.getenv("FAISS_INDEX_DIR", "faiss_index")
 CHAT_HISTORY_MAX_TURNS = 10   # keep last N turns per session
 SESSION_TTL_SECONDS = 3600    # 1 hour — sessions older than this are purged
 
+# The async chat path runs retrieval (index load, query embedding, FAISS
+# search) here instead of on the event loop. Query embedding is CPU-bound
+# torch work, so a small pool keeps concurrent chats from competing with the
+# analysis pipeline for cores; the Groq call itself needs no thread.
+_RETRIEVAL_WORKERS = 2
+_retrieval_executor = ThreadPoolExecutor(max_workers=_RETRIEVAL_WORKERS, thread_name_prefix="rag-search")
+
 # ── Singleton model instances (loaded once, reused across requests) ───────────
 _embeddings_instance: "HuggingFaceEmbeddings | None" = None
 _embeddings_lock = threading.Lock()
 
-_llm_instance: "ChatGroq | None" = None
+_llm_instance: "ScheduledLLM | None" = None
 _llm_lock = threading.Lock()
 
 # ── In-memory stores (keyed by session/namespace) ─────────────────────────────
@@ -122,12 +130,12 @@ def get_embeddings() -> "HuggingFaceEmbeddings":
     return _embeddings_instance
 
 
-def get_llm() -> "ChatGroq":
+def get_llm() -> "ScheduledLLM":
     """
     Return cached Groq LLM, creating it once on first call.
     Uses llama-3.3-70b-versatile (Groq's most capable available model for medical
-    reasoning) and the primary GROQ_API_KEY — secondary key is reserved
-    for extraction/pattern nodes in utils.llm_utils.
+    reasoning) and prefers the primary GROQ_API_KEY; the shared rate scheduler
+    moves chat calls to the secondary key when the primary has no headroom.
     """
     global _llm_instance
     if _llm_instance is None:
@@ -136,12 +144,10 @@ def get_llm() -> "ChatGroq":
                 groq_api_key = os.environ.get("GROQ_API_KEY")
                 if not groq_api_key:
                     raise EnvironmentError("GROQ_API_KEY not set")
-                _llm_instance = ChatGroq(
-                    model=MEDICAL_MODEL,
-                    temperature=0,
-                    max_tokens=2048,
-                    timeout=90,
-                    api_key=groq_api_key,
+                # Scheduled over the same key budgets (and pooled HTTP
+                # connections) as the analysis nodes.
+                _llm_instance = ScheduledLLM(
+                    MEDICAL_MODEL, 0, 2048, PRIMARY_KEY, timeout=90,
                 )
     return _llm_instance
 
@@ -206,95 +212,11 @@ def rag_indexing_node(state: ReportState) -> Dict[str, Any]:
         return {"errors": [f"RAG Indexing Error: {str(e)}"]}
 
 
-def rag_retrieve_and_answer(
-    question: str,
-    collection_name: str,
-    session_id: str = None,
-    report_context: Any = None,
-) -> str:
-    """
-    Retrieve relevant context from FAISS and answer via LLM.
-    Validates FAISS index integrity before loading from disk.
-    """
-    if session_id is None:
-        session_id = "default"
-
-    _touch_session(session_id)
-
-    with chat_history_lock:
-        if session_id not in chat_history_store:
-            chat_history_store[session_id] = []
-
-    try:
-        embeddings = get_embeddings()
-
-        # Load from memory or verified disk
-        with _faiss_store_lock:
-            vectorstore = _faiss_stores.get(collection_name)
-
-        if vectorstore is None:
-            index_path = os.path.join(FAISS_INDEX_DIR, collection_name)
-            if not os.path.exists(index_path):
-                return "Error: The report index was not found. Please re-upload the report."
-
-            # Security: verify index integrity before loading
-            if not _verify_index_hash(index_path):
-                logger.error(f"FAISS index integrity check failed: {index_path}")
-                return "Error: Report index integrity check failed. Please re-upload the report."
-
-            # Safe to load — hash verified
-            vectorstore = FAISS.load_local(
-                index_path,
-                embeddings,
-                allow_dangerous_deserialization=True,  # safe: hash verified above
-            )
-            with _faiss_store_lock:
-                _faiss_stores[collection_name] = vectorstore
-
-        retriever = vectorstore.as_retriever(search_kwargs={"k": 6})
-        retrieved_docs = retriever.invoke(question)
-        context = "\n".join([doc.page_content for doc in retrieved_docs])
-
-        if not retrieved_docs:
-            logger.warning(f"rag_retrieve: no docs retrieved for namespace={collection_name}")
-
-        # Build conversation history (last N turns)
-        with chat_history_lock:
-            history_turns = chat_history_store[session_id][-CHAT_HISTORY_MAX_TURNS:]
-
-        history_context = ""
-        if history_turns:
-            lines = []
-            for user_msg, assistant_msg in history_turns:
-                lines.append(f"User: {user_msg}\nAssistant: {assistant_msg}")
-            history_context = "\nPrevious conversation:\n" + "\n".join(lines)
-
-        # Build analysis state context
-        if report_context is None and session_id in report_state_store:
-            report_context = report_state_store[session_id]
-
-        report_context_str = ""
-        if report_context:
-            if hasattr(report_context, "model_dump"):
-                ctx_data = report_context.model_dump()
-            elif hasattr(report_context, "dict"):
-                ctx_data = report_context.dict()
-            else:
-                ctx_data = report_context if isinstance(report_context, dict) else {}
-
-            # Truncate raw text to prevent context overflow
-            if ctx_data.get("raw_text") and len(ctx_data["raw_text"]) > 3000:
-                ctx_data["raw_text"] = ctx_data["raw_text"][:3000] + "... [truncated]"
-            # Remove raw_file_path (sensitive)
-            ctx_data.pop("raw_file_path", None)
-
-            report_context_str = json.dumps(ctx_data, indent=2, default=str)
-
-        # System message carries the clinical-specialist persona (shared across
-        # all nodes) AND the RAG-specific scope / formatting rules. Human
-        # message carries the dynamic per-turn context.
-        prompt = ChatPromptTemplate.from_messages([
-            ("system", MEDICAL_SYSTEM_PROMPT + """
+# System message carries the clinical-specialist persona (shared across all
+# nodes) AND the RAG-specific scope / formatting rules. Human message carries
+# the dynamic per-turn context.
+_CHAT_PROMPT = ChatPromptTemplate.from_messages([
+    ("system", MEDICAL_SYSTEM_PROMPT + """
 
 You are now acting as a dedicated AI medical assistant analyzing a patient's uploaded blood report.
 Your sole purpose here is to explain findings, clarify medical terms, and answer questions about THIS specific report.
@@ -310,7 +232,7 @@ For report-related questions:
 4. Use ### Subheadings to structure longer answers.
 5. Never make definitive diagnoses. Always recommend consulting a doctor for medical decisions.
 6. If a critical value was found, remind the user to seek medical attention promptly."""),
-            ("human", """FULL Analysis State:
+    ("human", """FULL Analysis State:
 {report_context}
 
 Retrieved Report Excerpts:
@@ -322,27 +244,200 @@ Conversation History:
 User Question: {question}
 
 Answer:"""),
-        ])
+])
 
-        llm = get_llm()
+_CHAT_ERROR_ANSWER = "I encountered an error while processing your question. Please try again."
 
-        result = (prompt | llm).invoke({
-            "context": context,
-            "question": question,
-            "history": history_context,
-            "report_context": report_context_str,
-        })
 
-        answer = result.content.strip() if hasattr(result, "content") else str(result).strip()
+def _prepare_chat(question: str, collection_name: str, session_id: str, report_context: Any):
+    """
+    Retrieval + history + report context for one chat turn.
+    Returns (prompt inputs, None), or (None, error answer) when the index is unusable.
+    """
+    _touch_session(session_id)
+
+    with chat_history_lock:
+        if session_id not in chat_history_store:
+            chat_history_store[session_id] = []
+
+    embeddings = get_embeddings()
+
+    # Load from memory or verified disk
+    with _faiss_store_lock:
+        vectorstore = _faiss_stores.get(collection_name)
+
+    if vectorstore is None:
+        index_path = os.path.join(FAISS_INDEX_DIR, collection_name)
+        if not os.path.exists(index_path):
+            return None, "Error: The report index was not found. Please re-upload the report."
+
+        # Security: verify index integrity before loading
+        if not _verify_index_hash(index_path):
+            logger.error(f"FAISS index integrity check failed: {index_path}")
+            return None, "Error: Report index integrity check failed. Please re-upload the report."
+
+        # Safe to load — hash verified
+        vectorstore = FAISS.load_local(
+            index_path,
+            embeddings,
+            allow_dangerous_deserialization=True,  # safe: hash verified above
+        )
+        with _faiss_store_lock:
+            _faiss_stores[collection_name] = vectorstore
+
+    retriever = vectorstore.as_retriever(search_kwargs={"k": 6})
+    retrieved_docs = retriever.invoke(question)
+    context = "\n".join([doc.page_content for doc in retrieved_docs])
+
+    if not retrieved_docs:
+        logger.warning(f"rag_retrieve: no docs retrieved for namespace={collection_name}")
+
+    # Build conversation history (last N turns)
+    with chat_history_lock:
+        history_turns = chat_history_store[session_id][-CHAT_HISTORY_MAX_TURNS:]
+
+    history_context = ""
+    if history_turns:
+        lines = []
+        for user_msg, assistant_msg in history_turns:
+            lines.append(f"User: {user_msg}\nAssistant: {assistant_msg}")
+        history_context = "\nPrevious conversation:\n" + "\n".join(lines)
+
+    # Build analysis state context
+    if report_context is None and session_id in report_state_store:
+        report_context = report_state_store[session_id]
+
+    report_context_str = ""
+    if report_context:
+        if hasattr(report_context, "model_dump"):
+            ctx_data = report_context.model_dump()
+        elif hasattr(report_context, "dict"):
+            ctx_data = report_context.dict()
+        else:
+            ctx_data = report_context if isinstance(report_context, dict) else {}
+
+        # Truncate raw text to prevent context overflow
+        if ctx_data.get("raw_text") and len(ctx_data["raw_text"]) > 3000:
+            ctx_data["raw_text"] = ctx_data["raw_text"][:3000] + "... [truncated]"
+        # Remove raw_file_path (sensitive)
+        ctx_data.pop("raw_file_path", None)
+
+        report_context_str = json.dumps(ctx_data, indent=2, default=str)
+
+    return {
+        "context": context,
+        "question": question,
+        "history": history_context,
+        "report_context": report_context_str,
+    }, None
+
+
+def _remember_turn(session_id: str, question: str, answer: str) -> None:
+    # setdefault: the TTL sweeper may have purged the session mid-request
+    with chat_history_lock:
+        chat_history_store.setdefault(session_id, []).append((question, answer))
 
-        with chat_history_lock:
-            chat_history_store[session_id].append((question, answer))
 
+def rag_retrieve_and_answer(
+    question: str,
+    collection_name: str,
+    session_id: str = None,
+    report_context: Any = None,
+) -> str:
+    """
+    Retrieve relevant context from FAISS and answer via LLM.
+    Validates FAISS index integrity before loading from disk.
+    """
+    if session_id is None:
+        session_id = "default"
+
+    try:
+        inputs, error_answer = _prepare_chat(question, collection_name, session_id, report_context)
+        if error_answer:
+            return error_answer
+
+        result = (_CHAT_PROMPT | get_llm()).invoke(inputs)
+        answer = result.content.strip() if hasattr(result, "content") else str(result).strip()
+
+        _remember_turn(session_id, question, answer)
         return answer
 
     except Exception as e:
         logger.exception(f"rag_retrieve_and_answer failed: {e}")
-        return f"I encountered an error while processing your question. Please try again."
+        return _CHAT_ERROR_ANSWER
+
+
+async def arag_retrieve_and_answer(
+    question: str,
+    collection_name: str,
+    session_id: str = None,
+    report_context: Any = None,
+) -> str:
+    """
+    Async rag_retrieve_and_answer: retrieval runs on the small retrieval pool,
+    the LLM call is awaited with `ainvoke`, so no thread is held during the
+    Groq round-trip. Cancelling the task (client disconnect) abandons the
+    call and leaves the chat history untouched.
+    """
+    if session_id is None:
+        session_id = "default"
+
+    try:
+        loop = asyncio.get_running_loop()
+        inputs, error_answer = await loop.run_in_executor(
+            _retrieval_executor, _prepare_chat, question, collection_name, session_id, report_context,
+        )
+        if error_answer:
+            return error_answer
+
+        result = await (_CHAT_PROMPT | get_llm()).ainvoke(inputs)
+        answer = result.content.strip() if hasattr(result, "content") else str(result).strip()
+
+        _remember_turn(session_id, question, answer)
+        return answer
+
+    except Exception as e:
+        logger.exception(f"arag_retrieve_and_answer failed: {e}")
+        return _CHAT_ERROR_ANSWER
+
+
+async def arag_stream_answer(
+    question: str,
+    collection_name: str,
+    session_id: str = None,
+    report_context: Any = None,
+) -> AsyncIterator[str]:
+    """
+    Same as arag_retrieve_and_answer, but yields the answer in pieces as Groq
+    generates them. The assembled answer is added to the chat history once the
+    completion finishes; an interrupted stream leaves the history untouched.
+    Failures are raised rather than yielded, so the caller can report them
+    apart from any pieces already sent.
+    """
+    if session_id is None:
+        session_id = "default"
+
+    loop = asyncio.get_running_loop()
+    inputs, error_answer = await loop.run_in_executor(
+        _retrieval_executor, _prepare_chat, question, collection_name, session_id, report_context,
+    )
+    if error_answer:
+        yield error_answer
+        return
+
+    parts = []
+    async for chunk in (_CHAT_PROMPT | get_llm()).astream(inputs):
+        text = chunk.content if hasattr(chunk, "content") else str(chunk)
+        if text:
+            parts.append(text)
+            yield text
+
+    _remember_turn(session_id, question, "".join(parts).strip())
+
+
+def shutdown_retrieval_pool() -> None:
+    """Stop the chat retrieval threads (API lifespan shutdown)."""
+    _retrieval_executor.shutdown(wait=False, cancel_futures=True)
 
 
 def get_chat_history(session_id: str = None) -> List[Tuple[str, str]]:
@@ -25,6 +25,39 @@ class RecsOutput(BaseModel):
     )
 
 
+def flatten_recommendations(recommendations: List[Recommendation]) -> List[str]:
+    """Flatten to list of strings for backward compatibility with frontend."""
+    return [f"[{r.priority.upper()}] {r.action} ({r.reason})" for r in recommendations]
+
+
+# Static guidance shared with nodes/fused_analysis.py.
+RECOMMENDATION_RULES = """PRIORITY LEVELS — assign in this order:
+1. 'critical'   → Any critical alert parameter. Recommend immediate medical evaluation.
+                   Example: "Go to an emergency room or call your doctor immediately."
+2. 'urgent'     → Risk score ≥7, urgency='urgent', or urgency='prompt'. Recommend seeing a doctor within 24-48 hours.
+3. 'follow-up'  → Moderate abnormalities, urgency='follow-up', or specific lab retests. Recommend within 1-4 weeks.
+4. 'lifestyle'  → Diet, hydration, exercise, sleep, supplement guidance relevant to findings.
+
+SPECIFICITY RULES:
+- Each recommendation must reference the SPECIFIC abnormal finding it addresses.
+- Do NOT give generic advice like "eat healthy" without tying it to a specific pattern.
+- CBC: Low Hemoglobin/Iron → iron-rich foods + Vitamin C. High WBC → physician referral. Low Platelets → avoid NSAIDs/aspirin.
+- LFT: High ALT/AST → avoid alcohol, hepatotoxic drugs; evaluate cause. Low Albumin → nutritional assessment.
+- KFT: High Creatinine/Urea → hydration, nephrology referral. High Uric Acid → low-purine diet, hydration.
+- Lipid: High LDL → reduce saturated fat, increase soluble fibre; statin discussion with doctor. Low HDL → exercise.
+- Thyroid: High TSH → endocrinology referral; avoid self-medicating with supplements.
+- Diabetes: High FBS/HbA1c → dietary consult, glycaemic monitoring, physician review.
+- Coagulation: Abnormal PT/INR → medication review (anticoagulants), haematology referral.
+- Electrolytes: Critical Potassium/Sodium → immediate medical evaluation — do NOT self-supplement.
+- Always end critical/urgent recommendations with "consult your doctor."
+
+SAFETY RULES:
+- Do NOT recommend specific medications or dosages.
+- Do NOT make definitive diagnoses.
+- Always advise professional consultation for any abnormal findings.
+- Lifestyle recommendations are supplementary, not replacements for medical care."""
+
+
 def recommendations_node(state):
     """
     Node: Generate prioritised, patient-specific recommendations.
@@ -39,8 +72,6 @@ def recommendations_node(state):
     interpreted = state.param_interpretation or {}
     patient_info = state.patient_info or {}
 
-    errors = list(getattr(state, "errors", []) or [])
-
     if not synthesis and not interpreted:
         logger.warning("recommendations: no synthesis or interpretation data")
         return {"recommendations": []}
@@ -102,31 +133,7 @@ SYNTHESIS SUMMARY
 RECOMMENDATION RULES (MANDATORY)
 ═══════════════════════════════════════
 
-PRIORITY LEVELS — assign in this order:
-1. 'critical'   → Any critical alert parameter. Recommend immediate medical evaluation.
-                   Example: "Go to an emergency room or call your doctor immediately."
-2. 'urgent'     → Risk score ≥7, urgency='urgent', or urgency='prompt'. Recommend seeing a doctor within 24-48 hours.
-3. 'follow-up'  → Moderate abnormalities, urgency='follow-up', or specific lab retests. Recommend within 1-4 weeks.
-4. 'lifestyle'  → Diet, hydration, exercise, sleep, supplement guidance relevant to findings.
-
-SPECIFICITY RULES:
-- Each recommendation must reference the SPECIFIC abnormal finding it addresses.
-- Do NOT give generic advice like "eat healthy" without tying it to a specific pattern.
-- CBC: Low Hemoglobin/Iron → iron-rich foods + Vitamin C. High WBC → physician referral. Low Platelets → avoid NSAIDs/aspirin.
-- LFT: High ALT/AST → avoid alcohol, hepatotoxic drugs; evaluate cause. Low Albumin → nutritional assessment.
-- KFT: High Creatinine/Urea → hydration, nephrology referral. High Uric Acid → low-purine diet, hydration.
-- Lipid: High LDL → reduce saturated fat, increase soluble fibre; statin discussion with doctor. Low HDL → exercise.
-- Thyroid: High TSH → endocrinology referral; avoid self-medicating with supplements.
-- Diabetes: High FBS/HbA1c → dietary consult, glycaemic monitoring, physician review.
-- Coagulation: Abnormal PT/INR → medication review (anticoagulants), haematology referral.
-- Electrolytes: Critical Potassium/Sodium → immediate medical evaluation — do NOT self-supplement.
-- Always end critical/urgent recommendations with "consult your doctor."
-
-SAFETY RULES:
-- Do NOT recommend specific medications or dosages.
-- Do NOT make definitive diagnoses.
-- Always advise professional consultation for any abnormal findings.
-- Lifestyle recommendations are supplementary, not replacements for medical care.
+{RECOMMENDATION_RULES}
 
 Generate 4-7 recommendations, most critical first.
 
@@ -155,11 +162,7 @@ Generate 4-7 recommendations, most critical first.
         response = llm.invoke(messages)
         parsed = parser.invoke(response)
 
-        # Flatten to list of strings for backward compatibility with frontend
-        rec_strings = [
-            f"[{r.priority.upper()}] {r.action} ({r.reason})"
-            for r in parsed.recommendations
-        ]
+        rec_strings = flatten_recommendations(parsed.recommendations)
         logger.info(f"recommendations: {len(rec_strings)} generated, urgency={urgency}")
         return {"recommendations": rec_strings}
 
@@ -169,14 +172,11 @@ Generate 4-7 recommendations, most critical first.
             llm = get_fallback_llm(max_tokens=1000)
             response = llm.invoke(messages)
             parsed = parser.invoke(response)
-            rec_strings = [
-                f"[{r.priority.upper()}] {r.action} ({r.reason})"
-                for r in parsed.recommendations
-            ]
+            rec_strings = flatten_recommendations(parsed.recommendations)
             return {"recommendations": rec_strings}
         except Exception as e2:
             logger.exception(f"recommendations: fallback also failed: {type(e2).__name__}: {e2}")
             return {
                 "recommendations": [],
-                "errors": errors + [f"Recommendations Node failed: {str(e2)}"],
+                "errors": [f"Recommendations Node failed: {str(e2)}"],
             }
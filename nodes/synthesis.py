@@ -12,6 +12,25 @@ _DISCLAIMER = (
 )
 
 
+# Static guidance shared with nodes/fused_analysis.py.
+REPORT_WRITING_RULES = """1. Start with a brief opening that states the overall picture (reassuring or concerning).
+2. Explain each CRITICAL alert first (if any), in plain language, including why it matters.
+3. Explain ABNORMAL findings with context — what they mean for THIS patient.
+4. Briefly acknowledge normal findings to provide balance and reassurance.
+5. Summarise the clinical patterns and what they suggest overall.
+6. Close with urgency-appropriate next steps:
+   - routine: "Consider routine follow-up with your doctor."
+   - follow-up: "Schedule a follow-up appointment within 4-6 weeks."
+   - prompt: "Please see your doctor within the next week."
+   - urgent: "Please seek medical attention promptly — do not delay."
+7. Use **bold** for key parameter names and findings.
+8. Do NOT use # or ## headers. Use **Bold** for section titles instead.
+9. Do NOT use horizontal rules (---).
+10. Be concise — 250-400 words total.
+11. Do NOT sign as a doctor or medical professional.
+12. Do NOT make definitive diagnoses."""
+
+
 def synthesis_node(state):
     """
     Node: Synthesizes all upstream findings into a coherent, patient-friendly report.
@@ -112,22 +131,7 @@ Adjusted Concerns:
 ═══════════════════════════════════════
 REPORT WRITING RULES (STRICT)
 ═══════════════════════════════════════
-1. Start with a brief opening that states the overall picture (reassuring or concerning).
-2. Explain each CRITICAL alert first (if any), in plain language, including why it matters.
-3. Explain ABNORMAL findings with context — what they mean for THIS patient.
-4. Briefly acknowledge normal findings to provide balance and reassurance.
-5. Summarise the clinical patterns and what they suggest overall.
-6. Close with urgency-appropriate next steps:
-   - routine: "Consider routine follow-up with your doctor."
-   - follow-up: "Schedule a follow-up appointment within 4-6 weeks."
-   - prompt: "Please see your doctor within the next week."
-   - urgent: "Please seek medical attention promptly — do not delay."
-7. Use **bold** for key parameter names and findings.
-8. Do NOT use # or ## headers. Use **Bold** for section titles instead.
-9. Do NOT use horizontal rules (---).
-10. Be concise — 250-400 words total.
-11. Do NOT sign as a doctor or medical professional.
-12. Do NOT make definitive diagnoses.
+{REPORT_WRITING_RULES}
 """
 
     # Prepend medical system prompt so the narrative report is written
@@ -153,4 +157,4 @@ REPORT WRITING RULES (STRICT)
             return {"synthesis_report": report + _DISCLAIMER}
         except Exception as e2:
             logger.error(f"synthesis fallback also failed: {e2}")
-            return {"errors": state.errors + [f"Synthesis Node failed: {str(e2)}"]}
+            return {"errors": [f"Synthesis Node failed: {str(e2)}"]}
@@ -13,7 +13,11 @@ even if we don't have a curated range for it.
 
 import logging
 import re
-from utils.reference_ranges import load_reference_ranges
+import sys
+from functools import lru_cache
+from typing import NamedTuple
+
+from utils.reference_ranges import gender_key, get_reference_table, resolve_range
 
 logger = logging.getLogger(__name__)
 
@@ -288,6 +292,8 @@ UNIT_CONVERSIONS: dict = {
     ("Hematocrit",          "l/l"):   (100.0, "%"),
     # MCHC: DB g/dL  UK/AU report g/L → ÷ 10
     ("MCHC", "g/l"):  (0.1, "g/dL"),
+    # Many labs print MCHC as "%" (g per 100 mL of cells) — numerically g/dL
+    ("MCHC", "%"):    (1.0, "g/dL"),
     # Hemoglobin: DB g/dL  SI: mmol/L  factor: × 1.6113
     ("Hemoglobin", "mmol/l"):  (1.6113, "g/dL"),
     # Reticulocyte Count: DB /cumm (absolute cells)  if reported as /mm3 same numeric
@@ -383,13 +389,6 @@ UNIT_CONVERSIONS: dict = {
     ("Ceruloplasmin", "g/l"):  (100.0, "mg/dL"),
 }
 
-_GENDER_KEY_MAP = {
-    "male": "adult_male", "m": "adult_male",
-    "female": "adult_female", "f": "adult_female",
-    "woman": "adult_female", "man": "adult_male",
-}
-
-
 def normalize_numeric(value):
     try:
         if isinstance(value, str):
@@ -412,6 +411,22 @@ def normalize_scale(param, value):
     return value
 
 
+# ─────────────────────────────────────────────────────────────────────────────
+# Unit registry
+# Raw unit strings repeat endlessly across reports ("g/dL", "mg/dl", "µmol/L"),
+# so normalisation is memoized and every (param, raw unit) pair resolves once
+# to a precomputed affine transform, a no-op, or a dimension mismatch.
+# ─────────────────────────────────────────────────────────────────────────────
+
+_UNIT_CHAR_MAP = str.maketrans({
+    "\u03bc": "u", "\u00b5": "u",                       # Greek mu / micro sign
+    "³": "3", "²": "2", "⁹": "9", "¹": "1", "⁰": "0",   # superscript digits
+    "×": "x", "·": None,                                # multiplication / middle dot
+    " ": None, "(": None, ")": None, ".": None,
+})
+
+
+@lru_cache(maxsize=2048)
 def _normalise_unit(raw_unit: str) -> str:
     """
     Normalise a raw unit string to a canonical lowercase token for lookup.
@@ -421,20 +436,90 @@ def _normalise_unit(raw_unit: str) -> str:
       - Multiplication signs: ×, ·  → 'x'
       - Whitespace, parentheses, dots stripped
       - Per-unit slashes normalised
+    Results are interned and memoized per raw string.
     """
     if not raw_unit:
         return ""
-    u = raw_unit.strip()
-    # Greek mu / micro sign → 'u'
-    u = u.replace("\u03bc", "u").replace("\u00b5", "u")
-    # Superscript digits
-    for sup, dig in [("³", "3"), ("²", "2"), ("⁹", "9"), ("¹", "1"), ("⁰", "0")]:
-        u = u.replace(sup, dig)
-    # Multiplication / middle dot
-    u = u.replace("×", "x").replace("·", "")
-    # Remove spaces, parentheses, trailing dots
-    u = u.replace(" ", "").replace("(", "").replace(")", "").replace(".", "")
-    return u.lower()
+    return sys.intern(raw_unit.strip().translate(_UNIT_CHAR_MAP).lower())
+
+
+# Physical dimension of a normalised unit, for units we can classify with
+# confidence. None means "unknown" and never blocks validation.
+_UNIT_DIMENSIONS = (
+    ("mass_concentration",     re.compile(r"^(?:[kmunpf]?g|gms?)(?:/(?:[dcmu]?l)|%)$")),
+    ("substance_concentration", re.compile(r"^(?:[munpf]?mol|meq)/[dm]?l$")),
+    ("catalytic_concentration", re.compile(r"^(?:[kmu]?i?u|[mun]?kat)/[dm]?l$")),
+    ("number_concentration",   re.compile(r"(?:cumm|cmm|mm3|/ul$|/nl$|10\^?\d+/l$|^/l$)")),
+    ("percent",                re.compile(r"^%$")),
+    ("volume_fraction",        re.compile(r"^l/l$")),
+    ("time",                   re.compile(r"^(?:s|sec|secs|seconds?|min|mins|minutes?)$")),
+)
+
+
+@lru_cache(maxsize=512)
+def unit_dimension(unit: str):
+    """Dimension name for a raw or normalised unit string, or None if unclassified."""
+    norm = _normalise_unit(unit)
+    for dimension, pattern in _UNIT_DIMENSIONS:
+        if pattern.search(norm):
+            return dimension
+    return None
+
+
+UNIT_INCOMPATIBLE = "incompatible"   # sentinel returned by UnitRegistry.transform
+
+
+class UnitRegistry:
+    """
+    Precomputed UNIT_CONVERSIONS lookup.
+
+    `transform(param, raw_unit, db_units)` returns
+      None                      — already in a DB unit (or unclassifiable): use as-is
+      (factor, offset, target)  — convert: value × factor + offset
+      UNIT_INCOMPATIBLE         — the unit's dimension differs from the DB unit's
+                                  and no conversion exists (e.g. Hemoglobin in
+                                  mmol/L with no factor) — the curated range
+                                  must not be applied.
+    Results are cached per (param, db_units), so the common "already in DB
+    unit" case is two dict hits with no string work whichever caller asks.
+    """
+
+    _MAX_UNITS_PER_PARAM = 256   # OCR garbage units shouldn't grow the cache forever
+
+    def __init__(self, conversions: dict):
+        self._conversions: dict = {}
+        for (param, unit), conversion in conversions.items():
+            offset = conversion[2] if len(conversion) > 2 else 0.0
+            self._conversions.setdefault(param, {})[sys.intern(unit)] = (conversion[0], offset, conversion[1])
+        self._resolved: dict = {}   # (param, db_units) -> {raw_unit: transform}
+
+    def transform(self, param: str, raw_unit: str, db_units: tuple = ()):
+        if not raw_unit:
+            return None
+        key = (param, db_units)
+        cache = self._resolved.get(key)
+        if cache is None or len(cache) > self._MAX_UNITS_PER_PARAM:
+            cache = self._resolved[key] = {}
+        try:
+            return cache[raw_unit]
+        except KeyError:
+            result = cache[raw_unit] = self._resolve(param, raw_unit, db_units)
+            return result
+
+    def _resolve(self, param: str, raw_unit: str, db_units: tuple):
+        norm = _normalise_unit(raw_unit)
+        conversion = self._conversions.get(param, {}).get(norm)
+        if conversion:
+            return conversion
+        if not db_units or norm in {_normalise_unit(u) for u in db_units}:
+            return None
+        raw_dim, db_dim = unit_dimension(norm), unit_dimension(db_units[0])
+        if raw_dim and db_dim and raw_dim != db_dim:
+            return UNIT_INCOMPATIBLE
+        return None
+
+
+UNITS = UnitRegistry(UNIT_CONVERSIONS)
 
 
 def apply_unit_conversion(param, raw_unit, value):
@@ -447,57 +532,41 @@ def apply_unit_conversion(param, raw_unit, value):
       (factor, unit, offset)  → result = (value × factor) + offset
     The offset form is used for affine conversions (e.g. HbA1c IFCC→NGSP).
     """
-    if not raw_unit:
+    transform = UNITS.transform(param, raw_unit)
+    if transform is None:
         return value
-    normalised = _normalise_unit(raw_unit)
-    key = (param, normalised)
-    conversion = UNIT_CONVERSIONS.get(key)
-    if conversion:
-        factor = conversion[0]
-        offset = conversion[2] if len(conversion) > 2 else 0.0
-        target_unit = conversion[1]
-        result = (value * factor) + offset
-        logger.debug(
-            "unit_conversion: %s %s '%s' x%s +%s -> %s %s",
-            param, value, raw_unit, factor, offset, result, target_unit,
-        )
-        return result
-    return value
+    factor, offset, target_unit = transform
+    result = (value * factor) + offset
+    logger.debug(
+        "unit_conversion: %s %s '%s' x%s +%s -> %s %s",
+        param, value, raw_unit, factor, offset, result, target_unit,
+    )
+    return result
 
 
 def resolve_reference(ref, gender: str = None, age_bucket_key: str = None):
     """
-    Resolve a reference range from our database.
-    Priority:
-      1. Pediatric age bucket (newborn/infant/toddler/child/adolescent) when
-         patient is non-adult — this MUST beat adult-gender ranges to avoid
-         flagging infants against adult thresholds.
-      2. Gender-adjusted adult range (adult_male / adult_female).
-      3. Generic adult / neutral range.
+    Resolve a reference range from one reference_ranges.json entry.
+    Pediatric bucket beats gender-adjusted adult range beats generic adult
+    range — see utils.reference_ranges.resolve_range. Validation itself reads
+    the pre-resolved ReferenceRangeTable instead of calling this per value.
     """
-    if not isinstance(ref, dict):
-        return None, None
-    if "low" in ref and "high" in ref:
-        return ref["low"], ref["high"]
-
-    # Pediatric first — for anyone under 18
-    pediatric = age_bucket_key and age_bucket_key != "adult"
-    if pediatric:
-        if age_bucket_key in ref and isinstance(ref[age_bucket_key], dict):
-            return ref[age_bucket_key].get("low"), ref[age_bucket_key].get("high")
-        # No pediatric bucket for this param → do NOT apply adult range.
-        # Returning (None, None) lets caller fall back to the report-embedded range
-        # (priority 2) instead of misflagging the child against adult thresholds.
-        return None, None
+    return resolve_range(ref, gender_key(gender), age_bucket_key)
 
-    if gender:
-        gender_key = _GENDER_KEY_MAP.get(gender.lower().strip())
-        if gender_key and gender_key in ref and isinstance(ref[gender_key], dict):
-            return ref[gender_key].get("low"), ref[gender_key].get("high")
-    for key in ("adult", "adult_male", "adult_female"):
-        if key in ref and isinstance(ref[key], dict):
-            return ref[key].get("low"), ref[key].get("high")
-    return None, None
+
+def printed_flag(report_flag_raw: str):
+    """
+    Normalize a flag printed in the report ("H", "↑", "Low", "WNL", …) to
+    HIGH / LOW / NORMAL. Returns None for anything unrecognised.
+    """
+    rfu = report_flag_raw.strip().upper()
+    if rfu in ("H", "HH", "HIGH", "↑", "A") or rfu.startswith("H"):
+        return "HIGH"
+    if rfu in ("L", "LL", "LOW", "↓") or rfu.startswith("L"):
+        return "LOW"
+    if rfu in ("N", "NORMAL", "WNL", "NL"):
+        return "NORMAL"
+    return None
 
 
 def determine_flag(value, low, high):
@@ -510,10 +579,82 @@ def determine_flag(value, low, high):
     return "NORMAL"
 
 
+# Where a validated value's reference range came from
+REF_REPORT, REF_DATABASE, REF_NONE = "report", "database", "none"
+
+
+class RowRange(NamedTuple):
+    """How one extracted value is validated (see `resolve_row`)."""
+    ref_source: str     # REF_REPORT / REF_DATABASE / REF_NONE
+    low: float
+    high: float
+    factor: float       # unit conversion to apply after scale rules; None = none
+    offset: float
+    unit: str           # unit the standardized value is expressed in
+    flag: str           # flag fixed by the report / pass-through; None = compare to range
+
+
+def resolve_row(param, info, ranges, gender_key, age_key) -> RowRange:
+    """
+    Choose the reference range, unit transform and recorded unit for one
+    extracted value. Shared by `validate_and_standardize` and the columnar
+    backfill path (nodes/batch_validation.py); only the value arithmetic
+    (`normalize_scale` + factor/offset, then `determine_flag`) is left to
+    the caller.
+    """
+    raw_unit = info.get("unit")
+    report_flag_raw = info.get("report_flag")
+
+    # ── Priority 1: reference range embedded in the report ──────────────────
+    # Report-printed ranges are most authoritative — they already account
+    # for patient age/gender/lab-specific methodology.
+    # IMPORTANT: do NOT apply scale normalization here. Both the patient
+    # value and the ref range were printed by the lab in the same unit
+    # (e.g. both in thou/mm3). Scaling the value but not the range would
+    # produce false HIGH/LOW flags (e.g. WBC 6.10→6100 vs ref 4.0-10.0).
+    report_low = info.get("report_ref_low")
+    report_high = info.get("report_ref_high")
+    if report_low is not None and report_high is not None:
+        # Use the flag already printed in the report if available,
+        # otherwise compute from the embedded range
+        flag = (report_flag_raw and printed_flag(report_flag_raw)) or None
+        return RowRange(REF_REPORT, report_low, report_high, None, None, raw_unit, flag)
+
+    # Scale correction and unit conversion only apply when using DB ranges.
+    # Labs that print their own ref ranges use consistent units throughout,
+    # so no scaling is needed for the report-range path above.
+    transform = UNITS.transform(param, raw_unit, ranges.units(param))
+    factor = offset = None
+    if transform is UNIT_INCOMPATIBLE:
+        # e.g. a molar unit for a param curated in mass units with no known
+        # factor — flagging against the DB range would be meaningless.
+        logger.info(
+            f"validate: '{param}' unit '{raw_unit}' cannot convert to "
+            f"'{ranges.default_unit(param)}' — skipping curated range"
+        )
+    elif transform is not None:
+        factor, offset = transform[0], transform[1]
+    # Record the unit the value is now expressed in, not the printed one
+    unit = transform[2] if isinstance(transform, tuple) else raw_unit
+
+    # ── Priority 2: curated reference database ───────────────────────────────
+    if param in ranges and transform is not UNIT_INCOMPATIBLE:
+        low, high = ranges.lookup(param, gender_key, age_key)
+        if low is not None and high is not None:
+            return RowRange(REF_DATABASE, low, high, factor, offset, unit or ranges.default_unit(param), None)
+
+    # ── Priority 3: no range at all — pass through with UNKNOWN flag ─────────
+    flag = (printed_flag(report_flag_raw) or "NORMAL") if report_flag_raw else "UNKNOWN"
+    return RowRange(REF_NONE, None, None, factor, offset, unit, flag)
+
+
 def validate_and_standardize(state):
-    ranges = load_reference_ranges()
+    # Preloaded, pre-resolved table — reloaded only when the JSON changes
+    ranges = get_reference_table()
     cleaned = {}
-    errors = list(getattr(state, "errors", []) or [])
+    # Only this node's new errors — ReportState.errors has an add-reducer, so
+    # LangGraph appends them to whatever upstream nodes already reported.
+    errors = []
 
     extracted = getattr(state, "extracted_params", {}) or {}
     patient_info = getattr(state, "patient_info", {}) or {}
@@ -521,6 +662,7 @@ def validate_and_standardize(state):
     age_raw = patient_info.get("Age")
     age_years = parse_age_to_years(age_raw)
     age_key = age_bucket(age_years)
+    sex_key = gender_key(gender)
 
     if gender:
         logger.info(f"validate: using gender-adjusted ranges for gender='{gender}'")
@@ -530,13 +672,10 @@ def validate_and_standardize(state):
             f"(pediatric ranges applied when available)"
         )
 
-    validated_count = 0
-    report_range_count = 0
-    passthrough_count = 0
+    counts = {REF_REPORT: 0, REF_DATABASE: 0, REF_NONE: 0}
 
     for param, info in extracted.items():
         raw_val = info.get("value")
-        raw_unit = info.get("unit")
 
         if raw_val is None:
             errors.append(f"{param}: missing value")
@@ -547,95 +686,27 @@ def validate_and_standardize(state):
             errors.append(f"{param}: invalid numeric value '{raw_val}'")
             continue
 
-        # ── Priority 1: reference range embedded in the report ──────────────
-        # Report-printed ranges are most authoritative — they already account
-        # for patient age/gender/lab-specific methodology.
-        # IMPORTANT: do NOT apply scale normalization here. Both the patient
-        # value and the ref range were printed by the lab in the same unit
-        # (e.g. both in thou/mm3). Scaling the value but not the range would
-        # produce false HIGH/LOW flags (e.g. WBC 6.10→6100 vs ref 4.0-10.0).
-        report_low = info.get("report_ref_low")
-        report_high = info.get("report_ref_high")
-
-        if report_low is not None and report_high is not None:
-            # Use the flag already printed in the report if available,
-            # otherwise compute from the embedded range
-            report_flag_raw = info.get("report_flag")
-            if report_flag_raw:
-                # Normalize printed flag to LOW/HIGH/NORMAL
-                rfu = report_flag_raw.strip().upper()
-                if rfu in ("H", "HH", "HIGH", "↑", "A") or rfu.startswith("H"):
-                    flag = "HIGH"
-                elif rfu in ("L", "LL", "LOW", "↓") or rfu.startswith("L"):
-                    flag = "LOW"
-                elif rfu in ("N", "NORMAL", "WNL", "NL"):
-                    flag = "NORMAL"
-                else:
-                    flag = determine_flag(value, report_low, report_high)
-            else:
-                flag = determine_flag(value, report_low, report_high)
-
-            cleaned[param] = {
-                "value": value,
-                "unit": raw_unit,
-                "reference": {"low": report_low, "high": report_high},
-                "flag": flag,
-                "ref_source": "report",   # indicates range came from the report itself
-            }
-            report_range_count += 1
-            continue
-
-        # Scale correction and unit conversion only apply when using DB ranges.
-        # Labs that print their own ref ranges use consistent units throughout,
-        # so no scaling is needed for the report-range path above.
-        value = normalize_scale(param, value)
-        value = apply_unit_conversion(param, raw_unit, value)
-
-        # ── Priority 2: curated reference database ───────────────────────────
-        if param in ranges:
-            ref_entry = ranges[param].get("reference")
-            low, high = resolve_reference(ref_entry, gender=gender, age_bucket_key=age_key)
-
-            if low is not None and high is not None:
-                flag = determine_flag(value, low, high)
-                units = ranges[param].get("units")
-                unit = raw_unit or (units[0] if isinstance(units, list) and units else None)
-                cleaned[param] = {
-                    "value": value,
-                    "unit": unit,
-                    "reference": {"low": low, "high": high},
-                    "flag": flag,
-                    "ref_source": "database",
-                }
-                validated_count += 1
-                continue
-
-        # ── Priority 3: no range at all — pass through with UNKNOWN flag ─────
-        report_flag_raw = info.get("report_flag")
-        if report_flag_raw:
-            rfu = report_flag_raw.strip().upper()
-            if rfu in ("H", "HH", "HIGH", "↑", "A") or rfu.startswith("H"):
-                flag = "HIGH"
-            elif rfu in ("L", "LL", "LOW", "↓") or rfu.startswith("L"):
-                flag = "LOW"
-            else:
-                flag = "NORMAL"
-        else:
-            flag = "UNKNOWN"
+        row = resolve_row(param, info, ranges, sex_key, age_key)
+        if row.ref_source != REF_REPORT:
+            value = normalize_scale(param, value)
+            if row.factor is not None:
+                value = (value * row.factor) + row.offset
 
+        flag = row.flag or determine_flag(value, row.low, row.high)
         cleaned[param] = {
             "value": value,
-            "unit": raw_unit,
-            "reference": {"low": None, "high": None},
+            "unit": row.unit,
+            "reference": {"low": row.low, "high": row.high},
             "flag": flag,
-            "ref_source": "none",
+            "ref_source": row.ref_source,
         }
-        passthrough_count += 1
-        logger.debug(f"validate: '{param}' — no reference range, passing through with flag={flag}")
+        counts[row.ref_source] += 1
+        if row.ref_source == REF_NONE:
+            logger.debug(f"validate: '{param}' — no reference range, passing through with flag={flag}")
 
     logger.info(
-        f"validate: {validated_count} from DB, {report_range_count} from report ranges, "
-        f"{passthrough_count} pass-through, {len(errors)} errors"
+        f"validate: {counts[REF_DATABASE]} from DB, {counts[REF_REPORT]} from report ranges, "
+        f"{counts[REF_NONE]} pass-through, {len(errors)} errors"
     )
     return {"validated_params": cleaned, "errors": errors}
 
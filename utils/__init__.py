@@ -6,4 +6,7 @@ __all__ = [
     "reference_ranges",
     "mapping",
     "unit_conversion",
+    "rate_limiter",
+    "disk_cache",
+    "result_cache",
 ]
@@ -0,0 +1,201 @@
+"""
+Admission control for full pipeline runs (OCR → graph → RAG indexing).
+
+Every analysis holds OCR buffers, the embedding model's activations and
+several in-flight LLM calls; on a 512 MB instance a handful of concurrent
+uploads is enough to run out of memory. Only PIPELINE_SLOTS runs execute at
+once, whichever endpoint started them (/analyze, /analyze/stream, /jobs).
+
+Callers beyond that wait in a bounded queue: at most PIPELINE_QUEUE_MAX
+waiters, each for at most PIPELINE_QUEUE_TIMEOUT seconds. A caller that
+finds the queue full, or times out in it, gets `AdmissionRejected` carrying
+a Retry-After estimate so the API can answer 503 instead of thrashing.
+Job workers are already bounded by JOB_WORKERS/JOB_QUEUE_MAX, so they wait
+for a slot without the queue cap or timeout.
+
+`stats()` reports slot use, queue depth, wait times and run times for
+capacity planning (served under `admission` in /metrics).
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+PIPELINE_SLOTS = int(os.environ.get("PIPELINE_SLOTS", "2"))
+PIPELINE_QUEUE_MAX = int(os.environ.get("PIPELINE_QUEUE_MAX", "4"))
+# Well under the 300 s /analyze hard limit, so a queued request still has
+# time to run once admitted.
+PIPELINE_QUEUE_TIMEOUT_SECONDS = float(os.environ.get("PIPELINE_QUEUE_TIMEOUT", "120"))
+
+# Retry-After bounds; the estimate itself comes from recent run times.
+_RETRY_AFTER_MIN_SECONDS = 5
+_RETRY_AFTER_MAX_SECONDS = 300
+_RETRY_AFTER_DEFAULT_SECONDS = 30
+# Recent waits / runs kept for percentiles and the Retry-After estimate
+_SAMPLE_SIZE = 256
+
+
+class AdmissionRejected(RuntimeError):
+    """No pipeline slot available (queue full or wait timed out)."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+def _percentile(samples, pct: float):
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * pct))], 3)
+
+
+class AdmissionController:
+    def __init__(self, slots: int, max_waiting: int, queue_timeout: float):
+        self.slots = max(1, slots)
+        self.max_waiting = max(0, max_waiting)
+        self.queue_timeout = queue_timeout
+        self._cond = threading.Condition()
+        self._in_use = 0
+        # Waiters in arrival order; only the head may take a freed slot
+        self._queue = deque()
+        self._max_waiting_seen = 0
+        self._waits = deque(maxlen=_SAMPLE_SIZE)
+        self._runs = deque(maxlen=_SAMPLE_SIZE)
+        self._stats = {
+            "admitted": 0, "queued": 0, "rejected_queue_full": 0, "rejected_timeout": 0,
+            "wait_seconds_total": 0.0, "wait_seconds_max": 0.0,
+        }
+
+    def retry_after(self) -> int:
+        """Seconds until a slot is likely free for a new caller: queue ahead × mean run / slots."""
+        with self._cond:
+            return self._retry_after_locked()
+
+    def _retry_after_locked(self) -> int:
+        if not self._runs:
+            return _RETRY_AFTER_DEFAULT_SECONDS
+        mean_run = sum(self._runs) / len(self._runs)
+        estimate = math.ceil(mean_run * (len(self._queue) + 1) / self.slots)
+        return max(_RETRY_AFTER_MIN_SECONDS, min(_RETRY_AFTER_MAX_SECONDS, estimate))
+
+    def check(self) -> None:
+        """Raise AdmissionRejected now if acquire() would (every slot busy, queue full)."""
+        with self._cond:
+            if self._in_use >= self.slots and len(self._queue) >= self.max_waiting:
+                self._reject_queue_full()
+
+    def _reject_queue_full(self) -> None:
+        """Caller holds the lock."""
+        self._stats["rejected_queue_full"] += 1
+        raise AdmissionRejected(
+            f"{self._in_use} pipeline runs active and {len(self._queue)} waiting",
+            self._retry_after_locked(),
+        )
+
+    def acquire(self, bounded: bool = True) -> float:
+        """
+        Block until a slot is free and take it, first come first served.
+        Returns the seconds spent waiting.
+        `bounded=False` skips the queue cap and timeout (job workers).
+        Raises AdmissionRejected.
+        """
+        start = time.monotonic()
+        with self._cond:
+            if self._in_use < self.slots and not self._queue:
+                self._admit(0.0)
+                return 0.0
+            if bounded and len(self._queue) >= self.max_waiting:
+                self._reject_queue_full()
+            ticket = object()
+            self._queue.append(ticket)
+            self._max_waiting_seen = max(self._max_waiting_seen, len(self._queue))
+            self._stats["queued"] += 1
+            try:
+                while self._in_use >= self.slots or self._queue[0] is not ticket:
+                    remaining = None
+                    if bounded:
+                        remaining = self.queue_timeout - (time.monotonic() - start)
+                        if remaining <= 0:
+                            self._stats["rejected_timeout"] += 1
+                            raise AdmissionRejected(
+                                f"No pipeline slot within {self.queue_timeout:.0f}s",
+                                self._retry_after_locked(),
+                            )
+                    self._cond.wait(remaining)
+            finally:
+                self._queue.remove(ticket)
+                # Whoever is now at the head may be able to take a free slot
+                self._cond.notify_all()
+            waited = time.monotonic() - start
+            self._admit(waited)
+        logger.info(f"admission: pipeline run admitted after {waited:.2f}s in queue")
+        return waited
+
+    def _admit(self, waited: float) -> None:
+        """Caller holds the lock."""
+        self._in_use += 1
+        self._stats["admitted"] += 1
+        self._stats["wait_seconds_total"] += waited
+        self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited)
+        self._waits.append(waited)
+
+    def release(self, run_seconds: float = None) -> None:
+        with self._cond:
+            self._in_use -= 1
+            if run_seconds is not None:
+                self._runs.append(run_seconds)
+            self._cond.notify_all()
+
+    @contextmanager
+    def slot(self, bounded: bool = True):
+        """`with controller.slot():` — acquire, run, release (records the run time)."""
+        self.acquire(bounded)
+        start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.release(time.monotonic() - start)
+
+    def stats(self) -> dict:
+        with self._cond:
+            waits = list(self._waits)
+            runs = list(self._runs)
+            admitted = self._stats["admitted"]
+            return {
+                "slots": self.slots,
+                "in_use": self._in_use,
+                "queue_depth": len(self._queue),
+                "queue_max": self.max_waiting,
+                "queue_depth_peak": self._max_waiting_seen,
+                **{k: round(v, 3) if isinstance(v, float) else v for k, v in self._stats.items()},
+                "wait_seconds_avg": round(self._stats["wait_seconds_total"] / admitted, 3) if admitted else 0.0,
+                "wait_seconds_p50": _percentile(waits, 0.50),
+                "wait_seconds_p95": _percentile(waits, 0.95),
+                "run_seconds_avg": round(sum(runs) / len(runs), 3) if runs else None,
+                "run_seconds_p95": _percentile(runs, 0.95),
+                "retry_after_seconds": self._retry_after_locked(),
+            }
+
+
+_controller = AdmissionController(PIPELINE_SLOTS, PIPELINE_QUEUE_MAX, PIPELINE_QUEUE_TIMEOUT_SECONDS)
+
+
+def pipeline_slot(bounded: bool = True):
+    """Context manager holding one of the PIPELINE_SLOTS for a full pipeline run."""
+    return _controller.slot(bounded)
+
+
+def check_admission() -> None:
+    """Pre-flight for responses that cannot turn into a 503 later (event streams)."""
+    _controller.check()
+
+
+def get_admission_stats() -> dict:
+    return _controller.stats()
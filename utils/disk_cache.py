@@ -0,0 +1,139 @@
+"""
+Size-capped, content-addressed disk cache with LRU eviction.
+
+One file per entry under `directory`, named by the (hex) key. Writes go to a
+temp file in the same directory and are published with `os.replace`, so a
+reader never sees a half-written entry and a crash never corrupts the cache.
+A hit bumps the file's mtime; when the total size exceeds `max_bytes` the
+least-recently-used files are deleted until it fits again.
+
+Shared by the /analyze result cache and the per-page OCR cache.
+"""
+
+import logging
+import os
+import tempfile
+import threading
+
+logger = logging.getLogger(__name__)
+
+CACHE_ROOT = os.environ.get("CACHE_DIR", "cache")
+
+_ENTRY_SUFFIX = ".bin"
+
+
+class DiskCache:
+    def __init__(self, directory: str, max_bytes: int, name: str = "cache"):
+        self.directory = directory
+        self.max_bytes = int(max_bytes)
+        self.name = name
+        self._lock = threading.Lock()
+        self._sizes: dict = {}          # key -> bytes on disk
+        self._total = 0
+        self._stats = {"hits": 0, "misses": 0, "stores": 0, "evictions": 0, "errors": 0}
+        os.makedirs(directory, exist_ok=True)
+        self._scan()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, key + _ENTRY_SUFFIX)
+
+    def _scan(self) -> None:
+        """Rebuild the size index from disk (entries survive restarts)."""
+        for fname in os.listdir(self.directory):
+            path = os.path.join(self.directory, fname)
+            if fname.endswith(_ENTRY_SUFFIX):
+                try:
+                    size = os.path.getsize(path)
+                except OSError:
+                    continue
+                self._sizes[fname[: -len(_ENTRY_SUFFIX)]] = size
+                self._total += size
+            elif fname.startswith(".tmp-"):
+                # Leftover from a crash mid-write
+                try:
+                    os.remove(path)
+                except OSError:
+                    pass
+        if self._sizes:
+            logger.info(
+                f"disk_cache[{self.name}]: {len(self._sizes)} entries, "
+                f"{self._total / 1e6:.1f} MB on disk"
+            )
+
+    def _bump(self, counter: str) -> None:
+        with self._lock:
+            self._stats[counter] += 1
+
+    def get(self, key: str):
+        """Return the cached bytes for `key`, or None."""
+        path = self._path(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+            os.utime(path, None)        # mark as recently used
+        except FileNotFoundError:
+            self._bump("misses")
+            return None
+        except OSError as e:
+            logger.warning(f"disk_cache[{self.name}]: read failed for {key[:12]}: {e}")
+            self._bump("errors")
+            return None
+        self._bump("hits")
+        return data
+
+    def set(self, key: str, data: bytes) -> None:
+        if len(data) > self.max_bytes:
+            return
+        path = self._path(key)
+        tmp_path = None
+        try:
+            fd, tmp_path = tempfile.mkstemp(prefix=".tmp-", dir=self.directory)
+            with os.fdopen(fd, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        except OSError as e:
+            logger.warning(f"disk_cache[{self.name}]: write failed for {key[:12]}: {e}")
+            self._bump("errors")
+            if tmp_path and os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            return
+        with self._lock:
+            self._total += len(data) - self._sizes.get(key, 0)
+            self._sizes[key] = len(data)
+            self._stats["stores"] += 1
+            over = self._total > self.max_bytes
+        if over:
+            self._evict()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.remove(self._path(key))
+        except OSError:
+            pass
+        with self._lock:
+            self._total -= self._sizes.pop(key, 0)
+
+    def _evict(self) -> None:
+        """Drop least-recently-used entries until the cache fits in max_bytes."""
+        entries = []
+        for key in list(self._sizes):
+            try:
+                entries.append((os.path.getmtime(self._path(key)), key))
+            except OSError:
+                with self._lock:
+                    self._total -= self._sizes.pop(key, 0)
+        entries.sort()
+        for _, key in entries:
+            with self._lock:
+                if self._total <= self.max_bytes:
+                    break
+            self.delete(key)
+            self._bump("evictions")
+
+    def stats(self) -> dict:
+        with self._lock:
+            stats = dict(self._stats)
+            stats["entries"] = len(self._sizes)
+            stats["bytes"] = self._total
+            stats["max_bytes"] = self.max_bytes
+        return stats
@@ -0,0 +1,191 @@
+"""
+Background analysis jobs for POST /jobs + GET /jobs/{id}.
+
+/analyze holds the HTTP connection (and the proxy's matching fetch) for the
+whole pipeline. A job instead returns an id immediately; a fixed pool of
+JOB_WORKERS threads runs the work and the client polls for the result.
+
+At most JOB_QUEUE_MAX jobs wait for a worker — beyond that `submit` raises
+`JobQueueFull` rather than letting a backlog build up in memory; it carries a
+Retry-After estimate of queued jobs × mean job run time ÷ workers. Finished
+jobs (result or error) stay readable for JOB_RESULT_TTL seconds and are then
+dropped; JOB_MAX_RETAINED caps how many are kept in the meantime. Everything
+lives in process memory: jobs do not survive a restart.
+"""
+
+import logging
+import math
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict, deque
+from concurrent.futures import ThreadPoolExecutor
+
+logger = logging.getLogger(__name__)
+
+JOB_WORKERS = int(os.environ.get("JOB_WORKERS", "2"))
+JOB_QUEUE_MAX = int(os.environ.get("JOB_QUEUE_MAX", "16"))
+JOB_RESULT_TTL_SECONDS = float(os.environ.get("JOB_RESULT_TTL", "3600"))
+JOB_MAX_RETAINED = int(os.environ.get("JOB_MAX_RETAINED", "256"))
+
+QUEUED, RUNNING, DONE, FAILED = "queued", "running", "done", "failed"
+
+# Retry-After bounds; the estimate itself comes from recent job run times.
+_RETRY_AFTER_MIN_SECONDS = 5
+_RETRY_AFTER_MAX_SECONDS = 900
+_RETRY_AFTER_DEFAULT_SECONDS = 30
+# Recent job run times kept for the Retry-After estimate
+_SAMPLE_SIZE = 256
+
+
+class JobQueueFull(RuntimeError):
+    """JOB_QUEUE_MAX jobs are already waiting for a worker."""
+
+    def __init__(self, message: str, retry_after: int):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+
+class Job:
+    __slots__ = ("id", "status", "created_at", "started_at", "finished_at", "result", "error")
+
+    def __init__(self):
+        self.id = uuid.uuid4().hex
+        self.status = QUEUED
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.result = None
+        self.error = None
+
+    def to_dict(self) -> dict:
+        data = {
+            "job_id": self.id,
+            "status": self.status,
+            "created_at": self.created_at,
+            "started_at": self.started_at,
+            "finished_at": self.finished_at,
+        }
+        if self.status == DONE:
+            data["result"] = self.result
+        elif self.status == FAILED:
+            data["error"] = self.error
+        return data
+
+
+class JobRunner:
+    def __init__(self, workers: int, max_queued: int, ttl_seconds: float, max_retained: int):
+        self.workers = max(1, workers)
+        self.max_queued = max(0, max_queued)
+        self.ttl_seconds = ttl_seconds
+        self.max_retained = max(1, max_retained)
+        self._executor = None
+        self._lock = threading.Lock()
+        self._jobs: "OrderedDict[str, Job]" = OrderedDict()
+        self._runs = deque(maxlen=_SAMPLE_SIZE)
+        self._stats = {"submitted": 0, "rejected": 0, "done": 0, "failed": 0, "expired": 0}
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="job")
+        return self._executor
+
+    def submit(self, fn, *args, error_message: str = "Job failed.") -> Job:
+        """Queue fn(*args); its return value becomes job.result. Raises JobQueueFull."""
+        with self._lock:
+            self._expire(time.time())
+            queued = sum(1 for job in self._jobs.values() if job.status == QUEUED)
+            if queued >= self.max_queued:
+                self._stats["rejected"] += 1
+                raise JobQueueFull(
+                    f"{queued} jobs already waiting for {self.workers} workers",
+                    self._retry_after_locked(queued),
+                )
+            job = Job()
+            self._jobs[job.id] = job
+            self._stats["submitted"] += 1
+            executor = self._get_executor()
+        executor.submit(self._run, job, fn, args, error_message)
+        return job
+
+    def _run(self, job: Job, fn, args, error_message: str) -> None:
+        job.started_at = time.time()
+        job.status = RUNNING
+        try:
+            job.result = fn(*args)
+            job.status = DONE
+        except Exception as e:
+            # Callers get a generic message; the traceback goes to the log
+            logger.exception(f"job {job.id} failed: {e}")
+            job.error = error_message
+            job.status = FAILED
+        job.finished_at = time.time()
+        with self._lock:
+            self._stats[job.status] += 1
+            self._runs.append(job.finished_at - job.started_at)
+            self._expire(job.finished_at)
+
+    def _retry_after_locked(self, queued: int) -> int:
+        """Seconds until the queue has room: queued × mean run / workers. Caller holds the lock."""
+        if not self._runs:
+            return _RETRY_AFTER_DEFAULT_SECONDS
+        mean_run = sum(self._runs) / len(self._runs)
+        estimate = math.ceil(mean_run * queued / self.workers)
+        return max(_RETRY_AFTER_MIN_SECONDS, min(_RETRY_AFTER_MAX_SECONDS, estimate))
+
+    def get(self, job_id: str):
+        """The job, or None when unknown or expired."""
+        with self._lock:
+            self._expire(time.time())
+            return self._jobs.get(job_id)
+
+    def _expire(self, now: float) -> None:
+        """Drop finished jobs past their TTL, then the oldest finished beyond the cap. Caller holds the lock."""
+        finished = [job for job in self._jobs.values() if job.finished_at is not None]
+        overflow = len(self._jobs) - self.max_retained
+        for job in finished:
+            if now - job.finished_at > self.ttl_seconds or overflow > 0:
+                del self._jobs[job.id]
+                self._stats["expired"] += 1
+                overflow -= 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+            runs = list(self._runs)
+            return {
+                "workers": self.workers,
+                "queued": statuses.count(QUEUED),
+                "running": statuses.count(RUNNING),
+                "retained": len(statuses),
+                **self._stats,
+                "run_seconds_avg": round(sum(runs) / len(runs), 3) if runs else None,
+                "retry_after_seconds": self._retry_after_locked(statuses.count(QUEUED)),
+            }
+
+    def shutdown(self) -> None:
+        """Stop accepting work and cancel jobs that have not started (API lifespan shutdown)."""
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+
+_runner = JobRunner(JOB_WORKERS, JOB_QUEUE_MAX, JOB_RESULT_TTL_SECONDS, JOB_MAX_RETAINED)
+
+
+def submit_job(fn, *args, error_message: str = "Job failed.") -> Job:
+    return _runner.submit(fn, *args, error_message=error_message)
+
+
+def get_job(job_id: str):
+    return _runner.get(job_id)
+
+
+def get_job_stats() -> dict:
+    return _runner.stats()
+
+
+def shutdown_jobs() -> None:
+    _runner.shutdown()
@@ -1,7 +1,20 @@
 import os
 import logging
+import threading
+import httpx
+from langchain_core.runnables import Runnable
 from langchain_groq import ChatGroq
 
+from utils.rate_limiter import (
+    DEFAULT_RPM_LIMIT,
+    DEFAULT_TPM_LIMIT,
+    KeyBudget,
+    RateScheduler,
+    estimate_tokens,
+    rate_limit_retry_after,
+    usage_tokens,
+)
+
 logger = logging.getLogger(__name__)
 
 # ─────────────────────────────────────────────────────────────────────────────
@@ -55,13 +68,14 @@ _TASK_MAX_TOKENS = {
 # ─────────────────────────────────────────────────────────────────────────────
 # Two independent Groq API keys are used to double effective TPM and avoid 429s.
 #
-# Key 1 (GROQ_API_KEY)   → get_llm()           primary for heavy reasoning nodes
+# Key 1 (GROQ_API_KEY)   → get_llm()           preferred for heavy reasoning nodes
 #                                              (synthesis, context, recommendations, RAG)
-# Key 2 (GROQ_API_KEY_2) → get_fast_llm()      primary for extraction/pattern nodes
+# Key 2 (GROQ_API_KEY_2) → get_fast_llm()      preferred for extraction/pattern nodes
 #                        → get_fallback_llm()  fallback for heavy nodes
 #
-# This spreads primary traffic across both keys; fallbacks automatically land on
-# the opposite key for maximum resilience.
+# The key above is only a preference: every call goes through the token-bucket
+# scheduler in utils.rate_limiter, which moves it to whichever key has TPM/RPM
+# headroom and queues it when neither does, instead of firing into a 429.
 # ─────────────────────────────────────────────────────────────────────────────
 
 def _get_primary_key() -> str:
@@ -87,50 +101,344 @@ def _get_secondary_key() -> str:
     return key
 
 
-def _build_llm(model: str, temperature: float, max_tokens: int, api_key: str) -> ChatGroq:
+# ─────────────────────────────────────────────────────────────────────────────
+# Client pool
+# ─────────────────────────────────────────────────────────────────────────────
+# ChatGroq instances are stateless between calls, so one instance per
+# (model, key, temperature, max_tokens, timeout) is shared by every node and
+# request. All instances on the same API key share ONE keep-alive httpx
+# connection pool, so a single analysis reuses a warm TLS connection instead
+# of opening a fresh one per get_*_llm() call.
+# ─────────────────────────────────────────────────────────────────────────────
+_HTTP_LIMITS = httpx.Limits(
+    max_connections=20,
+    max_keepalive_connections=10,
+    keepalive_expiry=120.0,   # Groq keeps idle connections open ~2 min
+)
+
+_llm_pool: dict = {}
+_http_clients: dict = {}        # api_key -> httpx.Client
+_async_http_clients: dict = {}  # api_key -> httpx.AsyncClient
+_pool_lock = threading.Lock()
+
+_pool_stats = {
+    "clients_created": 0,
+    "clients_reused": 0,
+    "connections_new": 0,
+    "connections_reused": 0,
+}
+_stats_lock = threading.Lock()
+
+
+def _bump(counter: str) -> None:
+    with _stats_lock:
+        _pool_stats[counter] += 1
+
+
+# httpcore emits "connection.connect_tcp.*" trace events only when it has to
+# dial a new socket; a request that completes without one rode a pooled
+# keep-alive connection.
+def _on_request(request: httpx.Request) -> None:
+    seen = {"new": False}
+
+    def _trace(event: str, info: dict) -> None:
+        if event.startswith("connection.connect_tcp"):
+            seen["new"] = True
+
+    request.extensions["trace"] = _trace
+    request.extensions["pool_conn"] = seen
+
+
+def _on_response(response: httpx.Response) -> None:
+    seen = response.request.extensions.get("pool_conn")
+    if seen is not None:
+        _bump("connections_new" if seen["new"] else "connections_reused")
+
+
+async def _on_request_async(request: httpx.Request) -> None:
+    seen = {"new": False}
+
+    async def _trace(event: str, info: dict) -> None:
+        if event.startswith("connection.connect_tcp"):
+            seen["new"] = True
+
+    request.extensions["trace"] = _trace
+    request.extensions["pool_conn"] = seen
+
+
+async def _on_response_async(response: httpx.Response) -> None:
+    _on_response(response)
+
+
+def _get_http_client(api_key: str) -> httpx.Client:
+    client = _http_clients.get(api_key)
+    if client is None or client.is_closed:
+        client = httpx.Client(
+            limits=_HTTP_LIMITS,
+            event_hooks={"request": [_on_request], "response": [_on_response]},
+        )
+        _http_clients[api_key] = client
+    return client
+
+
+def _get_async_http_client(api_key: str) -> httpx.AsyncClient:
+    client = _async_http_clients.get(api_key)
+    if client is None or client.is_closed:
+        client = httpx.AsyncClient(
+            limits=_HTTP_LIMITS,
+            event_hooks={"request": [_on_request_async], "response": [_on_response_async]},
+        )
+        _async_http_clients[api_key] = client
+    return client
+
+
+def _build_llm(model: str, temperature: float, max_tokens: int, api_key: str,
+               timeout: float = 60) -> ChatGroq:
     return ChatGroq(
         model=model,
         temperature=temperature,
         max_tokens=max_tokens,
-        timeout=60,        # 60s — generous but avoids infinite hangs
-        max_retries=2,
+        timeout=timeout,   # 60s default — generous but avoids infinite hangs
+        # One in-client retry for transient 5xx/connection errors; a 429 that
+        # survives it surfaces to ScheduledLLM, which re-routes to another key.
+        max_retries=1,
         api_key=api_key,
+        http_client=_get_http_client(api_key),
+        http_async_client=_get_async_http_client(api_key),
     )
 
 
+def get_pooled_llm(model: str, temperature: float, max_tokens: int, api_key: str,
+                   timeout: float = 60) -> ChatGroq:
+    """Return the shared ChatGroq for this configuration, building it on first use."""
+    key = (model, api_key, temperature, max_tokens, timeout)
+    llm = _llm_pool.get(key)
+    if llm is not None:
+        _bump("clients_reused")
+        return llm
+    with _pool_lock:
+        llm = _llm_pool.get(key)
+        if llm is None:
+            llm = _build_llm(model, temperature, max_tokens, api_key, timeout)
+            _llm_pool[key] = llm
+            _bump("clients_created")
+            return llm
+    _bump("clients_reused")
+    return llm
+
+
+def get_llm_pool_stats() -> dict:
+    """Snapshot of client-pool and HTTP connection reuse counters."""
+    with _stats_lock:
+        stats = dict(_pool_stats)
+    stats["pooled_clients"] = len(_llm_pool)
+    stats["http_pools"] = len(_http_clients)
+    return stats
+
+
+async def aclose_llm_clients() -> None:
+    """Close every pooled HTTP connection (FastAPI lifespan shutdown)."""
+    with _pool_lock:
+        clients = list(_http_clients.values())
+        async_clients = list(_async_http_clients.values())
+        _llm_pool.clear()
+        _http_clients.clear()
+        _async_http_clients.clear()
+    for client in clients:
+        client.close()
+    for client in async_clients:
+        await client.aclose()
+    logger.info(f"llm_utils: closed {len(clients) + len(async_clients)} pooled HTTP client(s)")
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Rate-scheduled LLM
+# ─────────────────────────────────────────────────────────────────────────────
+PRIMARY_KEY = "primary"
+SECONDARY_KEY = "secondary"
+
+# Groq budgets are per model, so each model gets its own scheduler over the
+# same keys. The vision model has a larger free-tier TPM than the 70B model.
+_MODEL_LIMITS = {
+    VISION_MODEL: (
+        int(os.environ.get("GROQ_VISION_TPM_LIMIT", "30000")),
+        int(os.environ.get("GROQ_VISION_RPM_LIMIT", "30")),
+    ),
+}
+
+_schedulers: dict = {}
+_schedulers_lock = threading.Lock()
+
+
+def _configured_keys() -> dict:
+    keys = {PRIMARY_KEY: _get_primary_key()}
+    secondary = _get_secondary_key()
+    if secondary != keys[PRIMARY_KEY]:
+        keys[SECONDARY_KEY] = secondary
+    return keys
+
+
+def get_rate_scheduler(model: str = MEDICAL_MODEL) -> RateScheduler:
+    """Process-wide scheduler for `model` across every configured API key."""
+    scheduler = _schedulers.get(model)
+    if scheduler is None:
+        with _schedulers_lock:
+            scheduler = _schedulers.get(model)
+            if scheduler is None:
+                tpm, rpm = _MODEL_LIMITS.get(model, (DEFAULT_TPM_LIMIT, DEFAULT_RPM_LIMIT))
+                scheduler = RateScheduler([
+                    KeyBudget(label, key, tpm, rpm) for label, key in _configured_keys().items()
+                ])
+                _schedulers[model] = scheduler
+                logger.info(
+                    f"llm_utils: rate scheduler for {model} over {len(scheduler.labels())} key(s) "
+                    f"(TPM={tpm}, RPM={rpm})"
+                )
+    return scheduler
+
+
+def get_rate_scheduler_stats() -> dict:
+    """Per-model, per-key headroom and queueing counters."""
+    return {model: scheduler.stats() for model, scheduler in list(_schedulers.items())}
+
+
+def _release_failed(scheduler: RateScheduler, label: str, charged: float, exc: BaseException,
+                    retry: bool, partial=None) -> bool:
+    """
+    Reconcile the reservation of a call that raised. A 429 penalises the key
+    and returns True when the caller may retry; any other failure (timeout,
+    connection error, cancellation) gives back the unused estimate, keeping
+    whatever usage a partial stream already reported.
+    """
+    if retry and isinstance(exc, Exception) and getattr(exc, "status_code", None) == 429:
+        scheduler.penalize(label, rate_limit_retry_after(exc))
+        return True
+    scheduler.settle(label, charged, usage_tokens(partial) or 0)
+    return False
+
+
+class ScheduledLLM(Runnable):
+    """
+    Drop-in for ChatGroq that acquires key headroom before every call.
+
+    Supports `invoke`/`ainvoke`, `stream`/`astream` and `prompt | llm` chaining. The request's cost
+    is estimated as prompt chars / 4 + max_tokens, reserved on the chosen key,
+    then reconciled with the usage Groq reports. A 429 penalises that key and
+    the call is retried once on whichever key the scheduler picks next; any
+    other failure refunds the reservation.
+    """
+
+    def __init__(self, model: str, temperature: float, max_tokens: int,
+                 preferred_key: str = PRIMARY_KEY, timeout: float = 60):
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+        self.preferred_key = preferred_key
+        self.timeout = timeout
+
+    def _client(self, scheduler: RateScheduler, label: str) -> ChatGroq:
+        return get_pooled_llm(self.model, self.temperature, self.max_tokens,
+                              scheduler.api_key(label), self.timeout)
+
+    def invoke(self, input, config=None, **kwargs):
+        scheduler = get_rate_scheduler(self.model)
+        cost = estimate_tokens(input, self.max_tokens)
+        for attempt in range(2):
+            label, charged = scheduler.acquire(cost, self.preferred_key)
+            try:
+                response = self._client(scheduler, label).invoke(input, config, **kwargs)
+            except BaseException as e:
+                if _release_failed(scheduler, label, charged, e, retry=attempt == 0):
+                    continue
+                raise
+            scheduler.settle(label, charged, usage_tokens(response))
+            return response
+
+    async def ainvoke(self, input, config=None, **kwargs):
+        scheduler = get_rate_scheduler(self.model)
+        cost = estimate_tokens(input, self.max_tokens)
+        for attempt in range(2):
+            label, charged = await scheduler.aacquire(cost, self.preferred_key)
+            try:
+                response = await self._client(scheduler, label).ainvoke(input, config, **kwargs)
+            except BaseException as e:
+                if _release_failed(scheduler, label, charged, e, retry=attempt == 0):
+                    continue
+                raise
+            scheduler.settle(label, charged, usage_tokens(response))
+            return response
+
+    def stream(self, input, config=None, **kwargs):
+        """Yield message chunks as Groq generates them. A 429 is retried only before the first chunk."""
+        scheduler = get_rate_scheduler(self.model)
+        cost = estimate_tokens(input, self.max_tokens)
+        for attempt in range(2):
+            label, charged = scheduler.acquire(cost, self.preferred_key)
+            full = None
+            try:
+                for chunk in self._client(scheduler, label).stream(input, config, **kwargs):
+                    full = chunk if full is None else full + chunk
+                    yield chunk
+            except BaseException as e:
+                if _release_failed(scheduler, label, charged, e,
+                                   retry=attempt == 0 and full is None, partial=full):
+                    continue
+                raise
+            scheduler.settle(label, charged, usage_tokens(full))
+            return
+
+    async def astream(self, input, config=None, **kwargs):
+        scheduler = get_rate_scheduler(self.model)
+        cost = estimate_tokens(input, self.max_tokens)
+        for attempt in range(2):
+            label, charged = await scheduler.aacquire(cost, self.preferred_key)
+            full = None
+            try:
+                async for chunk in self._client(scheduler, label).astream(input, config, **kwargs):
+                    full = chunk if full is None else full + chunk
+                    yield chunk
+            except BaseException as e:
+                if _release_failed(scheduler, label, charged, e,
+                                   retry=attempt == 0 and full is None, partial=full):
+                    continue
+                raise
+            scheduler.settle(label, charged, usage_tokens(full))
+            return
+
+
 def get_llm(model: str = None, temperature: float = 0,
-            max_tokens: int = _TASK_MAX_TOKENS["synthesis"]) -> ChatGroq:
+            max_tokens: int = _TASK_MAX_TOKENS["synthesis"]) -> ScheduledLLM:
     """
-    Primary LLM (API key 1) — llama-3.3-70b-versatile for reasoning, narrative,
-    context analysis, synthesis, recommendations.
+    Primary LLM (prefers API key 1) — llama-3.3-70b-versatile for reasoning,
+    narrative, context analysis, synthesis, recommendations.
     """
-    return _build_llm(model or MEDICAL_MODEL, temperature, max_tokens, _get_primary_key())
+    return ScheduledLLM(model or MEDICAL_MODEL, temperature, max_tokens, PRIMARY_KEY)
 
 
 def get_fast_llm(temperature: float = 0,
-                 max_tokens: int = _TASK_MAX_TOKENS["extraction"]) -> ChatGroq:
+                 max_tokens: int = _TASK_MAX_TOKENS["extraction"]) -> ScheduledLLM:
     """
-    Fast-path LLM (API key 2) — llama-3.3-70b-versatile for JSON extraction and
-    pattern detection. Using a separate key prevents TPM collisions with
-    the primary reasoning calls.
+    Fast-path LLM (prefers API key 2) — llama-3.3-70b-versatile for JSON
+    extraction and pattern detection. Preferring a separate key keeps it off
+    the primary reasoning calls' TPM budget while that key has headroom.
     """
-    return _build_llm(MEDICAL_MODEL, temperature, max_tokens, _get_secondary_key())
+    return ScheduledLLM(MEDICAL_MODEL, temperature, max_tokens, SECONDARY_KEY)
 
 
 def get_fallback_llm(temperature: float = 0,
-                     max_tokens: int = _TASK_MAX_TOKENS["synthesis"]) -> ChatGroq:
+                     max_tokens: int = _TASK_MAX_TOKENS["synthesis"]) -> ScheduledLLM:
     """
-    Fallback LLM (API key 2) — used when the primary key's call fails.
-    Lands on the opposite key from get_llm so a rate-limit on one key
-    doesn't cascade into total failure.
+    Fallback LLM (prefers API key 2) — used when the primary call fails.
+    Prefers the opposite key from get_llm so a failure on one key doesn't
+    cascade into total failure.
     """
-    return _build_llm(MEDICAL_MODEL, temperature, max_tokens, _get_secondary_key())
+    return ScheduledLLM(MEDICAL_MODEL, temperature, max_tokens, SECONDARY_KEY)
 
 
 def get_vision_llm(temperature: float = 0,
-                   max_tokens: int = _TASK_MAX_TOKENS["extraction"]) -> ChatGroq:
+                   max_tokens: int = _TASK_MAX_TOKENS["extraction"]) -> ScheduledLLM:
     """
     Vision-capable LLM for direct image-to-JSON extraction of lab reports.
-    Uses the secondary key to stay off the 70B reasoning key's TPM budget.
+    Prefers the secondary key; scheduled against the vision model's own budget.
     """
-    return _build_llm(VISION_MODEL, temperature, max_tokens, _get_secondary_key())
+    return ScheduledLLM(VISION_MODEL, temperature, max_tokens, SECONDARY_KEY)
@@ -3,20 +3,28 @@ OCR utilities for medical lab report ingestion.
 
 Improvements over basic Tesseract:
   - Otsu binarization (better than autocontrast for printed medical tables)
-  - Deskew correction (fixes tilted scans)
+  - Deskew correction (fixes tilted scans; coarse-to-fine angle search on a
+    downsampled page, one full-page rotation)
   - 400 DPI rendering (denser tables need higher resolution)
   - Multi-PSM strategy: tries PSM 6 then PSM 4 and picks longer result
     (PSM 6 = uniform text block, PSM 4 = single column with varying sizes)
   - Noise removal before binarization
+  - Disk cache of OCR text keyed by page-pixel digest + OCR config, so
+    repeated pages and retried uploads skip preprocessing and Tesseract
 """
 
+import hashlib
 import logging
 import os
+import threading
 import numpy as np
 from PIL import Image, ImageOps, ImageFilter
 import pytesseract
 from pytesseract import TesseractNotFoundError
 
+from utils.disk_cache import CACHE_ROOT, DiskCache
+from utils.pdf_utils import pdf_session
+
 logger = logging.getLogger(__name__)
 
 # PSM modes to try in order — pick the one that extracts most text
@@ -29,6 +37,15 @@ _PSM_MODES = [
 _OCR_DPI = 300  # 300 DPI is optimal for Tesseract; 400 adds latency with minimal gain
 _PSM_MIN_CHARS = 150  # if PSM 6 returns this many chars, skip slower fallback modes
 
+# ── Page OCR cache ────────────────────────────────────────────────────────────
+OCR_CACHE_ENABLED = os.environ.get("OCR_CACHE_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+OCR_CACHE_DIR = os.environ.get("OCR_CACHE_DIR", os.path.join(CACHE_ROOT, "ocr"))
+OCR_CACHE_MAX_MB = float(os.environ.get("OCR_CACHE_MAX_MB", "100"))
+
+_ocr_cache = None
+_ocr_cache_lock = threading.Lock()
+_ocr_config_digest = None
+
 
 def _ensure_tesseract_installed():
     try:
@@ -45,65 +62,116 @@ def _ensure_tesseract_installed():
         return False
 
 
+def _otsu_threshold(hist: np.ndarray) -> int:
+    """
+    Otsu threshold from a 256-bin histogram, all bins in one vectorized pass.
+
+    For every candidate t the background class is bins [0, t] and the
+    foreground (t, 255]; cumulative sums give each class's weight and mean,
+    and the t maximising the between-class variance wins. Bins where either
+    class is empty are excluded, and argmax keeps the FIRST maximum — both
+    match the original per-bin loop's semantics exactly.
+    """
+    hist = np.asarray(hist, dtype=np.int64)
+    levels = np.arange(256, dtype=np.int64)
+    weight_bg = np.cumsum(hist)
+    sum_bg = np.cumsum(levels * hist)
+    total = weight_bg[-1]
+    sum_total = sum_bg[-1]
+
+    weight_bg = weight_bg.astype(np.float64)
+    weight_fg = total - weight_bg
+    valid = (weight_bg > 0) & (weight_fg > 0)
+    if not valid.any():
+        return 0
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean_bg = sum_bg / weight_bg
+        mean_fg = (sum_total - sum_bg) / weight_fg
+        between_var = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
+    between_var[~valid] = 0.0
+    best = int(np.argmax(between_var))
+    return best if between_var[best] > 0 else 0
+
+
 def _otsu_binarize(img: Image.Image) -> Image.Image:
     """
     Otsu's binarization — optimal threshold for bimodal (text/background) images.
     Much better than simple autocontrast for printed medical forms.
+
+    The histogram comes straight from PIL and the threshold is applied as a
+    256-entry lookup table, so no full-page NumPy copy is made.
     """
-    arr = np.array(img)
-    # Histogram
-    hist, bins = np.histogram(arr.flatten(), 256, [0, 256])
-    total = arr.size
-    sum_total = np.dot(np.arange(256), hist)
+    if img.mode != "L":
+        img = img.convert("L")
+    thresh = _otsu_threshold(img.histogram())
+    lut = [0] * (thresh + 1) + [255] * (255 - thresh)
+    return img.point(lut)
 
-    weight_bg = 0.0
-    sum_bg = 0.0
-    best_thresh = 0
-    best_var = 0.0
 
-    for t in range(256):
-        weight_bg += hist[t]
-        if weight_bg == 0:
-            continue
-        weight_fg = total - weight_bg
-        if weight_fg == 0:
-            break
-        sum_bg += t * hist[t]
-        mean_bg = sum_bg / weight_bg
-        mean_fg = (sum_total - sum_bg) / weight_fg
-        between_var = weight_bg * weight_fg * (mean_bg - mean_fg) ** 2
-        if between_var > best_var:
-            best_var = between_var
-            best_thresh = t
+# Deskew search: coarse 1° sweep over ±10° on a downsampled page, then a 0.1°
+# sweep around the best coarse angle. Only the final rotation touches the
+# full-resolution page.
+_DESKEW_MAX_ANGLE = 10.0
+_DESKEW_COARSE_STEP = 1.0
+_DESKEW_FINE_STEP = 0.1
+_DESKEW_MIN_ANGLE = 0.2     # smaller corrections are within estimation noise
+_DESKEW_WORK_SIDE = 1000    # long side (px) of the page used for angle search
+
+
+def _projection_score(xs: np.ndarray, ys: np.ndarray, height: int, angle: float) -> float:
+    """
+    Variance of the dark-pixel row profile after rotating the page by `angle`.
+
+    Rotating the coordinates of the dark pixels (centred on the page) and
+    histogramming their new row index gives the same projection as rotating
+    the bitmap and summing rows — without resampling the image. Text lines
+    that are level produce sharp peaks, i.e. high variance.
+    """
+    theta = np.deg2rad(angle)
+    rows = ys * np.cos(theta) - xs * np.sin(theta) + height / 2.0
+    rows = np.rint(rows).astype(np.int64)
+    rows = rows[(rows >= 0) & (rows < height)]
+    return float(np.var(np.bincount(rows, minlength=height)))
+
+
+def _estimate_skew(img: Image.Image) -> float:
+    """Angle (degrees, same sign convention as Image.rotate) that levels the text."""
+    img = img.convert("L")
+    factor = max(1, -(-max(img.size) // _DESKEW_WORK_SIDE))
+    small = img.reduce(factor) if factor > 1 else img
+    arr = np.asarray(small)
+    height, width = arr.shape
 
-    arr_bin = (arr > best_thresh).astype(np.uint8) * 255
-    return Image.fromarray(arr_bin)
+    # Box-averaging thins strokes to grey, so pick the ink cut-off per page
+    ys, xs = np.nonzero(arr <= _otsu_threshold(small.histogram()))
+    if len(ys) == 0:
+        return 0.0
+    ys = ys - height / 2.0
+    xs = xs - width / 2.0
+
+    def _best(angles):
+        scores = [_projection_score(xs, ys, height, a) for a in angles]
+        return float(angles[int(np.argmax(scores))])
+
+    coarse = _best(np.arange(-_DESKEW_MAX_ANGLE, _DESKEW_MAX_ANGLE + 1e-9, _DESKEW_COARSE_STEP))
+    fine = np.arange(coarse - _DESKEW_COARSE_STEP, coarse + _DESKEW_COARSE_STEP + 1e-9, _DESKEW_FINE_STEP)
+    fine = fine[np.abs(fine) <= _DESKEW_MAX_ANGLE]
+    return round(_best(fine), 1)
 
 
 def _deskew(img: Image.Image) -> Image.Image:
     """
     Correct tilt in scanned documents.
-    Uses pixel variance to find the optimal rotation angle.
-    Skips if PIL/numpy deskew unavailable.
+    Estimates the angle from row projections of the dark pixels on a
+    downsampled page (coarse-to-fine, 0.1° resolution), then rotates the
+    full page once. Returns the input unchanged if estimation fails.
     """
     try:
-        arr = np.array(img)
-        # Project onto horizontal axis to find skew angle
-        from scipy.ndimage import rotate as ndimage_rotate
-        best_score = -1
-        best_angle = 0
-        for angle in range(-10, 11, 1):
-            rotated = ndimage_rotate(arr, angle, reshape=False, cval=255)
-            projection = np.sum(rotated < 128, axis=1)
-            score = np.var(projection)
-            if score > best_score:
-                best_score = score
-                best_angle = angle
-        if abs(best_angle) > 0:
-            corrected = ndimage_rotate(arr, best_angle, reshape=False, cval=255)
-            return Image.fromarray(corrected)
+        angle = _estimate_skew(img)
+        if abs(angle) >= _DESKEW_MIN_ANGLE:
+            return img.rotate(angle, resample=Image.BICUBIC, fillcolor=255)
     except Exception:
-        pass  # scipy unavailable or deskew failed — continue without
+        pass  # deskew failed — continue without
     return img
 
 
@@ -133,35 +201,235 @@ def _preprocess_image(img: Image.Image) -> Image.Image:
 
 
 def _pdf_page_to_image(path: str, page_num: int = 0, dpi: int = _OCR_DPI) -> Image.Image:
-    """Render a single PDF page to PIL Image at given DPI."""
-    import fitz  # PyMuPDF
-    doc = fitz.open(path)
-    page = doc.load_page(page_num)
-    pix = page.get_pixmap(dpi=dpi)
-    img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-    doc.close()
-    return img
+    """
+    Render a single PDF page to PIL Image at given DPI.
+    Goes through the shared document session, so within a pipeline run the
+    file is opened once (see utils.pdf_utils).
+    """
+    with pdf_session(path) as doc:
+        return doc.render(page_num, dpi)
 
 
-def _ocr_image_best(img: Image.Image) -> str:
+def _get_ocr_cache() -> DiskCache:
+    global _ocr_cache
+    if _ocr_cache is None:
+        with _ocr_cache_lock:
+            if _ocr_cache is None:
+                _ocr_cache = DiskCache(OCR_CACHE_DIR, int(OCR_CACHE_MAX_MB * 1024 * 1024), name="ocr")
+    return _ocr_cache
+
+
+def _ocr_config_key() -> str:
     """
-    Run Tesseract with PSM 6 first; only try fallback modes if result is sparse.
-    PSM 6 wins for 95%+ of structured medical reports — skip the rest when it does.
+    Digest of everything besides the pixels that shapes the OCR text: PSM
+    list, early-exit threshold, Tesseract version, and this module's source
+    (so any preprocessing change invalidates old entries automatically).
     """
+    global _ocr_config_digest
+    if _ocr_config_digest is None:
+        h = hashlib.sha256()
+        h.update(repr((_PSM_MODES, _PSM_MIN_CHARS)).encode())
+        try:
+            h.update(str(pytesseract.get_tesseract_version()).encode())
+        except Exception:
+            pass
+        with open(os.path.abspath(__file__), "rb") as f:
+            h.update(f.read())
+        _ocr_config_digest = h.hexdigest()[:16]
+    return _ocr_config_digest
+
+
+def _page_cache_key(img: Image.Image, dpi: int = None) -> str:
+    h = hashlib.sha256()
+    h.update(f"{img.mode}|{img.width}x{img.height}|dpi={dpi}|{_ocr_config_key()}".encode())
+    h.update(img.tobytes())
+    return h.hexdigest()
+
+
+def get_ocr_cache_stats() -> dict:
+    if not OCR_CACHE_ENABLED:
+        return {"enabled": False}
+    stats = _get_ocr_cache().stats()
+    stats["enabled"] = True
+    return stats
+
+
+def _ocr_lookup(img: Image.Image, dpi: int = None):
+    """Return (cache_key, cached_text_or_None). cache_key is None when caching is off."""
+    if not OCR_CACHE_ENABLED:
+        return None, None
+    cache_key = _page_cache_key(img, dpi)
+    cached = _get_ocr_cache().get(cache_key)
+    return cache_key, (cached.decode("utf-8") if cached is not None else None)
+
+
+def _ocr_store(cache_key: str, text: str, succeeded: bool) -> None:
+    # Don't cache a page where every Tesseract call failed
+    if cache_key and succeeded:
+        _get_ocr_cache().set(cache_key, text.encode("utf-8"))
+
+
+def _ocr_uncached(img: Image.Image):
+    """Preprocess + multi-PSM Tesseract. Returns (text, any_tesseract_call_succeeded)."""
     processed = _preprocess_image(img)
     best = ""
+    succeeded = False
     for config in _PSM_MODES:
         try:
             text = pytesseract.image_to_string(processed, config=config)
         except Exception:
             continue
+        succeeded = True
         if len(text.strip()) > len(best.strip()):
             best = text
         # Early exit: PSM 6 already extracted enough text
         if len(best.strip()) >= _PSM_MIN_CHARS:
             break
+    return best, succeeded
+
+
+def _ocr_image_best(img: Image.Image, dpi: int = None) -> str:
+    """
+    Run Tesseract with PSM 6 first; only try fallback modes if result is sparse.
+    PSM 6 wins for 95%+ of structured medical reports — skip the rest when it does.
+
+    Results are cached by page-pixel digest + OCR config; a hit skips
+    preprocessing and Tesseract entirely.
+    """
+    cache_key, cached = _ocr_lookup(img, dpi)
+    if cached is not None:
+        return cached
+    text, succeeded = _ocr_uncached(img)
+    _ocr_store(cache_key, text, succeeded)
+    return text
+
+
+# ── Page-level process pool ───────────────────────────────────────────────────
+# Each page is CPU-bound (filters, deskew, upscale) plus a Tesseract
+# subprocess, so pages of one PDF run in separate processes. The parent
+# renders pages (PyMuPDF) and ships grayscale images to the workers — the
+# pipeline converts to "L" first anyway, and it is 1/3 of the RGB payload.
+#
+# Worker count: OCR_WORKERS (default: CPU count, max 4), further capped so
+# that workers × OCR_WORKER_MEM_MB fits in the container's free memory.
+OCR_WORKERS = int(os.environ.get("OCR_WORKERS", str(min(os.cpu_count() or 1, 4))))
+OCR_WORKER_MEM_MB = int(os.environ.get("OCR_WORKER_MEM_MB", "200"))
+
+_ocr_pool = None
+_ocr_pool_workers = 0
+_ocr_pool_lock = threading.Lock()
+
+
+def _container_memory_available():
+    """Bytes of memory still available under the cgroup limit, or None if unlimited/unknown."""
+    candidates = (
+        ("/sys/fs/cgroup/memory.max", "/sys/fs/cgroup/memory.current"),                       # cgroup v2
+        ("/sys/fs/cgroup/memory/memory.limit_in_bytes", "/sys/fs/cgroup/memory/memory.usage_in_bytes"),  # v1
+    )
+    for limit_path, usage_path in candidates:
+        try:
+            with open(limit_path) as f:
+                raw = f.read().strip()
+            if raw == "max":
+                return None
+            limit = int(raw)
+            if limit >= 1 << 60:    # v1 reports "unlimited" as a huge number
+                return None
+            with open(usage_path) as f:
+                usage = int(f.read().strip())
+            return max(0, limit - usage)
+        except (OSError, ValueError):
+            continue
+    return None
 
-    return best
+
+def _ocr_worker_count() -> int:
+    workers = max(1, OCR_WORKERS)
+    available = _container_memory_available()
+    if available is not None:
+        fits = int(available // (OCR_WORKER_MEM_MB * 1024 * 1024))
+        if fits < workers:
+            logger.info(
+                f"OCR: capping workers {workers} → {max(1, fits)} "
+                f"({available / 1e6:.0f} MB free in container)"
+            )
+        workers = max(1, min(workers, fits))
+    return workers
+
+
+def _get_ocr_pool():
+    """Shared process pool, or None when only one worker fits."""
+    global _ocr_pool, _ocr_pool_workers
+    if _ocr_pool is None:
+        with _ocr_pool_lock:
+            if _ocr_pool is None:
+                workers = _ocr_worker_count()
+                if workers <= 1:
+                    return None
+                import multiprocessing
+                from concurrent.futures import ProcessPoolExecutor
+                # spawn: the API process is multi-threaded, fork is unsafe there
+                _ocr_pool = ProcessPoolExecutor(
+                    max_workers=workers,
+                    mp_context=multiprocessing.get_context("spawn"),
+                    initializer=_ensure_tesseract_installed,
+                )
+                _ocr_pool_workers = workers
+                logger.info(f"OCR: started process pool with {workers} worker(s)")
+    return _ocr_pool
+
+
+def _reset_ocr_pool() -> None:
+    global _ocr_pool
+    with _ocr_pool_lock:
+        if _ocr_pool is not None:
+            _ocr_pool.shutdown(wait=False, cancel_futures=True)
+            _ocr_pool = None
+
+
+def shutdown_ocr_pool() -> None:
+    """Stop worker processes (API lifespan shutdown)."""
+    _reset_ocr_pool()
+
+
+def _ocr_page_worker(payload):
+    """Process-pool entry point: (mode, size, raw pixels) → (text, succeeded)."""
+    mode, size, data = payload
+    return _ocr_uncached(Image.frombytes(mode, size, data))
+
+
+def _ocr_pages_parallel(path: str, num_pages: int, pool) -> list:
+    """OCR every page of a PDF on the pool; returns texts in page order."""
+    from concurrent.futures.process import BrokenProcessPool
+
+    texts = [None] * num_pages
+    pending = []                 # (page_num, cache_key, future), in page order
+    max_in_flight = _ocr_pool_workers * 2   # bound rendered pages held in memory
+
+    def _collect(item):
+        page_num, cache_key, future = item
+        text, succeeded = future.result()
+        _ocr_store(cache_key, text, succeeded)
+        texts[page_num] = text
+
+    for page_num in range(num_pages):
+        img = _pdf_page_to_image(path, page_num=page_num, dpi=_OCR_DPI).convert("L")
+        cache_key, cached = _ocr_lookup(img, _OCR_DPI)
+        if cached is not None:
+            texts[page_num] = cached
+            continue
+        future = pool.submit(_ocr_page_worker, (img.mode, img.size, img.tobytes()))
+        pending.append((page_num, cache_key, future))
+        if len(pending) >= max_in_flight:
+            _collect(pending.pop(0))
+
+    try:
+        for item in pending:
+            _collect(item)
+    except BrokenProcessPool:
+        _reset_ocr_pool()
+        raise
+    return texts
 
 
 def run_ocr(path: str) -> str:
@@ -173,15 +441,17 @@ def run_ocr(path: str) -> str:
         )
     if path.lower().endswith(".pdf"):
         img = _pdf_page_to_image(path, page_num=0)
-    else:
-        img = Image.open(path)
+        return _ocr_image_best(img, dpi=_OCR_DPI)
+    img = Image.open(path)
     return _ocr_image_best(img)
 
 
 def run_ocr_multipage(path: str) -> str:
     """
     Run OCR on ALL pages of a PDF or single image.
-    Uses enhanced preprocessing + multi-PSM strategy per page.
+    Uses enhanced preprocessing + multi-PSM strategy per page. Multi-page
+    PDFs are spread over the OCR process pool; single pages (and hosts where
+    only one worker fits in memory) run serially in-process.
     """
     if not _ensure_tesseract_installed():
         raise RuntimeError(
@@ -190,16 +460,26 @@ def run_ocr_multipage(path: str) -> str:
         )
 
     if path.lower().endswith(".pdf"):
-        import fitz
-        doc = fitz.open(path)
-        num_pages = len(doc)
-        doc.close()
-        logger.info(f"OCR: processing {num_pages} page(s) for '{path}'")
+        # Hold the document across every page render
+        with pdf_session(path) as doc:
+            num_pages = doc.page_count
+            logger.info(f"OCR: processing {num_pages} page(s) for '{path}'")
+
+            texts = None
+            pool = _get_ocr_pool() if num_pages > 1 else None
+            if pool is not None:
+                try:
+                    texts = _ocr_pages_parallel(path, num_pages, pool)
+                except Exception as e:
+                    logger.warning(f"OCR: process pool failed ({e}) — falling back to serial")
+            if texts is None:
+                texts = [
+                    _ocr_image_best(_pdf_page_to_image(path, page_num=n, dpi=_OCR_DPI).convert("L"), dpi=_OCR_DPI)
+                    for n in range(num_pages)
+                ]
 
         page_texts = []
-        for page_num in range(num_pages):
-            img = _pdf_page_to_image(path, page_num=page_num, dpi=_OCR_DPI)
-            text = _ocr_image_best(img)
+        for page_num, text in enumerate(texts):
             if text.strip():
                 page_texts.append(f"[Page {page_num + 1}]\n{text}")
             logger.debug(f"OCR page {page_num + 1}/{num_pages}: {len(text)} chars")
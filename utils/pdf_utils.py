@@ -0,0 +1,148 @@
+"""
+Shared PDF document sessions.
+
+Ingest (native text + OCR) and extraction (vision data-URLs) all need the
+same PDF. Without a session each of them calls `fitz.open()` again — once per
+page for OCR renders, again to count pages, and again per page for the
+200-DPI vision renders. A `PdfDocument` opens the file once and renders each
+page at the DPI the caller asks for; recent renders are kept under a small
+byte budget. A request served by a cached render is not rasterised again:
+the same DPI is returned as-is, and a lower DPI (the vision view of a page
+OCR just read at 300 DPI) is downscaled from it. Only a cache miss renders
+at the requested DPI, so vision-only flows never pay for a 300-DPI render.
+
+Sessions are reference-counted: every user holds one with
+
+    with pdf_session(path) as doc:
+        doc.render(0, dpi=200)
+
+and the document is closed when the last holder releases it.
+`run_full_pipeline` holds a session for the whole run, so every node shares
+the one open file; a document is never closed while someone still uses it.
+"""
+
+import logging
+import os
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+import fitz  # PyMuPDF
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+RENDER_DPI = 300    # default render DPI (ocr_utils._OCR_DPI)
+
+# Page renders kept per document, in MB. A 300-DPI A4 page is ~26 MB RGB and
+# a 200-DPI one ~12 MB; least recently used renders are dropped first.
+_RENDER_CACHE_BYTES = int(float(os.environ.get("PDF_RENDER_CACHE_MB", "32")) * 1024 * 1024)
+
+
+class PdfDocument:
+    def __init__(self, path: str, cache_bytes: int = _RENDER_CACHE_BYTES):
+        self.path = path
+        self.cache_bytes = cache_bytes
+        self._doc = None                # opened on first use
+        self._lock = threading.Lock()   # PyMuPDF documents are not thread-safe
+        self._renders: "OrderedDict[tuple, Image.Image]" = OrderedDict()   # (page_num, dpi) -> Image
+        self._cached = 0                # bytes held in _renders
+        self._refs = 0                  # open sessions; guarded by _documents_lock
+        self.renders = 0                # full page rasterisations performed
+        self.downscales = 0             # views derived from a cached higher-DPI render
+
+    def _open(self):
+        """Caller holds the lock."""
+        if self._doc is None:
+            self._doc = fitz.open(self.path)
+        return self._doc
+
+    @property
+    def page_count(self) -> int:
+        with self._lock:
+            return len(self._open())
+
+    def page_text(self, page_num: int) -> str:
+        with self._lock:
+            return self._open().load_page(page_num).get_text()
+
+    def page_words(self, page_num: int) -> list:
+        """PyMuPDF word boxes: (x0, y0, x1, y1, word, block_no, line_no, word_no)."""
+        with self._lock:
+            return self._open().load_page(page_num).get_text("words")
+
+    def render(self, page_num: int, dpi: int = RENDER_DPI) -> Image.Image:
+        """
+        Page image at `dpi`: cached, downscaled from a cached higher-DPI render
+        of the page, or rasterised on a miss. Callers must not mutate the
+        returned image.
+        """
+        key = (page_num, dpi)
+        with self._lock:
+            cached = self._renders.get(key)
+            if cached is not None:
+                self._renders.move_to_end(key)
+                return cached
+            source_dpi = min((d for p, d in self._renders if p == page_num and d > dpi), default=None)
+            if source_dpi is not None:
+                source = self._renders[(page_num, source_dpi)]
+                scale = dpi / source_dpi
+                img = source.resize(
+                    (max(1, round(source.width * scale)), max(1, round(source.height * scale))),
+                    Image.LANCZOS,
+                )
+                self.downscales += 1
+            else:
+                pix = self._open().load_page(page_num).get_pixmap(dpi=dpi)
+                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+                self.renders += 1
+            self._remember(key, img)
+            return img
+
+    def _remember(self, key: tuple, img: Image.Image) -> None:
+        """Caller holds the lock."""
+        size = img.width * img.height * len(img.getbands())
+        if size > self.cache_bytes:
+            return
+        self._renders[key] = img
+        self._cached += size
+        while self._cached > self.cache_bytes:
+            _, old = self._renders.popitem(last=False)
+            self._cached -= old.width * old.height * len(old.getbands())
+
+    def close(self) -> None:
+        with self._lock:
+            self._renders.clear()
+            self._cached = 0
+            if self._doc is not None:
+                self._doc.close()
+                self._doc = None
+
+
+_documents: dict = {}       # abspath -> PdfDocument with at least one session
+_documents_lock = threading.Lock()
+
+
+@contextmanager
+def pdf_session(path: str):
+    """Hold the shared `PdfDocument` for `path`; closed when the last holder exits."""
+    key = os.path.abspath(path)
+    with _documents_lock:
+        doc = _documents.get(key)
+        if doc is None:
+            doc = _documents[key] = PdfDocument(path)
+        doc._refs += 1
+    try:
+        yield doc
+    finally:
+        with _documents_lock:
+            doc._refs -= 1
+            last = doc._refs == 0
+            if last:
+                del _documents[key]
+        if last:
+            logger.debug(
+                f"pdf_utils: closed '{path}' after {doc.renders} page render(s), "
+                f"{doc.downscales} downscaled view(s)"
+            )
+            doc.close()
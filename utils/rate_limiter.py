@@ -0,0 +1,272 @@
+"""
+Token-bucket rate scheduler for the Groq API key pool.
+
+Each configured key gets two buckets that refill continuously:
+  - TPM bucket  (tokens per minute)   — charged with the request's estimated
+                                        prompt tokens + its max_tokens budget
+  - RPM bucket  (requests per minute) — charged 1 per call
+
+A caller asks for a key with `acquire(cost, preferred)`. The preferred key
+(the old hard-coded per-node routing) wins when it has headroom; otherwise
+the call goes to whichever key has the most TPM headroom. When no key can
+take the request it WAITS for a refill instead of firing a call that would
+come back 429. After the call, `settle()` swaps the estimate for the real
+usage reported by Groq, and a 429 that slips through `penalize()`s the key
+for its Retry-After window.
+
+Budgets default to the Groq free tier for llama-3.3-70b-versatile and can be
+overridden with GROQ_TPM_LIMIT / GROQ_RPM_LIMIT (applied to every key).
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_TPM_LIMIT = int(os.environ.get("GROQ_TPM_LIMIT", "12000"))
+DEFAULT_RPM_LIMIT = int(os.environ.get("GROQ_RPM_LIMIT", "30"))
+# Longest a call may queue for headroom before giving up (caller's fallback
+# path then takes over). Well under the 300 s /analyze hard limit.
+QUEUE_TIMEOUT_SECONDS = float(os.environ.get("GROQ_QUEUE_TIMEOUT", "90"))
+
+# Rough chars-per-token for Llama-3 tokenizers on English/medical text, and a
+# flat charge per image block for the vision model.
+_CHARS_PER_TOKEN = 4
+_IMAGE_TOKEN_COST = 1600
+
+
+class RateLimitQueueTimeout(RuntimeError):
+    """No key regained enough headroom within QUEUE_TIMEOUT_SECONDS."""
+
+
+class TokenBucket:
+    """Continuously refilling bucket. Not thread-safe — RateScheduler holds the lock."""
+
+    def __init__(self, capacity: float, per_minute: float):
+        self.capacity = float(capacity)
+        self.rate = float(per_minute) / 60.0
+        self.level = float(capacity)
+        self.updated = time.monotonic()
+
+    def refill(self, now: float) -> None:
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def seconds_until(self, amount: float) -> float:
+        missing = amount - self.level
+        return 0.0 if missing <= 0 else missing / self.rate
+
+
+class KeyBudget:
+    def __init__(self, label: str, api_key: str, tpm: int, rpm: int):
+        self.label = label
+        self.api_key = api_key
+        self.tpm = TokenBucket(tpm, tpm)
+        self.rpm = TokenBucket(rpm, rpm)
+        self.blocked_until = 0.0
+        self.calls = 0
+        self.rate_limited = 0
+
+    def wait_for(self, cost: float, now: float) -> float:
+        self.tpm.refill(now)
+        self.rpm.refill(now)
+        return max(
+            self.blocked_until - now,
+            self.tpm.seconds_until(min(cost, self.tpm.capacity)),
+            self.rpm.seconds_until(1),
+        )
+
+
+class RateScheduler:
+    """Routes LLM calls across API keys by remaining TPM/RPM headroom."""
+
+    def __init__(self, budgets: list):
+        if not budgets:
+            raise ValueError("RateScheduler needs at least one key budget")
+        self._budgets = {b.label: b for b in budgets}
+        self._cond = threading.Condition()
+        self._waiting = 0
+        self._queued_calls = 0
+        self._queued_seconds = 0.0
+
+    # ── Reservation ──────────────────────────────────────────────────────────
+    def _candidates(self, preferred: str):
+        others = sorted(
+            (b for b in self._budgets.values() if b.label != preferred),
+            key=lambda b: b.tpm.level,
+            reverse=True,
+        )
+        first = self._budgets.get(preferred)
+        return ([first] if first else []) + others
+
+    def _try_reserve(self, cost: float, preferred: str):
+        """Reserve on the best key with headroom → (label, charged), or (None, min_wait)."""
+        now = time.monotonic()
+        min_wait = None
+        for budget in self._candidates(preferred):
+            wait = budget.wait_for(cost, now)
+            if wait <= 0:
+                charged = min(cost, budget.tpm.capacity)
+                budget.tpm.level -= charged
+                budget.rpm.level -= 1
+                budget.calls += 1
+                return budget.label, charged
+            min_wait = wait if min_wait is None else min(min_wait, wait)
+        return None, min_wait
+
+    def acquire(self, cost: float, preferred: str = None, timeout: float = None):
+        """Block until a key has headroom for `cost` tokens. Returns (label, charged)."""
+        timeout = QUEUE_TIMEOUT_SECONDS if timeout is None else timeout
+        start = time.monotonic()
+        with self._cond:
+            label, result = self._try_reserve(cost, preferred)
+            if label is not None:
+                return label, result
+            self._waiting += 1
+            try:
+                while True:
+                    remaining = timeout - (time.monotonic() - start)
+                    if remaining <= 0:
+                        raise RateLimitQueueTimeout(
+                            f"No Groq key had headroom for ~{int(cost)} tokens within {timeout:.0f}s"
+                        )
+                    self._cond.wait(min(result, remaining))
+                    label, result = self._try_reserve(cost, preferred)
+                    if label is not None:
+                        self._record_queued(time.monotonic() - start)
+                        return label, result
+            finally:
+                self._waiting -= 1
+
+    async def aacquire(self, cost: float, preferred: str = None, timeout: float = None):
+        """Async variant of acquire() — sleeps on the event loop instead of a thread."""
+        timeout = QUEUE_TIMEOUT_SECONDS if timeout is None else timeout
+        start = time.monotonic()
+        queued = False
+        while True:
+            with self._cond:
+                label, result = self._try_reserve(cost, preferred)
+                if label is not None:
+                    if queued:
+                        self._waiting -= 1
+                        self._record_queued(time.monotonic() - start)
+                    return label, result
+                if not queued:
+                    self._waiting += 1
+                    queued = True
+            remaining = timeout - (time.monotonic() - start)
+            if remaining <= 0:
+                with self._cond:
+                    self._waiting -= 1
+                raise RateLimitQueueTimeout(
+                    f"No Groq key had headroom for ~{int(cost)} tokens within {timeout:.0f}s"
+                )
+            await asyncio.sleep(min(result, remaining, 1.0))
+
+    def _record_queued(self, seconds: float) -> None:
+        self._queued_calls += 1
+        self._queued_seconds += seconds
+        logger.info(f"rate_limiter: call queued {seconds:.2f}s for key headroom")
+
+    # ── Post-call bookkeeping ────────────────────────────────────────────────
+    def settle(self, label: str, charged: float, actual_tokens: int = None) -> None:
+        """Replace the up-front estimate with Groq's reported usage."""
+        if actual_tokens is None:
+            return
+        with self._cond:
+            budget = self._budgets[label]
+            budget.tpm.refill(time.monotonic())
+            budget.tpm.level = min(budget.tpm.capacity, budget.tpm.level + charged - actual_tokens)
+            self._cond.notify_all()
+
+    def penalize(self, label: str, retry_after: float = None) -> None:
+        """A 429 got through — drain the key and block it for Retry-After seconds."""
+        with self._cond:
+            budget = self._budgets[label]
+            budget.rate_limited += 1
+            budget.tpm.level = 0.0
+            block_for = retry_after or 60.0 / max(budget.rpm.capacity, 1)
+            budget.blocked_until = time.monotonic() + block_for
+            self._cond.notify_all()
+        logger.warning(f"rate_limiter: key '{label}' hit 429 — blocked for {block_for:.1f}s")
+
+    def api_key(self, label: str) -> str:
+        return self._budgets[label].api_key
+
+    def labels(self) -> list:
+        return list(self._budgets)
+
+    def stats(self) -> dict:
+        now = time.monotonic()
+        with self._cond:
+            keys = {}
+            for budget in self._budgets.values():
+                budget.wait_for(0, now)  # refill for an accurate snapshot
+                keys[budget.label] = {
+                    "tpm_available": int(budget.tpm.level),
+                    "tpm_limit": int(budget.tpm.capacity),
+                    "rpm_available": round(budget.rpm.level, 1),
+                    "rpm_limit": int(budget.rpm.capacity),
+                    "calls": budget.calls,
+                    "rate_limited": budget.rate_limited,
+                    "blocked_for_s": round(max(0.0, budget.blocked_until - now), 1),
+                }
+            return {
+                "keys": keys,
+                "waiting": self._waiting,
+                "queued_calls": self._queued_calls,
+                "queued_seconds_total": round(self._queued_seconds, 2),
+            }
+
+
+# ─────────────────────────────────────────────────────────────────────────────
+# Helpers
+# ─────────────────────────────────────────────────────────────────────────────
+
+def estimate_tokens(messages, max_tokens: int) -> int:
+    """Prompt-length estimate + the completion budget the call may consume."""
+    if hasattr(messages, "to_messages"):        # ChatPromptValue from `prompt | llm`
+        messages = messages.to_messages()
+    if isinstance(messages, str):
+        messages = [messages]
+    chars = 0
+    images = 0
+    for m in messages or []:
+        content = getattr(m, "content", m)
+        if isinstance(content, str):
+            chars += len(content)
+        elif isinstance(content, list):
+            for block in content:
+                if isinstance(block, dict) and block.get("type") == "image_url":
+                    images += 1
+                elif isinstance(block, dict):
+                    chars += len(str(block.get("text", "")))
+                else:
+                    chars += len(str(block))
+    return chars // _CHARS_PER_TOKEN + images * _IMAGE_TOKEN_COST + int(max_tokens or 0)
+
+
+def usage_tokens(response) -> int:
+    """Total tokens Groq billed for a response, or None if not reported."""
+    usage = getattr(response, "usage_metadata", None)
+    if usage and usage.get("total_tokens") is not None:
+        return int(usage["total_tokens"])
+    meta = getattr(response, "response_metadata", None) or {}
+    token_usage = meta.get("token_usage") or {}
+    total = token_usage.get("total_tokens")
+    return int(total) if total is not None else None
+
+
+def rate_limit_retry_after(exc: Exception):
+    """Return Retry-After seconds if `exc` is a Groq 429, else None."""
+    if getattr(exc, "status_code", None) != 429:
+        return None
+    response = getattr(exc, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        return float(headers.get("retry-after", 0)) or None
+    except (TypeError, ValueError):
+        return None
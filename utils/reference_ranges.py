@@ -1,8 +1,173 @@
+"""
+Curated reference ranges (configs/reference_ranges.json).
+
+The JSON is parsed once into an immutable `ReferenceRangeTable` indexed by
+(canonical param, gender key, age bucket) → (low, high), so validation does a
+single dict lookup per parameter instead of re-reading the file per report.
+`get_reference_table()` stats the file on each call and, when its mtime
+changes, builds a new table and swaps it in atomically — editing the JSON
+takes effect on the next report without a restart. A file that fails to
+parse or disappears leaves the last good table in place (empty if none has
+loaded yet); the failure is logged once per file version.
+"""
+
+import hashlib
 import json
+import logging
+import os
+import threading
 from pathlib import Path
+from types import MappingProxyType
+
+logger = logging.getLogger(__name__)
+
+REFERENCE_RANGES_PATH = Path(__file__).resolve().parents[1] / "configs" / "reference_ranges.json"
+
+GENDER_KEYS = ("adult_male", "adult_female")
+AGE_BUCKETS = ("newborn", "infant", "toddler", "child", "adolescent", "adult")
+
+_GENDER_KEY_MAP = {
+    "male": "adult_male", "m": "adult_male",
+    "female": "adult_female", "f": "adult_female",
+    "woman": "adult_female", "man": "adult_male",
+}
+
+
+def gender_key(gender: str = None):
+    """Map a printed gender ("Male", "f", …) to a GENDER_KEYS entry, or None."""
+    return _GENDER_KEY_MAP.get(gender.lower().strip()) if gender else None
+
 
 def load_reference_ranges():
-    p = Path(__file__).resolve().parents[1] / "configs" / "reference_ranges.json"
+    """Parse the JSON from disk (uncached). Prefer `get_reference_table()`."""
+    p = REFERENCE_RANGES_PATH
     if not p.exists():
         return {}
     return json.loads(p.read_text())
+
+
+def resolve_range(ref, gender_key: str = None, age_bucket_key: str = None):
+    """
+    Resolve (low, high) from one parameter's "reference" entry.
+    Priority:
+      1. Pediatric age bucket (newborn/infant/toddler/child/adolescent) when
+         patient is non-adult — this MUST beat adult-gender ranges to avoid
+         flagging infants against adult thresholds.
+      2. Gender-adjusted adult range (adult_male / adult_female).
+      3. Generic adult / neutral range.
+    """
+    if not isinstance(ref, dict):
+        return None, None
+    if "low" in ref and "high" in ref:
+        return ref["low"], ref["high"]
+
+    # Pediatric first — for anyone under 18
+    pediatric = age_bucket_key and age_bucket_key != "adult"
+    if pediatric:
+        if age_bucket_key in ref and isinstance(ref[age_bucket_key], dict):
+            return ref[age_bucket_key].get("low"), ref[age_bucket_key].get("high")
+        # No pediatric bucket for this param → do NOT apply adult range.
+        # Returning (None, None) lets caller fall back to the report-embedded range
+        # (priority 2) instead of misflagging the child against adult thresholds.
+        return None, None
+
+    if gender_key and gender_key in ref and isinstance(ref[gender_key], dict):
+        return ref[gender_key].get("low"), ref[gender_key].get("high")
+    for key in ("adult", "adult_male", "adult_female"):
+        if key in ref and isinstance(ref[key], dict):
+            return ref[key].get("low"), ref[key].get("high")
+    return None, None
+
+
+class ReferenceRangeTable:
+    """Read-only view of reference_ranges.json, pre-resolved for every patient profile."""
+
+    __slots__ = ("_ranges", "_units", "mtime", "digest")
+
+    def __init__(self, data: dict, mtime: int = None, digest: str = ""):
+        ranges = {}
+        units = {}
+        for param, entry in data.items():
+            if not isinstance(entry, dict):
+                continue
+            ref = entry.get("reference")
+            for gender_key in (None,) + GENDER_KEYS:
+                for age_key in (None,) + AGE_BUCKETS:
+                    ranges[(param, gender_key, age_key)] = resolve_range(ref, gender_key, age_key)
+            declared = entry.get("units")
+            if isinstance(declared, list) and declared:
+                units[param] = tuple(u for u in declared if isinstance(u, str))
+        self._ranges = MappingProxyType(ranges)
+        self._units = MappingProxyType(units)
+        self.mtime = mtime
+        self.digest = digest
+
+    def __contains__(self, param: str) -> bool:
+        return (param, None, None) in self._ranges
+
+    def __len__(self) -> int:
+        return len(self._ranges) // ((len(GENDER_KEYS) + 1) * (len(AGE_BUCKETS) + 1))
+
+    def lookup(self, param: str, gender_key: str = None, age_bucket_key: str = None):
+        """(low, high) for this patient profile; (None, None) when not curated."""
+        return self._ranges.get((param, gender_key, age_bucket_key), (None, None))
+
+    def default_unit(self, param: str):
+        """First unit listed for `param` — the unit the curated range is in."""
+        declared = self._units.get(param)
+        return declared[0] if declared else None
+
+    def units(self, param: str) -> tuple:
+        """Every unit listed for `param` in reference_ranges.json."""
+        return self._units.get(param, ())
+
+
+_NOT_LOADED = -1        # mtime placeholder before the first load attempt
+_table = ReferenceRangeTable({}, mtime=_NOT_LOADED)
+_table_lock = threading.Lock()
+_failed_mtime = _NOT_LOADED     # file version that failed to load; None = file missing
+_loads = 0
+
+
+def _file_mtime():
+    """st_mtime_ns of the JSON, or None when it cannot be stat'ed."""
+    try:
+        return os.stat(REFERENCE_RANGES_PATH).st_mtime_ns
+    except OSError:
+        return None
+
+
+def get_reference_table() -> ReferenceRangeTable:
+    """Current table; rebuilt and atomically swapped when the JSON's mtime changes."""
+    global _table, _failed_mtime, _loads
+    mtime = _file_mtime()
+    table = _table
+    if mtime == table.mtime or mtime == _failed_mtime:
+        return table
+    with _table_lock:
+        if mtime in (_table.mtime, _failed_mtime):
+            return _table
+        try:
+            if mtime is None:
+                raise FileNotFoundError("file is missing")
+            raw = REFERENCE_RANGES_PATH.read_bytes()
+            data = json.loads(raw)
+            if not isinstance(data, dict):
+                raise ValueError("top level must be an object keyed by parameter")
+            new_table = ReferenceRangeTable(data, mtime=mtime, digest=hashlib.sha256(raw).hexdigest()[:16])
+        except (OSError, ValueError) as e:
+            _failed_mtime = mtime
+            logger.error(f"reference_ranges: could not load {REFERENCE_RANGES_PATH}, keeping previous table: {e}")
+            return _table
+        _table = new_table
+        _loads += 1
+        logger.info(
+            f"reference_ranges: {'reloaded' if _loads > 1 else 'loaded'} {len(new_table)} params "
+            f"(digest {new_table.digest})"
+        )
+        return new_table
+
+
+def get_reference_table_stats() -> dict:
+    table = _table
+    return {"params": len(table), "digest": table.digest, "loads": _loads}
@@ -0,0 +1,150 @@
+"""
+Persistent cache of finished /analyze results, keyed by upload content.
+
+Key = sha256(uploaded bytes) + pipeline version. The version is a digest of
+everything that can change the output for identical bytes: every module
+under nodes/, graph/ and utils/ (prompts, parsing, unit and alias tables,
+PDF rendering, thresholds, graph wiring, LLM model names) and the live
+reference-range table (configs/reference_ranges.json is hot-reloaded,
+so its digest is read per lookup rather than frozen at startup). Editing any
+of them changes the version, so stale results are never served — they simply
+age out of the LRU.
+
+Values are the serialized `ReportState`. A hit is only honoured if the FAISS
+namespace it points at still exists on disk, so /chat keeps working.
+"""
+
+import hashlib
+import logging
+import os
+import threading
+
+from graph.graph_state import ReportState
+from utils.disk_cache import CACHE_ROOT, DiskCache
+from utils.reference_ranges import get_reference_table
+
+logger = logging.getLogger(__name__)
+
+RESULT_CACHE_ENABLED = os.environ.get("RESULT_CACHE_ENABLED", "1").strip().lower() not in ("0", "false", "no")
+RESULT_CACHE_DIR = os.environ.get("RESULT_CACHE_DIR", os.path.join(CACHE_ROOT, "results"))
+RESULT_CACHE_MAX_MB = float(os.environ.get("RESULT_CACHE_MAX_MB", "200"))
+
+_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Packages whose sources determine the analysis output for a given upload.
+# Whole packages rather than a hand-picked file list, so a new helper the
+# pipeline imports can never be left out of the version.
+_VERSIONED_DIRS = ("nodes", "graph", "utils")
+# Env overrides that change models or graph behaviour without touching code.
+_VERSIONED_ENV = (
+    "GROQ_VISION_MODEL", "PIPELINE_FUSED_ANALYSIS", "PATTERNS_LLM_ENRICHMENT",
+)
+
+_version = None
+_cache = None
+_cache_lock = threading.Lock()
+
+# Served-result counters. DiskCache's own hit counter also counts entries
+# that were found but rejected (stale FAISS namespace, unreadable JSON).
+_stats = {"hits": 0, "misses": 0, "stale": 0}
+_stats_lock = threading.Lock()
+
+
+def _bump(counter: str) -> None:
+    with _stats_lock:
+        _stats[counter] += 1
+
+
+def _code_version() -> str:
+    """Digest of sources and env overrides — fixed for the process lifetime."""
+    global _version
+    if _version is None:
+        h = hashlib.sha256()
+        paths = []
+        for d in _VERSIONED_DIRS:
+            for fname in sorted(os.listdir(os.path.join(_ROOT, d))):
+                if fname.endswith(".py"):
+                    paths.append(os.path.join(d, fname))
+        for rel in sorted(paths):
+            h.update(rel.encode())
+            with open(os.path.join(_ROOT, rel), "rb") as f:
+                h.update(f.read())
+        for name in _VERSIONED_ENV:
+            h.update(f"{name}={os.environ.get(name, '')}".encode())
+        _version = h.hexdigest()[:16]
+        logger.info(f"result_cache: code version {_version}")
+    return _version
+
+
+def pipeline_version() -> str:
+    """Digest of prompts/models/reference ranges — part of every cache key."""
+    ranges_digest = get_reference_table().digest
+    return hashlib.sha256(f"{_code_version()}:{ranges_digest}".encode()).hexdigest()[:16]
+
+
+def _get_cache() -> DiskCache:
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = DiskCache(RESULT_CACHE_DIR, int(RESULT_CACHE_MAX_MB * 1024 * 1024), name="results")
+    return _cache
+
+
+def result_key(contents: bytes) -> str:
+    return hashlib.sha256(contents).hexdigest() + "-" + pipeline_version()
+
+
+def _faiss_namespace_exists(namespace: str) -> bool:
+    # Imported lazily: rag_node pulls in FAISS/embeddings
+    from nodes.rag_node import FAISS_INDEX_DIR
+    return bool(namespace) and os.path.isdir(os.path.join(FAISS_INDEX_DIR, namespace))
+
+
+def get_cached_result(contents: bytes):
+    """Return the cached ReportState for these upload bytes, or None."""
+    if not RESULT_CACHE_ENABLED:
+        return None
+    cache = _get_cache()
+    key = result_key(contents)
+    data = cache.get(key)
+    if data is None:
+        _bump("misses")
+        return None
+    try:
+        state = ReportState.model_validate_json(data)
+    except ValueError as e:
+        logger.warning(f"result_cache: dropping unreadable entry {key[:12]}: {e}")
+        state = None
+    if state is not None and not _faiss_namespace_exists(state.rag_collection_name):
+        logger.info(f"result_cache: FAISS namespace {state.rag_collection_name} gone — recomputing")
+        state = None
+    if state is None:
+        cache.delete(key)
+        _bump("misses")
+        _bump("stale")
+        return None
+    _bump("hits")
+    return state
+
+
+def store_result(contents: bytes, state: ReportState) -> None:
+    """Cache a finished analysis. Runs with errors are not cached."""
+    if not RESULT_CACHE_ENABLED or state.errors or not state.rag_collection_name:
+        return
+    _get_cache().set(result_key(contents), state.model_dump_json().encode())
+
+
+def get_result_cache_stats() -> dict:
+    if not RESULT_CACHE_ENABLED:
+        return {"enabled": False}
+    disk = _get_cache().stats()
+    with _stats_lock:
+        stats = dict(_stats)
+    lookups = stats["hits"] + stats["misses"]
+    stats["hit_rate"] = round(stats["hits"] / lookups, 3) if lookups else 0.0
+    for field in ("stores", "evictions", "errors", "entries", "bytes", "max_bytes"):
+        stats[field] = disk[field]
+    stats["enabled"] = True
+    stats["version"] = pipeline_version()
+    return stats